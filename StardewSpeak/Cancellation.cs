@@ -0,0 +1,45 @@
+﻿using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+
+namespace StardewSpeak
+{
+    // Requests the client gave up on. The reader thread marks them while the game loop may still be
+    // working on them, so long searches can stop early instead of finishing for nobody.
+    public static class Cancellation
+    {
+        // request id -> cancelled, for every request that has been received but not answered yet
+        private static readonly ConcurrentDictionary<string, bool> Pending = new ConcurrentDictionary<string, bool>();
+        // only touched from the game loop
+        public static string CurrentRequestId;
+
+        public static void Received(string id)
+        {
+            if (id != null) Pending[id] = false;
+        }
+
+        public static void Cancel(string id)
+        {
+            // no-op if the response was already sent
+            Pending.TryUpdate(id, true, false);
+        }
+
+        public static bool IsCancelled(string id)
+        {
+            return id != null && Pending.TryGetValue(id, out bool cancelled) && cancelled;
+        }
+
+        public static void Finished(string id)
+        {
+            if (id != null) Pending.TryRemove(id, out bool _);
+        }
+
+        public static void ThrowIfCurrentCancelled()
+        {
+            if (IsCancelled(CurrentRequestId)) throw new OperationCanceledException($"Request {CurrentRequestId} was cancelled");
+        }
+    }
+}
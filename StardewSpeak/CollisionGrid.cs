@@ -0,0 +1,65 @@
+﻿using StardewValley;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+
+namespace StardewSpeak.Pathfinder
+{
+	// Passability of every tile in a location for the client to pathfind over itself. The version
+	// goes up whenever something that could change a tile's passability happens in that location,
+	// so the client can check its copy is current with GET_GRID_VERSION instead of fetching it again.
+	public static class CollisionGrid
+	{
+		public const string Capability = "passability_grid";
+		private static readonly Dictionary<string, int> Versions = new Dictionary<string, int>();
+		private static readonly Dictionary<string, dynamic> Grids = new Dictionary<string, dynamic>();
+		private static int LastVersion = 0;
+		// every location is at least this version, BumpAll is for changes everywhere like a new day growing trellis crops
+		private static int MinVersion = 0;
+
+		public static int Version(GameLocation location)
+		{
+			Versions.TryGetValue(location.NameOrUniqueName, out int version);
+			return Math.Max(version, MinVersion);
+		}
+
+		public static void Bump(GameLocation location)
+		{
+			string name = location.NameOrUniqueName;
+			Versions[name] = ++LastVersion;
+			Grids.Remove(name);
+		}
+
+		public static void BumpAll()
+		{
+			MinVersion = ++LastVersion;
+			Versions.Clear();
+			Grids.Clear();
+		}
+
+		public static dynamic Get(GameLocation location)
+		{
+			string name = location.NameOrUniqueName;
+			int version = Version(location);
+			if (Grids.TryGetValue(name, out dynamic cached) && cached.version == version) return cached;
+			var layer = location.map.Layers[0];
+			var rows = new List<string>(layer.LayerHeight);
+			var row = new StringBuilder(layer.LayerWidth);
+			for (int y = 0; y < layer.LayerHeight; y++)
+			{
+				row.Clear();
+				for (int x = 0; x < layer.LayerWidth; x++)
+				{
+					row.Append(Pathfinder.isTileWalkable(location, x, y) ? '.' : '#');
+				}
+				rows.Add(row.ToString());
+				Cancellation.ThrowIfCurrentCancelled();
+			}
+			var grid = new { location = name, version, width = layer.LayerWidth, height = layer.LayerHeight, rows };
+			Grids[name] = grid;
+			return grid;
+		}
+	}
+}
@@ -0,0 +1,322 @@
+﻿using Newtonsoft.Json;
+using Newtonsoft.Json.Linq;
+using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+
+namespace StardewSpeak
+{
+    // Messages start out as newline delimited JSON. The client can switch to length prefixed MessagePack
+    // frames by sending a SET_FRAMING line, which is acknowledged with a FRAMING_CHANGED line.
+    public static class Framing
+    {
+        public const string Lines = "lines";
+        public const string MsgPack = "msgpack";
+        public const string MsgPackCapability = "msgpack_framing";
+
+        public static byte[] EncodeFrame(JToken token)
+        {
+            byte[] payload = MessagePack.Serialize(token);
+            var frame = new byte[payload.Length + 4];
+            int size = payload.Length;
+            // little endian length header
+            for (int i = 0; i < 4; i++)
+            {
+                frame[i] = (byte)(size >> (8 * i));
+            }
+            Buffer.BlockCopy(payload, 0, frame, 4, payload.Length);
+            return frame;
+        }
+    }
+
+    public class MessageReader
+    {
+        private readonly BufferedStream Source;
+        public string Framing = StardewSpeak.Framing.Lines;
+
+        public MessageReader(System.IO.Stream source)
+        {
+            this.Source = new BufferedStream(source);
+        }
+
+        // Returns null when the client closes its end of the pipe
+        public dynamic Read()
+        {
+            if (this.Framing == StardewSpeak.Framing.MsgPack)
+            {
+                byte[] header = this.ReadExactly(4);
+                if (header == null) return null;
+                int size = header[0] | (header[1] << 8) | (header[2] << 16) | (header[3] << 24);
+                byte[] payload = this.ReadExactly(size);
+                if (payload == null) return null;
+                return MessagePack.Deserialize(payload);
+            }
+            string line = this.ReadLine();
+            if (line == null) return null;
+            return JsonConvert.DeserializeObject(line);
+        }
+
+        private string ReadLine()
+        {
+            var bytes = new List<byte>();
+            while (true)
+            {
+                int b = this.Source.ReadByte();
+                if (b == -1) return bytes.Count == 0 ? null : Encoding.UTF8.GetString(bytes.ToArray());
+                if (b == '\n') break;
+                bytes.Add((byte)b);
+            }
+            return Encoding.UTF8.GetString(bytes.ToArray()).TrimEnd('\r');
+        }
+
+        private byte[] ReadExactly(int size)
+        {
+            var buffer = new byte[size];
+            int offset = 0;
+            while (offset < size)
+            {
+                int read = this.Source.Read(buffer, offset, size - offset);
+                if (read == 0) return null;
+                offset += read;
+            }
+            return buffer;
+        }
+    }
+
+    // Just enough of the MessagePack spec to round trip JSON-like values
+    public static class MessagePack
+    {
+        public static byte[] Serialize(JToken token)
+        {
+            using (var ms = new MemoryStream())
+            {
+                Write(ms, token);
+                return ms.ToArray();
+            }
+        }
+
+        public static JToken Deserialize(byte[] data)
+        {
+            int offset = 0;
+            return Read(data, ref offset);
+        }
+
+        private static void Write(MemoryStream ms, JToken token)
+        {
+            switch (token.Type)
+            {
+                case JTokenType.Object:
+                    var obj = (JObject)token;
+                    WriteHeader(ms, obj.Count, 0x80, 15, 0xde, 0xdf);
+                    foreach (var prop in obj.Properties())
+                    {
+                        WriteString(ms, prop.Name);
+                        Write(ms, prop.Value);
+                    }
+                    break;
+                case JTokenType.Array:
+                    var arr = (JArray)token;
+                    WriteHeader(ms, arr.Count, 0x90, 15, 0xdc, 0xdd);
+                    foreach (var item in arr)
+                    {
+                        Write(ms, item);
+                    }
+                    break;
+                case JTokenType.Integer:
+                    WriteInteger(ms, token.Value<long>());
+                    break;
+                case JTokenType.Float:
+                    ms.WriteByte(0xcb);
+                    WriteBigEndian(ms, BitConverter.DoubleToInt64Bits(token.Value<double>()), 8);
+                    break;
+                case JTokenType.Boolean:
+                    ms.WriteByte(token.Value<bool>() ? (byte)0xc3 : (byte)0xc2);
+                    break;
+                case JTokenType.Null:
+                case JTokenType.Undefined:
+                    ms.WriteByte(0xc0);
+                    break;
+                case JTokenType.Bytes:
+                    byte[] bytes = token.Value<byte[]>();
+                    ms.WriteByte(0xc6);
+                    WriteBigEndian(ms, bytes.Length, 4);
+                    ms.Write(bytes, 0, bytes.Length);
+                    break;
+                case JTokenType.String:
+                    WriteString(ms, token.Value<string>());
+                    break;
+                default:
+                    // dates, guids etc. are sent the same way the JSON serializer would write them
+                    WriteString(ms, token.ToString(Formatting.None).Trim('"'));
+                    break;
+            }
+        }
+
+        private static void WriteHeader(MemoryStream ms, int count, byte fixPrefix, int fixMax, byte code16, byte code32)
+        {
+            if (count <= fixMax)
+            {
+                ms.WriteByte((byte)(fixPrefix | count));
+            }
+            else if (count <= ushort.MaxValue)
+            {
+                ms.WriteByte(code16);
+                WriteBigEndian(ms, count, 2);
+            }
+            else
+            {
+                ms.WriteByte(code32);
+                WriteBigEndian(ms, count, 4);
+            }
+        }
+
+        private static void WriteString(MemoryStream ms, string value)
+        {
+            byte[] bytes = Encoding.UTF8.GetBytes(value);
+            if (bytes.Length <= 31)
+            {
+                ms.WriteByte((byte)(0xa0 | bytes.Length));
+            }
+            else if (bytes.Length <= byte.MaxValue)
+            {
+                ms.WriteByte(0xd9);
+                ms.WriteByte((byte)bytes.Length);
+            }
+            else
+            {
+                WriteHeader(ms, bytes.Length, 0, -1, 0xda, 0xdb);
+            }
+            ms.Write(bytes, 0, bytes.Length);
+        }
+
+        private static void WriteInteger(MemoryStream ms, long value)
+        {
+            if (value >= 0 && value <= 0x7f)
+            {
+                ms.WriteByte((byte)value);
+            }
+            else if (value < 0 && value >= -32)
+            {
+                ms.WriteByte((byte)value);
+            }
+            else if (value >= sbyte.MinValue && value <= sbyte.MaxValue)
+            {
+                ms.WriteByte(0xd0);
+                WriteBigEndian(ms, value, 1);
+            }
+            else if (value >= short.MinValue && value <= short.MaxValue)
+            {
+                ms.WriteByte(0xd1);
+                WriteBigEndian(ms, value, 2);
+            }
+            else if (value >= int.MinValue && value <= int.MaxValue)
+            {
+                ms.WriteByte(0xd2);
+                WriteBigEndian(ms, value, 4);
+            }
+            else
+            {
+                ms.WriteByte(0xd3);
+                WriteBigEndian(ms, value, 8);
+            }
+        }
+
+        private static void WriteBigEndian(MemoryStream ms, long value, int size)
+        {
+            for (int i = size - 1; i >= 0; i--)
+            {
+                ms.WriteByte((byte)(value >> (8 * i)));
+            }
+        }
+
+        private static long ReadBigEndian(byte[] data, ref int offset, int size)
+        {
+            long value = 0;
+            for (int i = 0; i < size; i++)
+            {
+                value = (value << 8) | data[offset++];
+            }
+            return value;
+        }
+
+        private static JToken Read(byte[] data, ref int offset)
+        {
+            byte code = data[offset++];
+            if (code <= 0x7f) return new JValue((long)code);
+            if (code >= 0xe0) return new JValue((long)(sbyte)code);
+            if ((code & 0xf0) == 0x80) return ReadMap(data, ref offset, code & 0x0f);
+            if ((code & 0xf0) == 0x90) return ReadArray(data, ref offset, code & 0x0f);
+            if ((code & 0xe0) == 0xa0) return ReadString(data, ref offset, code & 0x1f);
+            switch (code)
+            {
+                case 0xc0: return JValue.CreateNull();
+                case 0xc2: return new JValue(false);
+                case 0xc3: return new JValue(true);
+                case 0xc4: return ReadBytes(data, ref offset, (int)ReadBigEndian(data, ref offset, 1));
+                case 0xc5: return ReadBytes(data, ref offset, (int)ReadBigEndian(data, ref offset, 2));
+                case 0xc6: return ReadBytes(data, ref offset, (int)ReadBigEndian(data, ref offset, 4));
+                case 0xca:
+                    {
+                        int bits = (int)ReadBigEndian(data, ref offset, 4);
+                        return new JValue((double)BitConverter.ToSingle(BitConverter.GetBytes(bits), 0));
+                    }
+                case 0xcb: return new JValue(BitConverter.Int64BitsToDouble(ReadBigEndian(data, ref offset, 8)));
+                case 0xcc: return new JValue(ReadBigEndian(data, ref offset, 1));
+                case 0xcd: return new JValue(ReadBigEndian(data, ref offset, 2));
+                case 0xce: return new JValue(ReadBigEndian(data, ref offset, 4));
+                case 0xcf: return new JValue(ReadBigEndian(data, ref offset, 8));
+                case 0xd0: return new JValue((long)(sbyte)ReadBigEndian(data, ref offset, 1));
+                case 0xd1: return new JValue((long)(short)ReadBigEndian(data, ref offset, 2));
+                case 0xd2: return new JValue((long)(int)ReadBigEndian(data, ref offset, 4));
+                case 0xd3: return new JValue(ReadBigEndian(data, ref offset, 8));
+                case 0xd9: return ReadString(data, ref offset, (int)ReadBigEndian(data, ref offset, 1));
+                case 0xda: return ReadString(data, ref offset, (int)ReadBigEndian(data, ref offset, 2));
+                case 0xdb: return ReadString(data, ref offset, (int)ReadBigEndian(data, ref offset, 4));
+                case 0xdc: return ReadArray(data, ref offset, (int)ReadBigEndian(data, ref offset, 2));
+                case 0xdd: return ReadArray(data, ref offset, (int)ReadBigEndian(data, ref offset, 4));
+                case 0xde: return ReadMap(data, ref offset, (int)ReadBigEndian(data, ref offset, 2));
+                case 0xdf: return ReadMap(data, ref offset, (int)ReadBigEndian(data, ref offset, 4));
+            }
+            throw new InvalidDataException($"Unsupported MessagePack type 0x{code:x2}");
+        }
+
+        private static JToken ReadMap(byte[] data, ref int offset, int count)
+        {
+            var obj = new JObject();
+            for (int i = 0; i < count; i++)
+            {
+                string key = Read(data, ref offset).ToString();
+                obj[key] = Read(data, ref offset);
+            }
+            return obj;
+        }
+
+        private static JToken ReadArray(byte[] data, ref int offset, int count)
+        {
+            var arr = new JArray();
+            for (int i = 0; i < count; i++)
+            {
+                arr.Add(Read(data, ref offset));
+            }
+            return arr;
+        }
+
+        private static JToken ReadString(byte[] data, ref int offset, int size)
+        {
+            string value = Encoding.UTF8.GetString(data, offset, size);
+            offset += size;
+            return new JValue(value);
+        }
+
+        private static JToken ReadBytes(byte[] data, ref int offset, int size)
+        {
+            var bytes = new byte[size];
+            Buffer.BlockCopy(data, offset, bytes, 0, size);
+            offset += size;
+            return new JValue((object)bytes);
+        }
+    }
+}
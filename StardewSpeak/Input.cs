@@ -19,6 +19,8 @@ namespace StardewSpeak
 {
 	public static class Input
 	{
+		// GET_HELD_BUTTONS, the client checks what it thinks is held against it
+		public const string HeldButtonsCapability = "held_buttons";
 		public static Dictionary<string, SButton> Held = new Dictionary<string, SButton>();
 
 		private static void InputEvent(SButton button, bool setDown) 
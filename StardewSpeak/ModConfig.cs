@@ -12,5 +12,12 @@ namespace StardewSpeak
         public KeybindList RestartKey { get; set; } = KeybindList.Parse("LeftControl + LeftShift + R, LeftControl + RightShift + R, RightControl + LeftShift + R, RightControl + RightShift + R");
         public KeybindList StopKey { get; set; } = KeybindList.Parse("LeftControl + LeftShift + S, LeftControl + RightShift + S, RightControl + LeftShift + S, RightControl + RightShift + S");
         public bool Debug { get; set; } = false;
+        // write all client traffic to the client's debug directory for replaying without the game
+        public bool RecordTraffic { get; set; } = false;
+        // send read-only requests the client makes together as a single REQUEST_BATCH
+        public bool AutoBatchRequests { get; set; } = false;
+        // where the client gets paths: "local" from its copy of the passability grid, "mod" always from the mod,
+        // "check" from the mod while comparing against the grid, record traffic as well to keep the maps for benchmarks/check_paths.py
+        public string PathMode { get; set; } = "local";
     }
 }
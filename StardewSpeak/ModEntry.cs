@@ -59,6 +59,9 @@ namespace StardewSpeak
             helper.Events.World.TerrainFeatureListChanged += this.OnTerrainFeatureListChanged;
             helper.Events.World.ObjectListChanged += this.OnObjectListChanged;
             helper.Events.World.LargeTerrainFeatureListChanged += this.OnLargeTerrainFeatureListChanged;
+            helper.Events.World.BuildingListChanged += this.OnBuildingListChanged;
+            helper.Events.World.FurnitureListChanged += this.OnFurnitureListChanged;
+            helper.Events.GameLoop.DayStarted += this.OnDayStarted;
             helper.Events.GameLoop.SaveLoaded += this.OnSaveLoaded;
             helper.Events.World.LocationListChanged += this.OnLocationListChanged;
             helper.ConsoleCommands.Add("mimic", "Mimic speech recognition after three second delay, e.g. \"mimic load game\"", Command_MimicSpeech);
@@ -107,7 +110,18 @@ namespace StardewSpeak
 
         private void OnLocationListChanged(object sender, LocationListChangedEventArgs e)
         {
-            Routing.Reset();
+            this.RefreshRoutes();
+        }
+
+        private void RefreshRoutes()
+        {
+            var changed = Routing.Refresh();
+            if (changed.Count == 0) return;
+            foreach (string name in changed)
+            {
+                if (Routing.MapNamesToLocations.TryGetValue(name, out GameLocation location)) CollisionGrid.Bump(location);
+            }
+            this.speechEngine.SendEvent("LOCATION_CONNECTIONS_CHANGED", new { locations = changed });
         }
 
         private void OnButtonsChanged(object sender, ButtonsChangedEventArgs e) 
@@ -155,7 +169,8 @@ namespace StardewSpeak
                 newMenu = Utils.SerializeMenu(e.NewMenu),
             };
             this.MessageStreams("ON_MENU_CHANGED", serializedEvent);
-
+            // moving a building in Robin's menu moves its door without changing the building list
+            if (e.OldMenu is CarpenterMenu) this.RefreshRoutes();
         }
 
         private void MessageStreams(string streamName, dynamic messageValue) 
@@ -169,6 +184,7 @@ namespace StardewSpeak
 
         private void OnTerrainFeatureListChanged(object sender, TerrainFeatureListChangedEventArgs e)
         {
+            CollisionGrid.Bump(e.Location);
             var removed = e.Removed.Select(x => new { x.Value.currentTileLocation });
             var changedEvent = new { location = e.Location.NameOrUniqueName, removed };
             this.speechEngine.SendEvent("TERRAIN_FEATURE_LIST_CHANGED", changedEvent);
@@ -177,13 +193,30 @@ namespace StardewSpeak
         private void OnObjectListChanged(object sender, ObjectListChangedEventArgs e)
 
         {
+            CollisionGrid.Bump(e.Location);
             var changedEvent = new { location = e.Location.NameOrUniqueName };
             this.MessageStreams("ON_OBJECT_LIST_CHANGED", changedEvent);
         }
 
         private void OnLargeTerrainFeatureListChanged(object sender, LargeTerrainFeatureListChangedEventArgs e) 
         {
+            CollisionGrid.Bump(e.Location);
+        }
+
+        private void OnBuildingListChanged(object sender, BuildingListChangedEventArgs e)
+        {
+            CollisionGrid.Bump(e.Location);
+            this.RefreshRoutes();
+        }
+
+        private void OnFurnitureListChanged(object sender, FurnitureListChangedEventArgs e)
+        {
+            CollisionGrid.Bump(e.Location);
+        }
 
+        private void OnDayStarted(object sender, DayStartedEventArgs e)
+        {
+            CollisionGrid.BumpAll();
         }
         private void RespondToQueuedRequests(ConcurrentQueue<dynamic> queue, string gameLoopContext, int timeLimit = 5) 
         {
@@ -210,6 +243,7 @@ namespace StardewSpeak
         {
             if (Game1.activeClickableMenu is ShippingMenu)
             {
+                RespondToQueuedRequests(speechEngine.UpdateTickedInputQueue, "UnvalidatedUpdateTicked");
                 RespondToQueuedRequests(speechEngine.UpdateTickedRequestQueue, "UnvalidatedUpdateTicked");
             }
         }
@@ -217,18 +251,27 @@ namespace StardewSpeak
         private void GameLoop_UpdateTicked(object sender, UpdateTickedEventArgs e)
         {
             eventHandler.CheckNewInGameEvent();
+            // input first so a slow query can't hold up a turn until the next tick
+            RespondToQueuedRequests(speechEngine.UpdateTickedInputQueue, "UpdateTicked");
             RespondToQueuedRequests(speechEngine.UpdateTickedRequestQueue, "UpdateTicked");
             foreach (var pair in ModEntry.Streams)
             {
                 var id = pair.Key;
                 var stream = pair.Value;
+                if (stream.Follower != null)
+                {
+                    this.FollowPath(id, stream.Follower);
+                    continue;
+                }
                 if (stream.Name != "UPDATE_TICKED" || !e.IsMultipleOf((uint)stream.Data.ticks)) continue;
                 string type = stream.Data.type;
                 string error = null;
                 dynamic value;
                 try
                 {
-                    value = Requests.HandleRequestMessage(type);
+                    object current = Requests.HandleRequestMessage(type);
+                    if (!stream.Matches(current)) continue;
+                    value = stream.NextValue(current);
                 }
                 catch (Exception exception)
                 {
@@ -240,5 +283,24 @@ namespace StardewSpeak
             }
             //this.speechEngine.SendEvent("UPDATE_TICKED");
         }
+
+        private void FollowPath(string id, PathFollower follower)
+        {
+            string error = null;
+            object value;
+            try
+            {
+                value = follower.Update();
+                if (value == null) return;
+            }
+            catch (Exception exception)
+            {
+                follower.Cancel();
+                value = exception.ToString();
+                error = "STREAM_EXCEPTION";
+            }
+            var message = new { stream_id = id, value, error };
+            this.speechEngine.SendMessage("STREAM_MESSAGE", message);
+        }
     }
 }
\ No newline at end of file
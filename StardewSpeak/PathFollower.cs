@@ -0,0 +1,176 @@
+﻿using Microsoft.Xna.Framework;
+using Newtonsoft.Json.Linq;
+using StardewValley;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+
+namespace StardewSpeak
+{
+    // Walks the player along a path the client opens a FOLLOW_PATH stream with, steering every tick
+    // the way Path.move_update does in the client so turns don't wait on a status frame going out and
+    // the buttons coming back. The stream sends a frame when the player gets to the next tile on the
+    // path, steps off it, or is done, and nothing after that until UPDATE_PATH gives it a new path.
+    public class PathFollower
+    {
+        public const string Capability = "follow_path";
+        public const string StreamName = "FOLLOW_PATH";
+        // indexed by facing direction, north east south west
+        private static readonly string[] DirectionButtons = { "moveUpButton", "moveRightButton", "moveDownButton", "moveLeftButton" };
+        private const int TileSize = 64;
+
+        private List<Point> Tiles;
+        private Dictionary<Point, int> TileIndices;
+        private string Location;
+        // the client's count of UPDATE_PATH, frames carry it so ones about an older path can be told apart
+        private int Version;
+        private readonly string NextLocation;
+        private readonly float TurnThreshold;
+        private readonly float LastTileDoneThreshold;
+        private readonly bool StopMovingWhenDone;
+        // predicate on PLAYER_STATUS like SET_STREAM_FILTER takes, done as soon as it matches
+        private readonly JToken StopWhen;
+        private int LastIndex;
+        private Point? OffPathTile;
+        public bool Finished { get; private set; }
+
+        public PathFollower(dynamic data)
+        {
+            this.NextLocation = data.nextLocation;
+            this.TurnThreshold = data.turnThreshold;
+            this.LastTileDoneThreshold = data.lastTileDoneThreshold;
+            this.StopMovingWhenDone = data.stopMovingWhenDone;
+            JToken stopWhen = data.stopWhen;
+            this.StopWhen = stopWhen == null || stopWhen.Type == JTokenType.Null ? null : stopWhen;
+            this.Retarget(data.tiles, (string)data.location, 0);
+        }
+
+        public void Retarget(dynamic tiles, string location, int version)
+        {
+            var points = new List<Point>();
+            var indices = new Dictionary<Point, int>();
+            foreach (var tile in tiles)
+            {
+                int x = tile.X;
+                int y = tile.Y;
+                var point = new Point(x, y);
+                indices[point] = points.Count;
+                points.Add(point);
+            }
+            if (points.Count == 0) throw new ArgumentException("Path has no tiles");
+            this.Tiles = points;
+            this.TileIndices = indices;
+            this.Location = location;
+            this.Version = version;
+            this.LastIndex = -1;
+            this.OffPathTile = null;
+            // a path that was already walked goes on from wherever the player is now
+            this.Finished = false;
+        }
+
+        // called every tick after the queued requests, the frame to send if there is one
+        public object Update()
+        {
+            if (this.Finished) return null;
+            var player = Game1.player;
+            string location = player.currentLocation?.NameOrUniqueName;
+            if (location != this.Location)
+            {
+                if (location == this.NextLocation) return this.Finish("arrived");
+                return this.Finish("failed", $"Unexpected location {location}, pathfinding for {this.Location}");
+            }
+            if (this.StopWhen != null && Predicate.Evaluate(this.StopWhen, JToken.FromObject(GameState.PlayerStatus(), SpeechEngine.Serializer)))
+            {
+                return this.Finish("done");
+            }
+            var tile = new Point(player.getTileX(), player.getTileY());
+            if (!this.TileIndices.TryGetValue(tile, out int index))
+            {
+                // once per tile, the client finds a way back and sends it with UPDATE_PATH
+                if (this.OffPathTile == tile) return null;
+                this.OffPathTile = tile;
+                return new { status = "off_path", version = this.Version, tileX = tile.X, tileY = tile.Y };
+            }
+            this.OffPathTile = null;
+            bool moving = player.isMoving();
+            if (index == this.Tiles.Count - 1)
+            {
+                if (moving && FacingTileCenter(player, this.LastTileDoneThreshold)) return this.Progress(index, tile);
+                return this.Finish("done");
+            }
+            int direction = DirectionFromTiles(tile, this.Tiles[index + 1]);
+            if (direction < 0) return this.Finish("failed", $"Tiles {tile} and {this.Tiles[index + 1]} aren't next to each other");
+            // keep going towards the center of the tile before a turn, the same as the client
+            bool turnComing = moving && Math.Abs(player.FacingDirection - direction) % 2 == 1;
+            if (!turnComing || !FacingTileCenter(player, this.TurnThreshold)) Move(direction);
+            return this.Progress(index, tile);
+        }
+
+        // the client closed the stream, from STOP_STREAM
+        public void Cancel()
+        {
+            if (this.Finished) return;
+            this.Finished = true;
+            if (this.StopMovingWhenDone) StopMoving();
+        }
+
+        private object Progress(int index, Point tile)
+        {
+            if (index == this.LastIndex) return null;
+            this.LastIndex = index;
+            return new { status = "progress", version = this.Version, index, tileX = tile.X, tileY = tile.Y };
+        }
+
+        private object Finish(string status, string error = null)
+        {
+            this.Finished = true;
+            if (this.StopMovingWhenDone) StopMoving();
+            return new { status, version = this.Version, index = this.LastIndex, error };
+        }
+
+        private static void Move(int direction)
+        {
+            for (int i = 0; i < DirectionButtons.Length; i++)
+            {
+                if (i == direction) Input.Hold(DirectionButtons[i]);
+                else Input.Release(DirectionButtons[i]);
+            }
+        }
+
+        private static void StopMoving()
+        {
+            foreach (string button in DirectionButtons) Input.Release(button);
+        }
+
+        private static int DirectionFromTiles(Point tile, Point target)
+        {
+            if (tile.X == target.X && tile.Y - 1 == target.Y) return 0;
+            if (tile.X + 1 == target.X && tile.Y == target.Y) return 1;
+            if (tile.X == target.X && tile.Y + 1 == target.Y) return 2;
+            if (tile.X - 1 == target.X && tile.Y == target.Y) return 3;
+            return -1;
+        }
+
+        // same as Path.facing_tile_center
+        private static bool FacingTileCenter(Farmer player, float offsetThreshold)
+        {
+            var position = player.Position;
+            float x = position.X / TileSize - player.getTileX();
+            float y = position.Y / TileSize - player.getTileY() - 0.25f;
+            switch (player.FacingDirection)
+            {
+                case 0:
+                    return y + offsetThreshold <= 0;
+                case 1:
+                    return x + offsetThreshold <= 0;
+                case 2:
+                    return y - offsetThreshold >= 0;
+                case 3:
+                    return x - offsetThreshold >= 0;
+            }
+            return false;
+        }
+    }
+}
@@ -58,6 +58,8 @@ namespace StardewSpeak.Pathfinder
 					-1
 				}
 			};
+		// PATHS_TO_TILES gives walking distances to many tiles from one search
+		public const string PathsToTilesCapability = "paths_to_tiles";
 		private static PriorityQueue<float> _openList = new PriorityQueue<float>();
 		private static HashSet<int> _closedList = new HashSet<int>();
 		private static int _counter = 0;
@@ -123,6 +125,11 @@ namespace StardewSpeak.Pathfinder
 						}
 					}
 					iterations++;
+					// checking every node is measurable, a few hundred nodes is still well under a millisecond
+					if (iterations % 256 == 0)
+					{
+						Cancellation.ThrowIfCurrentCancelled();
+					}
 					if (limit >= 0)
 					{
 						if (iterations >= limit)
@@ -142,6 +149,78 @@ namespace StardewSpeak.Pathfinder
 			}
 		}
 
+		// Walking distance from the start to each target with one breadth first search instead of a
+		// findPath per target, null for targets it didn't reach. With adjacent a target counts as reached
+		// from any walkable tile next to it, the way PATH_TO_PLAYER paths are used to stop next to an
+		// object. With nearestOnly the search stops after the first step that reaches a target.
+		public static List<int?> DistancesToTiles(GameLocation location, int startX, int startY, List<Point> targets, bool adjacent, bool nearestOnly, int limit = -1)
+		{
+			var distances = new List<int?>(targets.Count);
+			var targetIndexes = new Dictionary<Point, List<int>>();
+			for (int i = 0; i < targets.Count; i++)
+			{
+				distances.Add(null);
+				if (!targetIndexes.TryGetValue(targets[i], out List<int> indexes))
+				{
+					indexes = new List<int>();
+					targetIndexes[targets[i]] = indexes;
+				}
+				indexes.Add(i);
+			}
+			int targetTiles = targetIndexes.Count;
+			int layerWidth = location.map.Layers[0].LayerWidth;
+			int layerHeight = location.map.Layers[0].LayerHeight;
+			var start = new Point(startX, startY);
+			var seen = new HashSet<Point> { start };
+			var frontier = new List<Point> { start };
+			ReachTarget(targetIndexes, distances, start, 0);
+			int iterations = 0;
+			for (int distance = 1; frontier.Count > 0 && targetIndexes.Count > 0; distance++)
+			{
+				if (nearestOnly && targetIndexes.Count < targetTiles) break;
+				var nextFrontier = new List<Point>();
+				foreach (var tile in frontier)
+				{
+					for (int i = 0; i < 4; i++)
+					{
+						var neighbor = new Point(tile.X + Directions[i, 0], tile.Y + Directions[i, 1]);
+						if (seen.Contains(neighbor)) continue;
+						bool isOffMap = neighbor.X < 0 || neighbor.Y < 0 || neighbor.X >= layerWidth || neighbor.Y >= layerHeight;
+						bool isWalkable = isTileWalkable(location, neighbor.X, neighbor.Y);
+						if (!isOffMap && isWalkable)
+						{
+							seen.Add(neighbor);
+							nextFrontier.Add(neighbor);
+							ReachTarget(targetIndexes, distances, neighbor, distance);
+						}
+						else if (adjacent || (isOffMap && isWalkable))
+						{
+							// same as findPath, an off map tile can only be the end of a path
+							ReachTarget(targetIndexes, distances, neighbor, distance);
+						}
+					}
+					iterations++;
+					if (iterations % 256 == 0)
+					{
+						Cancellation.ThrowIfCurrentCancelled();
+					}
+					if (limit >= 0 && iterations >= limit)
+					{
+						return distances;
+					}
+				}
+				frontier = nextFrontier;
+			}
+			return distances;
+		}
+
+		private static void ReachTarget(Dictionary<Point, List<int>> targetIndexes, List<int?> distances, Point tile, int distance)
+		{
+			if (!targetIndexes.TryGetValue(tile, out List<int> indexes)) return;
+			foreach (int i in indexes) distances[i] = distance;
+			targetIndexes.Remove(tile);
+		}
+
 		public static Stack<Point> reconstructPath(PathNode finalNode)
 		{
 			Stack<Point> path = new Stack<Point>();
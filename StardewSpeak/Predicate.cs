@@ -0,0 +1,110 @@
+﻿using Newtonsoft.Json.Linq;
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using System.Threading.Tasks;
+
+namespace StardewSpeak
+{
+    // Conditions the client sends with SET_STREAM_FILTER so a stream only sends frames that match, see
+    // predicates.py. Prefix form lists like ["and", ["truthy", "inUse"], [">", "castingPower", 0.95]].
+    public static class Predicate
+    {
+        public const string StreamFilterCapability = "stream_filters";
+
+        public static bool Evaluate(JToken expr, JToken value)
+        {
+            var parts = (JArray)expr;
+            string op = (string)parts[0];
+            switch (op)
+            {
+                case "and":
+                    return parts.Skip(1).All(p => Evaluate(p, value));
+                case "or":
+                    return parts.Skip(1).Any(p => Evaluate(p, value));
+                case "not":
+                    return !Evaluate(parts[1], value);
+                case "truthy":
+                    return IsTruthy(Resolve(value, (string)parts[1]));
+                default:
+                    return Compare(op, Resolve(value, (string)parts[1]), parts[2]);
+            }
+        }
+
+        // dotted path into objects and arrays, null if anything along the way is missing
+        static JToken Resolve(JToken value, string path)
+        {
+            foreach (var segment in path.Split('.'))
+            {
+                if (value is JObject obj)
+                {
+                    value = obj[segment];
+                }
+                else if (value is JArray arr && int.TryParse(segment, out int i) && i >= 0 && i < arr.Count)
+                {
+                    value = arr[i];
+                }
+                else
+                {
+                    return null;
+                }
+            }
+            return value;
+        }
+
+        static bool IsTruthy(JToken token)
+        {
+            if (token == null) return false;
+            switch (token.Type)
+            {
+                case JTokenType.Null:
+                case JTokenType.Undefined:
+                    return false;
+                case JTokenType.Boolean:
+                    return (bool)token;
+                case JTokenType.Integer:
+                case JTokenType.Float:
+                    return (double)token != 0;
+                case JTokenType.String:
+                    return ((string)token).Length > 0;
+                default:
+                    return token.HasValues;
+            }
+        }
+
+        static bool IsNumber(JToken token)
+        {
+            return token != null && (token.Type == JTokenType.Integer || token.Type == JTokenType.Float);
+        }
+
+        static bool Compare(string op, JToken field, JToken constant)
+        {
+            if (field == null) field = JValue.CreateNull();
+            if (op == "==") return JToken.DeepEquals(field, constant);
+            if (op == "!=") return !JToken.DeepEquals(field, constant);
+            int order;
+            // ordering only means something between two numbers or two strings
+            if (IsNumber(field) && IsNumber(constant))
+            {
+                order = ((double)field).CompareTo((double)constant);
+            }
+            else if (field.Type == JTokenType.String && constant.Type == JTokenType.String)
+            {
+                order = string.CompareOrdinal((string)field, (string)constant);
+            }
+            else
+            {
+                return false;
+            }
+            switch (op)
+            {
+                case "<": return order < 0;
+                case "<=": return order <= 0;
+                case ">": return order > 0;
+                case ">=": return order >= 0;
+                default: throw new ArgumentException($"Unknown comparison {op}");
+            }
+        }
+    }
+}
@@ -22,6 +22,8 @@ namespace StardewSpeak
 {
     class Requests
     {
+        // REQUEST_BATCH accepts {requests, itemResults} and reports errors per request
+        public const string BatchItemResultsCapability = "batch_item_results";
 
         public static dynamic HandleRequest(dynamic request)
         {
@@ -52,14 +54,31 @@ namespace StardewSpeak
                 case "HEARTBEAT": // engine will shutdown if heartbeat not received after 10 seconds
                     return null;
                 case "REQUEST_BATCH":
-                    var body = new List<dynamic>();
-                    foreach (dynamic batchedRequest in data) 
                     {
-                        string batchedMsgType = batchedRequest.type;
-                        dynamic batchedMsgData =JsonConvert.DeserializeObject(batchedRequest.data.ToString());
-                        body.Add(HandleRequestMessage(batchedMsgType, batchedMsgData));
+                        // a plain list fails as a whole, {requests, itemResults} answers each request separately
+                        bool itemResults = data is JObject && ((bool?)data.itemResults ?? false);
+                        var body = new List<dynamic>();
+                        foreach (dynamic batchedRequest in itemResults ? data.requests : data)
+                        {
+                            Cancellation.ThrowIfCurrentCancelled();
+                            string batchedMsgType = batchedRequest.type;
+                            dynamic batchedMsgData = JsonConvert.DeserializeObject(batchedRequest.data.ToString());
+                            if (!itemResults)
+                            {
+                                body.Add(HandleRequestMessage(batchedMsgType, batchedMsgData));
+                                continue;
+                            }
+                            try
+                            {
+                                body.Add(new { value = HandleRequestMessage(batchedMsgType, batchedMsgData), error = (string)null });
+                            }
+                            catch (Exception e) when (!(e is OperationCanceledException))
+                            {
+                                body.Add(new { value = e.ToString(), error = "STACK_TRACE" });
+                            }
+                        }
+                        return body;
                     }
-                    return body;
                 case "PLAYER_STATUS":
                     return GameState.PlayerStatus();
                 case "TOOL_STATUS":
@@ -96,15 +115,41 @@ namespace StardewSpeak
                         ModEntry.Streams = newStreams;
                         return true;
                     }
+                case "SET_STREAM_FILTER":
+                    {
+                        string streamId = data.stream_id;
+                        if (!ModEntry.Streams.TryGetValue(streamId, out Stream stream)) return false;
+                        stream.Where = data.where;
+                        return true;
+                    }
                 case "STOP_STREAM":
                     {
                         string streamId = data;
+                        if (ModEntry.Streams.TryGetValue(streamId, out Stream stream)) stream.Follower?.Cancel();
                         // shallow copy as naive but simple way to avoid multithreading issues
                         var newStreams = new Dictionary<string, Stream>(ModEntry.Streams);
                         newStreams.Remove(streamId);
                         ModEntry.Streams = newStreams;
                         return true;
                     }
+                case "UPDATE_PATH":
+                    {
+                        string streamId = data.stream_id;
+                        if (!ModEntry.Streams.TryGetValue(streamId, out Stream stream) || stream.Follower == null) return false;
+                        string location = data.location;
+                        int version = data.version;
+                        stream.Follower.Retarget(data.tiles, location, version);
+                        return true;
+                    }
+                case "STREAM_RESYNC":
+                    {
+                        string streamId = data;
+                        if (ModEntry.Streams.TryGetValue(streamId, out Stream stream))
+                        {
+                            stream.ResyncRequested = true;
+                        }
+                        return true;
+                    }
                 case "ROUTE":
                     {
                         GameLocation fromLocation = player.currentLocation;
@@ -155,6 +200,7 @@ namespace StardewSpeak
                         dynamic path = null;
                         while (testX != playerX || testY != playerY) 
                         {
+                            Cancellation.ThrowIfCurrentCancelled();
                             if (Pathfinder.Pathfinder.isTileWalkable(location, testX, testY))
                             {
                                 path = Pathfinder.Pathfinder.FindPath(location, testX, testY, playerX, playerY);
@@ -222,6 +268,7 @@ namespace StardewSpeak
                         if (!getPath) return sorted.Count > 0 ? sorted[0] : null;
                         foreach (var candidate in sorted)
                         {
+                            Cancellation.ThrowIfCurrentCancelled();
                             if (candidate.tileX == targetTileX && candidate.tileY == targetTileY) return candidate;
                             if (Utils.DistanceBeteenPoints(candidate.tileX, candidate.tileY, playerX, playerY) < 2) return candidate;
                             var pathTiles = Pathfinder.Pathfinder.FindPath(player.currentLocation,
@@ -230,6 +277,29 @@ namespace StardewSpeak
                         }
                         return null;
                     }
+                case "GET_PASSABILITY_GRID":
+                    {
+                        return CollisionGrid.Get(player.currentLocation);
+                    }
+                case "GET_GRID_VERSION":
+                    {
+                        return new { location = player.currentLocation.NameOrUniqueName, version = CollisionGrid.Version(player.currentLocation) };
+                    }
+                case "PATHS_TO_TILES":
+                    {
+                        List<dynamic> tiles = data.tiles.ToObject<List<dynamic>>();
+                        var targets = tiles.Select(tile => new Point((int)tile.tileX, (int)tile.tileY)).ToList();
+                        bool adjacent = data.adjacent;
+                        bool nearestOnly = data.nearestOnly;
+                        int cutoff = data.cutoff;
+                        var distances = Pathfinder.Pathfinder.DistancesToTiles(location, playerX, playerY, targets, adjacent, nearestOnly, cutoff);
+                        int? nearest = null;
+                        for (int i = 0; i < distances.Count; i++)
+                        {
+                            if (distances[i] != null && (nearest == null || distances[i] < distances[nearest.Value])) nearest = i;
+                        }
+                        return new { distances, nearest, location = location.NameOrUniqueName };
+                    }
                 case "PATH_TO_PLAYER":
                     {
                         int fromX = data.x;
@@ -271,6 +341,19 @@ namespace StardewSpeak
                         GameLocation fromLocation = player.currentLocation;
                         return Routing.MapConnections[fromLocation.NameOrUniqueName];
                     }
+                case "GET_ALL_LOCATION_CONNECTIONS":
+                    {
+                        return Routing.MapConnections;
+                    }
+                case "GET_CONNECTION_DISTANCES":
+                    {
+                        string locationName = data.location;
+                        return Routing.ConnectionDistances(locationName);
+                    }
+                case "GET_SAVE_KEY":
+                    {
+                        return Routing.SaveKey();
+                    }
                 case "GET_LADDERS_DOWN": 
                     {
                         var ladders = new List<dynamic>();
@@ -457,6 +540,8 @@ namespace StardewSpeak
                         }
                         return true;
                     }
+                case "GET_HELD_BUTTONS":
+                    return Input.Held.Keys.ToList();
                 case "RELEASE_ALL_KEYS":
                     {
                         Input.ClearHeld();
@@ -2,6 +2,7 @@
 using StardewModdingAPI.Events;
 using StardewValley;
 using StardewValley.Buildings;
+using Microsoft.Xna.Framework;
 using System;
 using System.Collections.Generic;
 using System.Linq;
@@ -13,6 +14,8 @@ namespace StardewSpeak
 
     public static class Routing
     {
+        // the client keeps its own table of routes and walking distances between connections for each save
+        public const string Capability = "route_table";
         private static bool Ready = false;
         public static Dictionary<string, List<LocationConnection>> MapConnections = new Dictionary<string, List<LocationConnection>>();
         public static Dictionary<string, GameLocation> MapNamesToLocations = new Dictionary<string, GameLocation>();
@@ -42,6 +45,46 @@ namespace StardewSpeak
             Ready = true;
         }
 
+        // Reset, returning the locations whose connections aren't the same anymore so the client only
+        // has to ask for those again
+        public static List<string> Refresh()
+        {
+            var before = MapConnections.ToDictionary(kv => kv.Key, kv => ConnectionsKey(kv.Value));
+            Reset();
+            var changed = new List<string>();
+            foreach (var kv in MapConnections)
+            {
+                if (!before.TryGetValue(kv.Key, out string key) || key != ConnectionsKey(kv.Value)) changed.Add(kv.Key);
+            }
+            changed.AddRange(before.Keys.Where(name => !MapConnections.ContainsKey(name)));
+            return changed;
+        }
+
+        private static string ConnectionsKey(List<LocationConnection> connections)
+        {
+            return string.Join(";", connections.Select(cn => $"{cn.TargetName},{cn.X},{cn.Y},{cn.IsDoor}"));
+        }
+
+        public static dynamic SaveKey()
+        {
+            return new { saveId = Game1.uniqueIDForThisGame.ToString(), gameVersion = Game1.version };
+        }
+
+        // Walking distance from each of the location's connections to each other one in the order of
+        // MapConnections, null where there's no path. Connections count as reached from next to them
+        // like doors are walked up to.
+        public static List<List<int?>> ConnectionDistances(string locationName)
+        {
+            if (!MapNamesToLocations.TryGetValue(locationName, out GameLocation location)) return null;
+            var targets = MapConnections[locationName].Select(cn => new Point(cn.X, cn.Y)).ToList();
+            var distances = new List<List<int?>>(targets.Count);
+            foreach (var start in targets)
+            {
+                distances.Add(Pathfinder.Pathfinder.DistancesToTiles(location, start.X, start.Y, targets, true, false));
+            }
+            return distances;
+        }
+
         public static GameLocation FindLocationByName(string name)
         {
             foreach (var gl in AllGameLocations()) {
@@ -26,14 +26,20 @@ namespace StardewSpeak
         private readonly object StandardInLock;
         public readonly object RequestQueueLock;
         public ConcurrentQueue<dynamic> UpdateTickedRequestQueue;
+        // messages the client marks as input, handled each tick before anything in UpdateTickedRequestQueue
+        public ConcurrentQueue<dynamic> UpdateTickedInputQueue;
+        public const string InputLane = "input";
         public ConcurrentQueue<dynamic> UpdateTickingRequestQueue;
         public readonly Action<Process, TaskCompletionSource<int>> OnExit;
         public HashSet<string> UnvalidatedModeAllowableMessageTypes = new HashSet<string> { 
-            "HEARTBEAT", "REQUEST_BATCH", "NEW_STREAM", "STOP_STREAM", "GET_ACTIVE_MENU", "GET_MOUSE_POSITION",
+            "HEARTBEAT", "REQUEST_BATCH", "NEW_STREAM", "STOP_STREAM", "STREAM_RESYNC", "SET_STREAM_FILTER", "GET_ACTIVE_MENU", "GET_MOUSE_POSITION",
             "SET_MOUSE_POSITION", "SET_MOUSE_POSITION_RELATIVE", "MOUSE_CLICK", "UPDATE_HELD_BUTTONS", "RELEASE_ALL_KEYS",
-            "PRESS_KEY"
+            "PRESS_KEY", "GET_HELD_BUTTONS"
         };
         public bool Running = false;
+        public static readonly string[] Capabilities = { Framing.MsgPackCapability, Requests.BatchItemResultsCapability, Predicate.StreamFilterCapability, CollisionGrid.Capability, Pathfinder.Pathfinder.PathsToTilesCapability, Routing.Capability, PathFollower.Capability, Input.HeldButtonsCapability };
+        private string OutboundFraming = Framing.Lines;
+        public static readonly JsonSerializer Serializer = CreateSerializer();
 
         public SpeechEngine(Action<Process, TaskCompletionSource<int>> onExit)
         {
@@ -41,9 +47,17 @@ namespace StardewSpeak
             this.StandardInLock = new object();
             this.RequestQueueLock = new object();
             this.UpdateTickedRequestQueue = new ConcurrentQueue<dynamic>();
+            this.UpdateTickedInputQueue = new ConcurrentQueue<dynamic>();
             this.UpdateTickingRequestQueue = new ConcurrentQueue<dynamic>();
         }
 
+        private static JsonSerializer CreateSerializer()
+        {
+            var settings = new JsonSerializerSettings() { ReferenceLoopHandling = ReferenceLoopHandling.Ignore };
+            settings.Error = (serializer, err) => err.ErrorContext.Handled = true;
+            return JsonSerializer.Create(settings);
+        }
+
         public void LaunchProcess()
         {
             string rootDir = Path.GetDirectoryName(Assembly.GetExecutingAssembly().Location);
@@ -59,6 +73,11 @@ namespace StardewSpeak
                 string executable = Path.Combine(pythonRoot, @"speech-client.exe");
                 string arguments = $"--python_root \"{pythonRoot}\"";
 #endif
+            arguments += $" --mod_capabilities {string.Join(",", Capabilities)}";
+            if (ModEntry.Config.RecordTraffic) arguments += " --record_traffic";
+            if (ModEntry.Config.AutoBatchRequests) arguments += " --auto_batch";
+            if (!string.IsNullOrEmpty(ModEntry.Config.PathMode)) arguments += $" --path_mode {ModEntry.Config.PathMode}";
+            this.OutboundFraming = Framing.Lines;
             Task.Factory.StartNew(() => RunProcessAsync("\"" + executable + "\"", arguments));
         }
 
@@ -106,7 +125,6 @@ namespace StardewSpeak
             var tcs = new TaskCompletionSource<int>();
 
             process.Exited += (s, ea) => HandleExited(process, tcs);
-            process.OutputDataReceived += (s, ea) => this.OnMessage(ea.Data);
             process.ErrorDataReceived += (s, ea) => this.onError("ERR: " + ea.Data);
 
             bool started = process.Start();
@@ -117,23 +135,58 @@ namespace StardewSpeak
                 throw new InvalidOperationException("Could not start process: " + process);
             }
 
-            process.BeginOutputReadLine();
+            Task.Factory.StartNew(() => this.ReadMessages(process), TaskCreationOptions.LongRunning);
             process.BeginErrorReadLine();
             return tcs.Task;
         }
 
-        void OnMessage(string messageText)
+        void ReadMessages(Process process)
         {
-            dynamic msg;
-            try
+            var reader = new MessageReader(process.StandardOutput.BaseStream);
+            while (true)
             {
-                msg = JsonConvert.DeserializeObject(messageText);
+                dynamic msg;
+                try
+                {
+                    msg = reader.Read();
+                }
+                catch (IOException)
+                {
+                    return;
+                }
+                catch (Exception e)
+                {
+                    // invalid JSON line or MessagePack payload, the frame boundaries are still intact
+                    this.onError($"Unable to read message: {e.Message}");
+                    continue;
+                }
+                if (msg == null) return;
+                string msgType = msg.type;
+                if (msgType == "SET_FRAMING")
+                {
+                    string framing = msg.data;
+                    reader.Framing = framing;
+                    this.SetOutboundFraming(framing);
+                    continue;
+                }
+                this.OnMessage(msg);
             }
-            catch
+        }
+
+        void SetOutboundFraming(string framing)
+        {
+            var ack = new MessageToEngine("FRAMING_CHANGED", framing);
+            lock (this.StandardInLock)
             {
-                return;
+                // acknowledge with the old framing so the client knows exactly where the switch happens
+                this.WriteMessage(ack);
+                this.OutboundFraming = framing;
             }
-                string msgType = msg.type;
+        }
+
+        void OnMessage(dynamic msg)
+        {
+            string msgType = msg.type;
             if (msgType == "LOG")
             {
                 string toLog = msg.data.value;
@@ -144,16 +197,33 @@ namespace StardewSpeak
             //{
             //    UpdateTickedRequestQueue.Enqueue(msg);
             //}
+            else if (msgType == "CANCEL_REQUEST")
+            {
+                // handled right away so a request that is already running can see it
+                string cancelId = msg.data;
+                Cancellation.Cancel(cancelId);
+            }
             else
             {
-                UpdateTickedRequestQueue.Enqueue(msg);
+                string msgId = msg.id;
+                string lane = msg.lane;
+                Cancellation.Received(msgId);
+                if (lane == InputLane) UpdateTickedInputQueue.Enqueue(msg);
+                else UpdateTickedRequestQueue.Enqueue(msg);
             }
         }
 
         public void RespondToMessage(dynamic msg, string gameLoopContext) 
         {   
             dynamic resp;
+            string msgId = msg.id;
             bool unvalidatedGameContext = gameLoopContext == "UnvalidatedUpdateTicked";
+            if (Cancellation.IsCancelled(msgId))
+            {
+                Cancellation.Finished(msgId);
+                return;
+            }
+            Cancellation.CurrentRequestId = msgId;
             try
             {
                 string msgType = msg.type;
@@ -170,7 +240,14 @@ namespace StardewSpeak
                 string error = "STACK_TRACE";
                 resp = new { body, error };
             }
-            string msgId = msg.id;
+            finally
+            {
+                Cancellation.CurrentRequestId = null;
+            }
+            // the client already dropped its future for cancelled requests
+            bool cancelled = Cancellation.IsCancelled(msgId);
+            Cancellation.Finished(msgId);
+            if (cancelled) return;
             this.SendResponse(msgId, resp.body, resp.error);
         }
 
@@ -192,14 +269,11 @@ namespace StardewSpeak
         {
             if (!this.Running) return false;
             var message = new MessageToEngine(msgType, data);
-            var settings = new JsonSerializerSettings() { ReferenceLoopHandling = ReferenceLoopHandling.Ignore };
-            settings.Error = (serializer, err) => err.ErrorContext.Handled = true;
-            string msgStr = JsonConvert.SerializeObject(message, Formatting.None, settings);
             lock (this.StandardInLock) 
             {
                 try
                 {
-                    this.Proc.StandardInput.WriteLine(msgStr);
+                    this.WriteMessage(message);
                 }
                 catch (System.InvalidOperationException e) 
                 {
@@ -209,6 +283,24 @@ namespace StardewSpeak
             return true;
         }
 
+        // caller must hold StandardInLock
+        private void WriteMessage(MessageToEngine message)
+        {
+            if (this.OutboundFraming == Framing.MsgPack)
+            {
+                byte[] frame = Framing.EncodeFrame(JToken.FromObject(message, Serializer));
+                var stdin = this.Proc.StandardInput.BaseStream;
+                stdin.Write(frame, 0, frame.Length);
+                stdin.Flush();
+            }
+            else
+            {
+                var sw = new StringWriter();
+                Serializer.Serialize(sw, message);
+                this.Proc.StandardInput.WriteLine(sw.ToString());
+            }
+        }
+
         public void SendEvent(string eventType, object data = null) {
             var msg = new { eventType, data };
             this.SendMessage("EVENT", msg);
@@ -1,4 +1,5 @@
 ﻿using Microsoft.Xna.Framework;
+using Newtonsoft.Json.Linq;
 using StardewModdingAPI.Events;
 using StardewValley;
 using System;
@@ -15,11 +16,71 @@ namespace StardewSpeak
         public string Name;
         public string Id;
         public dynamic Data;
+        // Delta streams send a full snapshot first and afterwards only the keys and array slots that changed
+        public bool Delta;
+        public bool ResyncRequested;
+        // set by SET_STREAM_FILTER, frames that don't match aren't sent at all
+        public JToken Where;
+        // steers the player for FOLLOW_PATH streams, their frames come from it instead of a request
+        public PathFollower Follower;
+        private JToken LastValue;
+        private int Sequence;
         public Stream(string name, string id, dynamic streamData) 
         {
             this.Name = name;
             this.Id = id;
             this.Data = streamData;
+            var dataObj = streamData as JObject;
+            this.Delta = dataObj != null && dataObj.Value<bool?>("delta") == true;
+            if (name == PathFollower.StreamName) this.Follower = new PathFollower(streamData);
+        }
+
+        public bool Matches(object value)
+        {
+            if (this.Where == null || this.Where.Type == JTokenType.Null) return true;
+            JToken current = value == null ? JValue.CreateNull() : JToken.FromObject(value, SpeechEngine.Serializer);
+            return Predicate.Evaluate(this.Where, current);
+        }
+
+        public object NextValue(object value)
+        {
+            if (!this.Delta) return value;
+            JToken current = value == null ? JValue.CreateNull() : JToken.FromObject(value, SpeechEngine.Serializer);
+            var last = this.LastValue as JObject;
+            var currentObj = current as JObject;
+            this.LastValue = current;
+            this.Sequence++;
+            if (this.ResyncRequested || last == null || currentObj == null)
+            {
+                this.ResyncRequested = false;
+                return new { seq = this.Sequence, full = true, value = current };
+            }
+            var changed = new JObject();
+            var slots = new JObject();
+            var removed = new JArray();
+            foreach (var prop in currentObj.Properties())
+            {
+                JToken prev = last[prop.Name];
+                if (prev != null && JToken.DeepEquals(prev, prop.Value)) continue;
+                if (prev is JArray prevArr && prop.Value is JArray arr && prevArr.Count == arr.Count)
+                {
+                    var changedSlots = new JObject();
+                    for (int i = 0; i < arr.Count; i++)
+                    {
+                        if (!JToken.DeepEquals(prevArr[i], arr[i])) changedSlots[i.ToString()] = arr[i];
+                    }
+                    slots[prop.Name] = changedSlots;
+                }
+                else
+                {
+                    changed[prop.Name] = prop.Value;
+                }
+            }
+            foreach (var prop in last.Properties())
+            {
+                if (currentObj[prop.Name] == null) removed.Add(prop.Name);
+            }
+            return new { seq = this.Sequence, full = false, changed, slots, removed };
         }
         public static List<dynamic> MessageStreams(Dictionary<string, Stream> streams, string streamName, dynamic messageValue) 
         {
@@ -0,0 +1,123 @@
+'''
+Swings, tiles walked and time taken watering a big field and tilling a big plot with a tool swung
+at each tile versus charged over tour.plan_swings areas, run against standin/mod_standin.py.
+
+    python benchmarks/bench_aoe.py [--crops 400] [--plot 20x16] [--levels 1,2,3,4] [--tps 300]
+
+The field is planted at random like bench_tour's so what's left to water isn't a neat rectangle,
+and the plot is tilled with HoePlotObjective from the player's tile with a few blocked tiles in it.
+left is what's still unwatered or untilled at the end.
+Each task is run once swinging at each tile and once planned for each of --levels, with the hoe and
+watering can upgraded to that level. ticks is game time, a minute is 3600 of them, and seconds is
+how long the run took here.
+'''
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STANDIN = os.path.join(ROOT, 'standin', 'mod_standin.py')
+RUN_CLIENT = os.path.join(ROOT, 'standin', 'run_client.py')
+
+WIDTH, HEIGHT = 64, 52
+# x, y, width, height
+FIELD = (5, 5, 26, 16)
+START = (30, 23)
+
+
+def make_scenario(task, args, level, seed):
+    rng = random.Random(seed)
+    rows = [['.'] * WIDTH for _ in range(HEIGHT)]
+    for x in range(WIDTH):
+        rows[0][x] = rows[HEIGHT - 1][x] = '#'
+    for y in range(HEIGHT):
+        rows[y][0] = rows[y][WIDTH - 1] = '#'
+    if task == 'water':
+        px, py, w, h = FIELD
+    else:
+        # HoePlotObjective goes west and south from the tile in front of the player
+        w, h = args.plot
+        px, py = START[0] - w + 1, START[1] + 1
+    area = [(x, y) for x in range(px, px + w) for y in range(py, py + h)]
+    blocked = set(rng.sample(area, len(area) // 40))
+    for x, y in blocked:
+        rows[y][x] = '#'
+    open_tiles = [t for t in area if t not in blocked]
+    hoe_dirt = []
+    if task == 'water':
+        crop = {'currentPhase': 2, 'dead': False, 'fullyGrown': False}
+        planted = rng.sample(open_tiles, args.crops)
+        hoe_dirt = [{'tileX': x, 'tileY': y, 'crop': crop} for x, y in planted]
+    items = [
+        {'name': 'Watering Can', 'isTool': True, 'type': 'wateringCan', 'upgradeLevel': level},
+        {'name': 'Hoe', 'isTool': True, 'type': 'hoe', 'upgradeLevel': level},
+    ] + [None] * 10
+    scenario = {
+        'player': {'location': 'Farm', 'tileX': START[0], 'tileY': START[1], 'facingDirection': 2, 'currentToolIndex': 0, 'items': items},
+        'locations': {
+            'Farm': {'map': [''.join(r) for r in rows], 'hoeDirt': hoe_dirt},
+        },
+    }
+    return scenario, len(open_tiles)
+
+def run_once(args, task, level, planning):
+    scenario, diggable = make_scenario(task, args, level, args.seed)
+    fd, scenario_path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(scenario, f)
+    fd, out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    fd, client_out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    if task == 'water':
+        entry = 'objective.WaterCropsObjective().wrap_run()'
+    else:
+        entry = f'objective.HoePlotObjective({args.plot[0]}, {args.plot[1]}).wrap_run()'
+    client = [sys.executable, RUN_CLIENT, entry, '--out', client_out]
+    if not planning:
+        client.append('--no_aoe_planning')
+    standin = [sys.executable, STANDIN, scenario_path, '--tps', str(args.tps), '--out', out]
+    try:
+        subprocess.run(standin + ['--'] + client, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=3600)
+        with open(out) as f:
+            summary = json.load(f)
+        with open(client_out) as f:
+            summary['client_seconds'] = json.load(f)['seconds']
+        summary['left'] = summary['remaining'].get('unwatered', 0) if task == 'water' else diggable - summary['hoe_dirt']
+        return summary
+    finally:
+        os.remove(scenario_path)
+        os.remove(out)
+        os.remove(client_out)
+
+def plot_size(value):
+    w, h = value.split('x')
+    return int(w), int(h)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare swinging at each tile with charged swings planned over areas')
+    parser.add_argument('--crops', type=int, default=400)
+    parser.add_argument('--plot', type=plot_size, default=(20, 16), help='Plot to till, WIDTHxHEIGHT')
+    parser.add_argument('--levels', default='1,2,3,4', help='Upgrade levels to plan charged swings for')
+    parser.add_argument('--task', choices=('water', 'hoe', 'both'), default='both')
+    parser.add_argument('--tps', type=float, default=300, help='Stand-in ticks per second')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    levels = [int(x) for x in args.levels.split(',')]
+    tasks = ('water', 'hoe') if args.task == 'both' else (args.task,)
+    print(f"{'task':<7}{'swings at':<11}{'level':>6}{'swings':>8}{'tiles':>7}{'ticks':>8}{'seconds':>9}{'left':>6}")
+    for task in tasks:
+        # the per tile loop doesn't charge, so the level it's run with doesn't matter
+        for level, planning in [(max(levels), False)] + [(level, True) for level in levels]:
+            summary = run_once(args, task, level, planning)
+            mode = 'areas' if planning else 'each tile'
+            print(f"{task:<7}{mode:<11}{level:>6}{summary['tool_swings']:>8}{summary['tiles_walked']:>7}{summary['ticks']:>8}"
+                f"{summary['client_seconds']:>9.1f}{summary['left']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+'''
+Round trips to the mod per objective with auto batching off and on, run against standin/mod_standin.py.
+
+    python benchmarks/bench_batching.py [--scenario standin/scenarios/farm.json] [--tps 300] [--runs 3]
+
+A round trip is a message the mod answers, so a REQUEST_BATCH counts once however many requests it
+carries. Fire and forget messages like most UPDATE_HELD_BUTTONS, NEW_STREAM and LOG aren't counted.
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STANDIN = os.path.join(ROOT, 'standin', 'mod_standin.py')
+RUN_CLIENT = os.path.join(ROOT, 'standin', 'run_client.py')
+
+OBJECTIVES = {
+    'clear weeds': "objective.ClearDebrisObjective('Weeds').wrap_run()",
+    'water crops': "objective.WaterCropsObjective().wrap_run()",
+    'harvest crops': "objective.HarvestCropsObjective().wrap_run()",
+}
+
+
+def run_once(scenario, tps, entry, auto_batch):
+    fd, out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    client = [sys.executable, RUN_CLIENT, entry, '--out', out]
+    if auto_batch:
+        client.append('--auto_batch')
+    try:
+        subprocess.run([sys.executable, STANDIN, scenario, '--tps', str(tps), '--'] + client,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=600)
+        with open(out) as f:
+            summary = json.load(f)
+    finally:
+        os.remove(out)
+    requests = summary['requests']
+    # requests answered inside a batch show up as responses that were never sent on their own
+    round_trips = sum(min(v['sent'], v['responses']) for v in requests.values())
+    batches = requests.get('REQUEST_BATCH', {}).get('sent', 0)
+    return {
+        'seconds': summary['seconds'],
+        'round_trips': round_trips,
+        'batches': batches,
+        'batched': sum(summary['outstanding_requests']['batched'].values()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare round trips with and without auto batching')
+    parser.add_argument('--scenario', default=os.path.join(ROOT, 'standin', 'scenarios', 'farm.json'))
+    parser.add_argument('--tps', type=float, default=300)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    print(f"{'objective':<16}{'batching':>9}{'round trips':>13}{'batches':>9}{'batched':>9}{'seconds':>9}")
+    for name, entry in OBJECTIVES.items():
+        for auto_batch in (False, True):
+            results = [run_once(args.scenario, args.tps, entry, auto_batch) for _ in range(args.runs)]
+            median = lambda k: statistics.median(r[k] for r in results)
+            print(f"{name:<16}{'on' if auto_batch else 'off':>9}{median('round_trips'):>13}{median('batches'):>9}"
+                f"{median('batched'):>9}{median('seconds'):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
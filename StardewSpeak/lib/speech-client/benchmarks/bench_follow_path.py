@@ -0,0 +1,69 @@
+'''
+Messages per tile and turn overshoot with the client steering along a path from status frames versus
+the mod following it with FOLLOW_PATH, run against standin/mod_standin.py.
+
+    python benchmarks/bench_follow_path.py [--bulk_cost_ms 8] [--load_tasks 4] [--tps 60]
+
+The client walks between a few far apart tiles, once on its own and then while --load_tasks
+background tasks keep requesting GET_LOCATION_OBJECTS, each of which takes --bulk_cost_ms in the
+stand-in, with the input lane on and off. Without it steering waits behind the queries like it
+waits on a slow pipe. held/tile is the UPDATE_HELD_BUTTONS the stand-in handled per tile walked,
+path/tile the FOLLOW_PATH frames and UPDATE_PATH messages. Overshoot is how far past the tile
+center the player was when it turned, negative when it turned early. This runs in real time since
+latency is measured against ticks.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STANDIN = os.path.join(ROOT, 'standin', 'mod_standin.py')
+RUN_CLIENT = os.path.join(ROOT, 'standin', 'run_client.py')
+
+WAYPOINTS = ((28, 19), (2, 19), (28, 1), (12, 12), (2, 2), (20, 20))
+LOAD = "server.request('GET_LOCATION_OBJECTS', {'location': 'Farm'}, dedupe=False)"
+
+
+def run_once(args, follow_path, load_tasks, priority_lanes):
+    fd, out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    entries = [f'game.pathfind_to_tile({x}, {y}, server.player_status_stream())' for x, y in WAYPOINTS]
+    client = [sys.executable, RUN_CLIENT, *entries]
+    if load_tasks:
+        client += ['--load', LOAD, '--load_interval', '0', '--load_tasks', str(load_tasks)]
+    if not priority_lanes:
+        client.append('--no_priority_lanes')
+    standin = [sys.executable, STANDIN, args.scenario, '--tps', str(args.tps), '--bulk_cost_ms', str(args.bulk_cost_ms), '--out', out]
+    if not follow_path:
+        standin.append('--no_follow_path')
+    try:
+        subprocess.run(standin + ['--'] + client, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=600)
+        with open(out) as f:
+            return json.load(f)
+    finally:
+        os.remove(out)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare steering from the client with FOLLOW_PATH')
+    parser.add_argument('--scenario', default=os.path.join(ROOT, 'standin', 'scenarios', 'farm.json'))
+    parser.add_argument('--tps', type=float, default=60)
+    parser.add_argument('--bulk_cost_ms', type=float, default=8)
+    parser.add_argument('--load_tasks', type=int, default=4)
+    args = parser.parse_args()
+    print(f"{'steering':<10}{'load':>5}{'lane':>6}{'tiles':>7}{'held/tile':>11}{'path/tile':>11}{'turns':>7}{'overshoot mean':>16}{'p95':>8}{'max':>8}")
+    for load_tasks, priority_lanes in ((0, True), (args.load_tasks, True), (args.load_tasks, False)):
+        for follow_path in (False, True):
+            summary = run_once(args, follow_path, load_tasks, priority_lanes)
+            tiles = summary['tiles_walked']
+            held = summary['handled'].get('UPDATE_HELD_BUTTONS', 0) / tiles
+            path = (summary['stream_frames'].get('FOLLOW_PATH', 0) + summary['handled'].get('UPDATE_PATH', 0)) / tiles
+            overshoot = summary['overshoot_px']
+            print(f"{'mod' if follow_path else 'client':<10}{load_tasks:>5}{'on' if priority_lanes else 'off':>6}{tiles:>7}{held:>11.2f}{path:>11.2f}{summary['turns']:>7}"
+                f"{overshoot['mean']:>16}{overshoot['p95']:>8}{overshoot['max']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+'''
+Compare newline delimited JSON against length prefixed MessagePack frames.
+
+    python benchmarks/bench_framing.py [traffic.jsonl]
+
+traffic.jsonl is recorded pipe traffic, one JSON message per line. Without it a synthetic
+60 Hz PLAYER_STATUS/TOOL_STATUS stream with occasional path responses is used.
+'''
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'speech-client'))
+
+import framing
+
+
+def synthetic_traffic(n=20000):
+    rng = random.Random(0)
+    messages = []
+    for i in range(n):
+        x, y = rng.uniform(0, 80 * 64), rng.uniform(0, 65 * 64)
+        status = {
+            "location": "Farm",
+            "position": [x, y],
+            "center": [int(x) + 32, int(y) + 32],
+            "tileX": int(x // 64),
+            "tileY": int(y // 64),
+            "canMove": True,
+            "facingDirection": rng.randint(0, 3),
+            "isMoving": rng.random() > 0.5,
+            "lastWarp": None,
+            "currentEvent": None,
+        }
+        messages.append({"type": "STREAM_MESSAGE", "id": None, "data": {"stream_id": "UPDATE_TICKED_1", "value": status, "error": None}})
+        if i % 50 == 0:
+            path = [{"X": rng.randint(0, 80), "Y": rng.randint(0, 65)} for _ in range(40)]
+            messages.append({"type": "RESPONSE", "id": None, "data": {"id": str(i), "value": path, "error": None}})
+    return messages
+
+def load_traffic(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def run(name, framing_name, messages):
+    encoder = framing.Encoder(framing_name)
+    start = time.perf_counter()
+    encoded = b''.join(encoder.encode(m) for m in messages)
+    encode_time = time.perf_counter() - start
+    decoder = framing.Decoder(framing_name)
+    start = time.perf_counter()
+    # feed in pipe sized chunks like the reader does
+    for i in range(0, len(encoded), 65536):
+        decoder.feed(encoded[i:i + 65536])
+    decode_time = time.perf_counter() - start
+    n = len(messages)
+    print(f'{name:>8}: {len(encoded) / n:8.1f} bytes/msg  encode {encode_time / n * 1e6:6.2f} us/msg  '
+        f'decode {decode_time / n * 1e6:6.2f} us/msg  {n / (encode_time + decode_time):10.0f} msg/s')
+
+def main():
+    messages = load_traffic(sys.argv[1]) if len(sys.argv) > 1 else synthetic_traffic()
+    print(f'{len(messages)} messages')
+    run('json', framing.LINES, messages)
+    if framing.msgpack is None:
+        print('msgpack is not installed, skipping binary framing')
+        return
+    run('msgpack', framing.MSGPACK, messages)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+'''
+UPDATE_HELD_BUTTONS sent and suppressed by game.HeldButtons on a long walk steered from the client,
+with diffing on and off, run against standin/mod_standin.py.
+
+    python benchmarks/bench_held_buttons.py [--laps 3] [--tps 300]
+
+The client walks between a few far apart tiles --laps times with the stand-in's FOLLOW_PATH off,
+so Path.move_update asks for the held buttons on every status frame. handled is what the stand-in
+got, checks the GET_HELD_BUTTONS requests reconciling sent and corrected how many of those found
+held buttons that weren't what the client thought.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STANDIN = os.path.join(ROOT, 'standin', 'mod_standin.py')
+RUN_CLIENT = os.path.join(ROOT, 'standin', 'run_client.py')
+
+WAYPOINTS = ((28, 19), (2, 19), (28, 1), (12, 12), (2, 2), (20, 20))
+
+
+def run_once(args, diffing):
+    fd, out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    fd, client_out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    entries = [f'game.pathfind_to_tile({x}, {y}, server.player_status_stream())' for x, y in WAYPOINTS] * args.laps
+    client = [sys.executable, RUN_CLIENT, *entries, '--out', client_out]
+    if not diffing:
+        client.append('--no_held_button_diffing')
+    standin = [sys.executable, STANDIN, args.scenario, '--tps', str(args.tps), '--no_follow_path', '--out', out]
+    try:
+        subprocess.run(standin + ['--'] + client, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=3600)
+        with open(out) as f:
+            summary = json.load(f)
+        with open(client_out) as f:
+            summary['client'] = json.load(f)
+        return summary
+    finally:
+        os.remove(out)
+        os.remove(client_out)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare held button updates with and without diffing')
+    parser.add_argument('--scenario', default=os.path.join(ROOT, 'standin', 'scenarios', 'farm.json'))
+    parser.add_argument('--laps', type=int, default=3)
+    parser.add_argument('--tps', type=float, default=300, help='Stand-in ticks per second')
+    args = parser.parse_args()
+    print(f"{'diffing':<9}{'tiles':>7}{'sent':>7}{'suppressed':>12}{'rate':>7}{'handled':>9}{'per tile':>10}{'checks':>8}{'corrected':>11}{'overshoot mean':>16}")
+    for diffing in (False, True):
+        summary = run_once(args, diffing)
+        held = summary['client']['held_buttons']
+        tiles = summary['tiles_walked']
+        handled = summary['handled'].get('UPDATE_HELD_BUTTONS', 0)
+        rate = '-' if held['suppressed_rate'] is None else f"{held['suppressed_rate']:.0%}"
+        print(f"{'on' if diffing else 'off':<9}{tiles:>7}{held['sent']:>7}{held['suppressed']:>12}{rate:>7}{handled:>9}{handled / tiles:>10.2f}"
+            f"{summary['handled'].get('GET_HELD_BUTTONS', 0):>8}{held['corrected']:>11}{summary['overshoot_px']['mean']:>16}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+'''
+Turn latency and overshoot while walking with location wide queries queued up, with the input lane
+off and on, run against standin/mod_standin.py.
+
+    python benchmarks/bench_input_lanes.py [--bulk_cost_ms 8] [--load_tasks 4] [--tps 60]
+
+The client walks between a few far apart tiles while --load_tasks background tasks keep requesting
+GET_LOCATION_OBJECTS, each of which takes --bulk_cost_ms in the stand-in. Turn latency is how long an
+UPDATE_HELD_BUTTONS that changes direction waited in the stand-in before it was handled. Overshoot is
+how far past the tile center the player was when it turned, negative when it turned early.
+This runs in real time since latency is measured against ticks.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STANDIN = os.path.join(ROOT, 'standin', 'mod_standin.py')
+RUN_CLIENT = os.path.join(ROOT, 'standin', 'run_client.py')
+
+WAYPOINTS = ((28, 19), (2, 19), (28, 1), (12, 12), (2, 2), (20, 20))
+LOAD = "server.request('GET_LOCATION_OBJECTS', {'location': 'Farm'}, dedupe=False)"
+
+
+def run_once(args, priority_lanes):
+    fd, out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    entries = [f'game.pathfind_to_tile({x}, {y}, server.player_status_stream())' for x, y in WAYPOINTS]
+    client = [sys.executable, RUN_CLIENT, *entries, '--load', LOAD, '--load_interval', '0', '--load_tasks', str(args.load_tasks)]
+    if not priority_lanes:
+        client.append('--no_priority_lanes')
+    standin = [sys.executable, STANDIN, args.scenario, '--tps', str(args.tps), '--bulk_cost_ms', str(args.bulk_cost_ms), '--out', out]
+    try:
+        subprocess.run(standin + ['--'] + client, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=600)
+        with open(out) as f:
+            return json.load(f)
+    finally:
+        os.remove(out)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare turn latency and overshoot with and without the input lane')
+    parser.add_argument('--scenario', default=os.path.join(ROOT, 'standin', 'scenarios', 'farm.json'))
+    parser.add_argument('--tps', type=float, default=60)
+    parser.add_argument('--bulk_cost_ms', type=float, default=8)
+    parser.add_argument('--load_tasks', type=int, default=4)
+    args = parser.parse_args()
+    print(f"{'input lane':<12}{'turns':>7}{'latency mean':>14}{'p95':>8}{'max':>8}{'overshoot mean':>16}{'p95':>8}{'max':>8}")
+    for priority_lanes in (False, True):
+        summary = run_once(args, priority_lanes)
+        latency, overshoot = summary['turn_latency_ms'], summary['overshoot_px']
+        print(f"{'on' if priority_lanes else 'off':<12}{summary['turns']:>7}{latency['mean']:>14}{latency['p95']:>8}{latency['max']:>8}"
+            f"{overshoot['mean']:>16}{overshoot['p95']:>8}{overshoot['max']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+'''
+Paths the client searches for or asks the mod for on the same trips over and over, with and without
+game.PathCache, run against standin/mod_standin.py.
+
+    python benchmarks/bench_path_cache.py [--rounds 10] [--tps 300] [--seed 0]
+
+Each round goes from the farmhouse to the bus stop and back, stepping a few tiles off the way home
+on the farm first, like a player who stopped to look at something. So the farm legs repeat exactly
+except the last one, which starts near a path that was cached before. mod requests is how many
+path_to_tile and PATH_TO_PLAYER requests the stand-in answered, saved is the client's estimate of
+the seconds the cache hits saved.
+'''
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STANDIN = os.path.join(ROOT, 'standin', 'mod_standin.py')
+RUN_CLIENT = os.path.join(ROOT, 'standin', 'run_client.py')
+
+WIDTH, HEIGHT = 64, 40
+# x, y, width, height of fences across the farm
+FENCES = ((12, 10, 30, 1), (20, 20, 40, 1), (6, 30, 30, 1), (45, 4, 1, 12))
+HOUSE_DOOR = 8, 3
+BUS_WARP = WIDTH - 1, 24
+PATH_REQUESTS = ('path_to_tile', 'PATH_TO_PLAYER')
+NORTH, SOUTH, WEST = 0, 2, 3
+
+
+def box(width, height):
+    rows = [['.'] * width for _ in range(height)]
+    for x in range(width):
+        rows[0][x] = rows[height - 1][x] = '#'
+    for y in range(height):
+        rows[y][0] = rows[y][width - 1] = '#'
+    return rows
+
+def make_scenario():
+    farm = box(WIDTH, HEIGHT)
+    for fx, fy, w, h in FENCES:
+        for x in range(fx, fx + w):
+            for y in range(fy, fy + h):
+                farm[y][x] = '#'
+    # the house, the door is in its front wall
+    for x in range(5, 12):
+        for y in range(1, 4):
+            farm[y][x] = '#'
+    farm[BUS_WARP[1]][BUS_WARP[0]] = '.'
+    house = box(10, 7)
+    house[6][4] = '.'
+    bus_stop = box(14, 10)
+    bus_stop[5][0] = '.'
+    return {
+        'player': {'location': 'FarmHouse', 'tileX': 4, 'tileY': 2, 'facingDirection': 2, 'currentToolIndex': 0, 'items': [None] * 12},
+        'locations': {
+            'Farm': {'map': [''.join(r) for r in farm], 'connections': [
+                {'TargetName': 'FarmHouse', 'X': HOUSE_DOOR[0], 'Y': HOUSE_DOOR[1], 'IsDoor': True, 'TargetX': 4, 'TargetY': 5},
+                {'TargetName': 'BusStop', 'X': BUS_WARP[0], 'Y': BUS_WARP[1], 'IsDoor': False, 'TargetX': 1, 'TargetY': 5},
+            ]},
+            'FarmHouse': {'map': [''.join(r) for r in house], 'outdoors': False, 'connections': [
+                {'TargetName': 'Farm', 'X': 4, 'Y': 6, 'IsDoor': False, 'TargetX': HOUSE_DOOR[0], 'TargetY': HOUSE_DOOR[1] + 1},
+            ]},
+            'BusStop': {'map': [''.join(r) for r in bus_stop], 'connections': [
+                {'TargetName': 'Farm', 'X': 0, 'Y': 5, 'IsDoor': False, 'TargetX': BUS_WARP[0] - 1, 'TargetY': BUS_WARP[1]},
+            ]},
+        },
+    }
+
+def move_to(location):
+    return f"objective.MoveToLocationObjective(__import__('types').SimpleNamespace(name='{location}')).wrap_run()"
+
+def make_trips(rounds, seed):
+    rng = random.Random(seed)
+    trips = []
+    for _ in range(rounds):
+        trips += [move_to('BusStop'), move_to('Farm')]
+        trips.append(f'objective.MoveNTilesObjective({rng.choice((NORTH, SOUTH, WEST))}, {rng.randint(1, 3)}).wrap_run()')
+        trips.append(move_to('FarmHouse'))
+    return trips
+
+def run_once(args, scenario_path, trips, path_mode, caching):
+    fd, out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    fd, client_out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    client = [sys.executable, RUN_CLIENT] + trips + ['--path_mode', path_mode, '--out', client_out]
+    if not caching:
+        client.append('--no_path_cache')
+    standin = [sys.executable, STANDIN, scenario_path, '--tps', str(args.tps), '--out', out]
+    try:
+        subprocess.run(standin + ['--'] + client, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=3600)
+        with open(out) as f:
+            summary = json.load(f)
+        with open(client_out) as f:
+            summary['client'] = json.load(f)
+        return summary
+    finally:
+        os.remove(out)
+        os.remove(client_out)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare path searches with and without the path cache')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--tps', type=float, default=300, help='Stand-in ticks per second')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    trips = make_trips(args.rounds, args.seed)
+    fd, scenario_path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(make_scenario(), f)
+    print(f"{'paths':<7}{'cache':<7}{'searches':>9}{'mod requests':>14}{'hits':>32}{'hit rate':>10}{'saved':>8}{'seconds':>9}")
+    try:
+        for path_mode in ('local', 'mod'):
+            for caching in (False, True):
+                summary = run_once(args, scenario_path, trips, path_mode, caching)
+                client = summary['client']
+                cache = client['path_cache']
+                searches = client['paths'].get('local', 0) + client['paths'].get('mod', 0)
+                requests = sum(summary['handled'].get(r, 0) for r in PATH_REQUESTS)
+                hits = ' '.join(f'{k}={v}' for k, v in sorted(cache['hits'].items())) or '-'
+                hit_rate = '-' if cache['hit_rate'] is None else f"{cache['hit_rate']:.0%}"
+                print(f"{path_mode:<7}{'on' if caching else 'off':<7}{searches:>9}{requests:>14}{hits:>32}{hit_rate:>10}{cache['saved_seconds']:>8.3f}{client['seconds']:>9.1f}")
+    finally:
+        os.remove(scenario_path)
+
+
+if __name__ == '__main__':
+    main()
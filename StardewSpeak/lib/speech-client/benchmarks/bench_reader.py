@@ -0,0 +1,69 @@
+'''
+Per-message dispatch latency of the stdin readers: time from the write on the mod side of the pipe
+until the message reaches the event loop.
+
+    python benchmarks/bench_reader.py [n_ticks]
+
+A writer thread emits a burst of stream frames every 16 ms, like the mod does once per tick.
+The pipe reader only runs on POSIX.
+'''
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'speech-client'))
+
+import framing, server
+
+FRAMES_PER_TICK = 4
+
+
+def write_ticks(fd, n_ticks):
+    with os.fdopen(fd, 'wb') as f:
+        for i in range(n_ticks):
+            burst = b''.join(framing.encode_line({"type": "STREAM_MESSAGE", "data": {"sent": time.perf_counter(), "i": i}})
+                for _ in range(FRAMES_PER_TICK))
+            f.write(burst)
+            f.flush()
+            time.sleep(0.016)
+
+async def measure(reader_fn, n_ticks):
+    latencies = []
+    callbacks = 0
+
+    def on_messages(messages, sizes):
+        nonlocal callbacks
+        now = time.perf_counter()
+        callbacks += 1
+        for msg in messages:
+            latencies.append(now - msg['data']['sent'])
+
+    r, w = os.pipe()
+    threading.Thread(target=write_ticks, args=(w, n_ticks), daemon=True).start()
+    with os.fdopen(r, 'rb') as f:
+        await reader_fn(f, on_messages)
+    return latencies, callbacks
+
+def report(name, latencies, callbacks):
+    latencies = sorted(latencies)
+    p = lambda q: latencies[int(q * (len(latencies) - 1))] * 1e6
+    print(f'{name:>9}: {len(latencies)} msgs in {callbacks} callbacks  mean {statistics.mean(latencies) * 1e6:7.1f} us  '
+        f'p50 {p(0.5):7.1f} us  p99 {p(0.99):7.1f} us')
+
+def main():
+    n_ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    readers = [('threaded', server.read_messages_threaded)]
+    if sys.platform != 'win32':
+        readers.append(('pipe', server.read_messages_from_pipe))
+    for name, reader_fn in readers:
+        server.loop = asyncio.new_event_loop()
+        latencies, callbacks = server.loop.run_until_complete(measure(reader_fn, n_ticks))
+        server.loop.close()
+        report(name, latencies, callbacks)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+'''
+CPU and memory per 1-tick frame for plain dicts versus the slotted records in records.py.
+
+    python benchmarks/bench_records.py [n_frames] [--read_every 1 45]
+
+Each frame is decoded from the wire and one in every --read_every is read the way Path.move_update
+and facing_tile_center read a player status. dict never builds a record, eager builds one for every
+frame like ModStream did at first and lazy only for the frames that are read like it does now. A stand-in watering run at 60 ticks per
+second reads about one PLAYER_STATUS frame in 45, the rest are overwritten first. "peak" is the
+most memory allocated while handling one frame and "retained" is what is still allocated
+afterwards, mostly the value a cursor holds on to until the next frame.
+'''
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'speech-client'))
+
+import framing, records
+
+PLAYER_STATUS = {
+    'location': 'Farm', 'position': [1344.0, 1168.0], 'center': [1376, 1200], 'tileX': 21, 'tileY': 18,
+    'canMove': True, 'facingDirection': 1, 'isMoving': True, 'lastWarp': None, 'currentEvent': None,
+}
+
+
+def read_status_dict(s):
+    return s['tileX'], s['tileY'], s['isMoving'], s['facingDirection'], s['position'][0], s['position'][1], s['location']
+
+def read_status_record(s):
+    return s.tileX, s.tileY, s.isMoving, s.facingDirection, s.position[0], s.position[1], s.location
+
+CASES = (
+    ('PLAYER_STATUS', PLAYER_STATUS, read_status_dict, read_status_record),
+)
+DICT, EAGER, LAZY = 'dict', 'eager', 'lazy'
+
+
+def frame_bytes(request_type, value, framing_type):
+    msg = {'type': 'STREAM_MESSAGE', 'data': {'stream_id': f'UPDATE_TICKED_{request_type}', 'value': value, 'error': None}}
+    if framing_type == framing.MSGPACK:
+        return framing.encode_frame(msg)
+    return framing.encode_line(msg)
+
+def run(data, framing_type, request_type, read, kind, n_frames, read_every):
+    decoder = framing.Decoder(framing_type)
+    held = None
+    start = time.perf_counter()
+    for i in range(n_frames):
+        msg, = decoder.feed(data)
+        value = msg['data']['value']
+        if kind == EAGER:
+            value = records.decode(request_type, value)
+        held = value
+        if i % read_every == 0:
+            if kind == LAZY:
+                held = records.decode(request_type, held)
+            read(held)
+    return (time.perf_counter() - start) / n_frames, held
+
+def allocated(data, framing_type, request_type, read, kind):
+    # one frame with tracing started fresh, so the peak is what that frame allocated at most
+    run(data, framing_type, request_type, read, kind, 5, 1)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    _, held = run(data, framing_type, request_type, read, kind, 1, 1)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current - before, peak - before
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare plain dicts with records built eagerly and lazily')
+    parser.add_argument('n_frames', type=int, nargs='?', default=20000)
+    parser.add_argument('--read_every', type=int, nargs='+', default=[1, 45])
+    args = parser.parse_args()
+    framings = [framing.LINES] + ([framing.MSGPACK] if framing.msgpack is not None else [])
+    print(f"{'value':<15}{'framing':<9}{'read every':>11}  {'kind':<7}{'us/frame':>10}{'peak B':>9}{'retained B':>12}")
+    for request_type, value, read_dict, read_record in CASES:
+        for framing_type in framings:
+            data = frame_bytes(request_type, value, framing_type)
+            for read_every in args.read_every:
+                for kind, read in ((DICT, read_dict), (EAGER, read_record), (LAZY, read_record)):
+                    per_frame = min(run(data, framing_type, request_type, read, kind, args.n_frames, read_every)[0] for _ in range(3))
+                    retained, peak = allocated(data, framing_type, request_type, read, kind)
+                    print(f"{request_type:<15}{framing_type:<9}{read_every:>11}  {kind:<7}{per_frame * 1e6:>10.2f}{peak:>9}{retained:>12}")
+
+
+if __name__ == '__main__':
+    main()
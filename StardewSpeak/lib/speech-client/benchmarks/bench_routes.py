@@ -0,0 +1,123 @@
+'''
+Requests and walking for move_to_location across a generated world of many locations, asking the
+mod for a ROUTE and each leg's connections versus the routes.RouteTable, run against
+standin/mod_standin.py.
+
+    python benchmarks/bench_routes.py [--columns 6] [--rows 5] [--tps 300] [--seed 0]
+
+Locations are laid out in a grid, each with two crossings to every neighbour so which one a leg
+takes matters, and some blocked tiles so walking isn't straight. "cold" starts without a table on
+disk and "warm" loads the one cold saved, like starting the client again on the same save.
+'''
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STANDIN = os.path.join(ROOT, 'standin', 'mod_standin.py')
+RUN_CLIENT = os.path.join(ROOT, 'standin', 'run_client.py')
+
+WIDTH, HEIGHT = 24, 16
+# where the crossings are on each side, two per side
+CROSSINGS_Y = (4, 11)
+CROSSINGS_X = (5, 18)
+REQUESTS = ('ROUTE', 'GET_LOCATION_CONNECTIONS', 'GET_ALL_LOCATION_CONNECTIONS', 'GET_CONNECTION_DISTANCES')
+
+
+def name(column, row):
+    return f'Area{column}_{row}'
+
+def make_location(column, row, columns, rows, rng):
+    tiles = [['.'] * WIDTH for _ in range(HEIGHT)]
+    for x in range(WIDTH):
+        tiles[0][x] = tiles[HEIGHT - 1][x] = '#'
+    for y in range(HEIGHT):
+        tiles[y][0] = tiles[y][WIDTH - 1] = '#'
+    for _ in range(WIDTH * HEIGHT // 8):
+        tiles[rng.randrange(2, HEIGHT - 2)][rng.randrange(2, WIDTH - 2)] = '#'
+    connections = []
+    def cross(x, y, neighbour, target_x, target_y):
+        tiles[y][x] = '.'
+        connections.append({'TargetName': name(*neighbour), 'X': x, 'Y': y, 'IsDoor': False, 'TargetX': target_x, 'TargetY': target_y})
+    for y in CROSSINGS_Y:
+        if column + 1 < columns:
+            cross(WIDTH - 1, y, (column + 1, row), 1, y)
+        if column > 0:
+            cross(0, y, (column - 1, row), WIDTH - 2, y)
+    for x in CROSSINGS_X:
+        if row + 1 < rows:
+            cross(x, HEIGHT - 1, (column, row + 1), x, 1)
+        if row > 0:
+            cross(x, 0, (column, row - 1), x, HEIGHT - 2)
+    # arriving next to a crossing has to work
+    for cn in connections:
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            x, y = cn['X'] + dx, cn['Y'] + dy
+            if 0 < x < WIDTH - 1 and 0 < y < HEIGHT - 1:
+                tiles[y][x] = '.'
+    return {'map': [''.join(r) for r in tiles], 'connections': connections}
+
+def make_scenario(columns, rows, seed):
+    rng = random.Random(seed)
+    locations = {name(c, r): make_location(c, r, columns, rows, rng) for c in range(columns) for r in range(rows)}
+    return {
+        'saveId': f'bench{seed}',
+        'player': {'location': name(0, 0), 'tileX': 3, 'tileY': 3, 'facingDirection': 2, 'currentToolIndex': 0, 'items': [None] * 12},
+        'locations': locations,
+    }
+
+def make_trips(columns, rows):
+    corners = [(columns - 1, rows - 1), (0, rows - 1), (columns - 1, 0), (0, 0)]
+    return [f"objective.MoveToLocationObjective(__import__('types').SimpleNamespace(name='{name(*c)}')).wrap_run()" for c in corners]
+
+def run_once(args, scenario_path, trips, table, table_dir):
+    fd, out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    fd, client_out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    client = [sys.executable, RUN_CLIENT] + trips + ['--route_table_dir', table_dir, '--out', client_out]
+    standin = [sys.executable, STANDIN, scenario_path, '--tps', str(args.tps), '--out', out]
+    if not table:
+        standin.append('--no_route_table')
+    try:
+        subprocess.run(standin + ['--'] + client, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=3600)
+        with open(out) as f:
+            summary = json.load(f)
+        with open(client_out) as f:
+            summary['client_seconds'] = json.load(f)['seconds']
+        return summary
+    finally:
+        os.remove(out)
+        os.remove(client_out)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare ROUTE with the client route table')
+    parser.add_argument('--columns', type=int, default=6)
+    parser.add_argument('--rows', type=int, default=5)
+    parser.add_argument('--tps', type=float, default=300, help='Stand-in ticks per second')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    trips = make_trips(args.columns, args.rows)
+    fd, scenario_path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(make_scenario(args.columns, args.rows, args.seed), f)
+    table_dir = tempfile.mkdtemp()
+    short = {'ROUTE': 'route', 'GET_LOCATION_CONNECTIONS': 'conns', 'GET_ALL_LOCATION_CONNECTIONS': 'all', 'GET_CONNECTION_DISTANCES': 'doors'}
+    print(f"{'routes':<8}" + ''.join(f'{short[r]:>7}' for r in REQUESTS) + f"{'tiles':>7}{'ticks':>8}{'seconds':>9}")
+    try:
+        for label, table in (('mod', False), ('cold', True), ('warm', True)):
+            summary = run_once(args, scenario_path, trips, table, table_dir)
+            counts = ''.join(f"{summary['handled'].get(r, 0):>7}" for r in REQUESTS)
+            print(f"{label:<8}{counts}{summary['tiles_walked']:>7}{summary['ticks']:>8}{summary['client_seconds']:>9.1f}")
+    finally:
+        os.remove(scenario_path)
+        shutil.rmtree(table_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+'''
+Time to pick the best few items the way navigate_tiles does, sorting every item versus taking them
+best first from a spatial.TileIndex.
+
+    python benchmarks/bench_spatial.py [n_objects] [map_size]
+
+"rebuilt" builds a new index from the item list each time, which is what navigate_tiles does since
+it fetches the items again after every action. "kept" builds it once and removes the item that
+was acted on, like a caller that keeps its own index. Each row also checks the order matches sorted().
+'''
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'speech-client'))
+
+import spatial
+
+# same as game.score_objects_by_distance without importing game and dragonfly
+def distance_between_points(t1, t2):
+    return abs(t1[0] - t2[0]) + abs(t1[1] - t2[1])
+
+def score_objects_by_distance(start_tile, current_tile, obj_tile, distance=distance_between_points):
+    return 0.25 * distance(start_tile, obj_tile) + 0.75 * distance(current_tile, obj_tile)
+
+ACTIONS = 200
+
+
+def make_items(n, size, rng):
+    tiles = rng.sample(range(size * size), n)
+    return [{'tileX': t % size, 'tileY': t // size, 'name': 'Weeds'} for t in tiles]
+
+def walk(items, pick):
+    # act on the best item, step onto it and go again, like navigate_tiles clearing a field
+    start = current = (items[0]['tileX'], items[0]['tileY'])
+    remaining = list(items)
+    chosen = []
+    for _ in range(ACTIONS):
+        item = pick(remaining, start, current)
+        chosen.append(item)
+        remaining.remove(item)
+        current = item['tileX'], item['tileY']
+    return chosen
+
+def pick_sorted(remaining, start, current):
+    key = lambda t: score_objects_by_distance(start, current, (t['tileX'], t['tileY']))
+    return sorted(remaining, key=key)[0]
+
+def pick_rebuilt(remaining, start, current):
+    index = spatial.TileIndex(remaining)
+    return next(index.best_first(*key_and_bound(start, current)))
+
+def key_and_bound(start, current):
+    score = lambda t: score_objects_by_distance(start, current, (t['tileX'], t['tileY']))
+    bound = lambda rect: score_objects_by_distance(start, current, rect, distance=spatial.distance_to_rect)
+    return score, bound
+
+def walk_kept(items):
+    start = current = (items[0]['tileX'], items[0]['tileY'])
+    index = spatial.TileIndex(items)
+    chosen = []
+    for _ in range(ACTIONS):
+        item = next(index.best_first(*key_and_bound(start, current)))
+        chosen.append(item)
+        index.remove(item)
+        current = item['tileX'], item['tileY']
+    return chosen
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) / ACTIONS, result
+
+def main():
+    n_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    items = make_items(n_objects, size, random.Random(0))
+    print(f'{n_objects} objects on a {size}x{size} map, {ACTIONS} actions')
+    print(f"{'method':<10}{'ms/action':>11}{'same order':>12}")
+    per_action, expected = timed(walk, items, pick_sorted)
+    print(f"{'sorted':<10}{per_action * 1000:>11.3f}{'':>12}")
+    per_action, chosen = timed(walk, items, pick_rebuilt)
+    print(f"{'rebuilt':<10}{per_action * 1000:>11.3f}{str(chosen == expected):>12}")
+    per_action, chosen = timed(walk_kept, items)
+    print(f"{'kept':<10}{per_action * 1000:>11.3f}{str(chosen == expected):>12}")
+
+
+if __name__ == '__main__':
+    main()
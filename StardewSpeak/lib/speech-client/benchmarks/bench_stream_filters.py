@@ -0,0 +1,51 @@
+'''
+Stream frames the mod sends while the client waits on them, with stream filters off and on, run
+against standin/mod_standin.py.
+
+    python benchmarks/bench_stream_filters.py [--swings 10] [--tps 120]
+
+The client swings the current tool --swings times, each swing waiting for TOOL_STATUS to show the
+tool in use and then not in use. With filters on those waits are sent to the stand-in as predicates
+so it only sends the frames that match.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STANDIN = os.path.join(ROOT, 'standin', 'mod_standin.py')
+RUN_CLIENT = os.path.join(ROOT, 'standin', 'run_client.py')
+
+
+def run_once(args, stream_filters):
+    fd, out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    client = [sys.executable, RUN_CLIENT, *['game.swing_tool()'] * args.swings]
+    standin = [sys.executable, STANDIN, args.scenario, '--tps', str(args.tps), '--out', out]
+    if not stream_filters:
+        standin.append('--no_stream_filters')
+    try:
+        subprocess.run(standin + ['--'] + client, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=600)
+        with open(out) as f:
+            return json.load(f)
+    finally:
+        os.remove(out)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare stream frames sent with and without stream filters')
+    parser.add_argument('--scenario', default=os.path.join(ROOT, 'standin', 'scenarios', 'farm.json'))
+    parser.add_argument('--tps', type=float, default=120)
+    parser.add_argument('--swings', type=int, default=10)
+    args = parser.parse_args()
+    print(f"{'filters':<9}{'frames':>8}{'per swing':>11}{'seconds':>9}")
+    for stream_filters in (False, True):
+        summary = run_once(args, stream_filters)
+        frames = summary['stream_frames'].get('TOOL_STATUS', 0)
+        print(f"{'on' if stream_filters else 'off':<9}{frames:>8}{frames / args.swings:>11.1f}{summary['seconds']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
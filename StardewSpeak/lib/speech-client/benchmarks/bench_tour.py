@@ -0,0 +1,103 @@
+'''
+Tiles walked and time taken watering or harvesting a big field, with crops sorted after each one
+by generic_next_item_key versus following a tour.TourPlanner tour, run against standin/mod_standin.py.
+
+    python benchmarks/bench_tour.py [--crops 500] [--objective water|harvest|both] [--tps 300]
+
+The field is three plots on a generated farm, each tile planted at random so what's left to water
+isn't a neat rectangle, with a few blocked tiles like scarecrows and sprinklers in between. ticks is
+game time, a minute is 3600 of them, and seconds is how long the run took here. Much faster than the
+default --tps the player runs past its turns before the client can react and walks a lot further.
+'''
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STANDIN = os.path.join(ROOT, 'standin', 'mod_standin.py')
+RUN_CLIENT = os.path.join(ROOT, 'standin', 'run_client.py')
+
+WIDTH, HEIGHT = 64, 52
+# x, y, width, height
+PLOTS = ((5, 5, 22, 16), (32, 5, 26, 14), (8, 27, 34, 20))
+OBJECTIVES = {
+    'water': 'objective.WaterCropsObjective().wrap_run()',
+    'harvest': 'objective.HarvestCropsObjective().wrap_run()',
+}
+ITEMS = [
+    {'name': 'Watering Can', 'isTool': True, 'type': 'wateringCan'},
+    {'name': 'Hoe', 'isTool': True, 'type': 'hoe'},
+] + [None] * 10
+
+
+def make_scenario(n_crops, ready, seed):
+    rng = random.Random(seed)
+    rows = [['.'] * WIDTH for _ in range(HEIGHT)]
+    for x in range(WIDTH):
+        rows[0][x] = rows[HEIGHT - 1][x] = '#'
+    for y in range(HEIGHT):
+        rows[y][0] = rows[y][WIDTH - 1] = '#'
+    field = [(x, y) for px, py, w, h in PLOTS for x in range(px, px + w) for y in range(py, py + h)]
+    blocked = rng.sample(field, len(field) // 40)
+    for x, y in blocked:
+        rows[y][x] = '#'
+    open_tiles = [t for t in field if t not in set(blocked)]
+    planted = rng.sample(open_tiles, min(n_crops, len(open_tiles)))
+    crop = {'currentPhase': 4 if ready else 2, 'dead': False, 'fullyGrown': ready}
+    hoe_dirt = [{'tileX': x, 'tileY': y, 'crop': crop, 'readyForHarvest': ready} for x, y in planted]
+    return {
+        'player': {'location': 'Farm', 'tileX': 30, 'tileY': 23, 'facingDirection': 2, 'currentToolIndex': 0, 'items': ITEMS},
+        'locations': {
+            'Farm': {'map': [''.join(r) for r in rows], 'hoeDirt': hoe_dirt},
+        },
+    }
+
+def run_once(args, scenario_path, objective, planning):
+    fd, out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    fd, client_out = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    client = [sys.executable, RUN_CLIENT, OBJECTIVES[objective], '--out', client_out]
+    if not planning:
+        client.append('--no_tour_planning')
+    standin = [sys.executable, STANDIN, scenario_path, '--tps', str(args.tps), '--out', out]
+    try:
+        subprocess.run(standin + ['--'] + client, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=3600)
+        with open(out) as f:
+            summary = json.load(f)
+        with open(client_out) as f:
+            summary['client_seconds'] = json.load(f)['seconds']
+        return summary
+    finally:
+        os.remove(out)
+        os.remove(client_out)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare greedy and planned visit orders on a big field')
+    parser.add_argument('--crops', type=int, default=500)
+    parser.add_argument('--objective', choices=('water', 'harvest', 'both'), default='both')
+    parser.add_argument('--tps', type=float, default=300, help='Stand-in ticks per second')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    objectives = ('water', 'harvest') if args.objective == 'both' else (args.objective,)
+    print(f"{'objective':<10}{'order':<9}{'tiles':>7}{'ticks':>8}{'seconds':>9}{'left':>6}")
+    for objective in objectives:
+        fd, scenario_path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(make_scenario(args.crops, objective == 'harvest', args.seed), f)
+        try:
+            for planning in (False, True):
+                summary = run_once(args, scenario_path, objective, planning)
+                left = sum(summary['remaining'].values())
+                order = 'planned' if planning else 'greedy'
+                print(f"{objective:<10}{order:<9}{summary['tiles_walked']:>7}{summary['ticks']:>8}{summary['client_seconds']:>9.1f}{left:>6}")
+        finally:
+            os.remove(scenario_path)
+
+
+if __name__ == '__main__':
+    main()
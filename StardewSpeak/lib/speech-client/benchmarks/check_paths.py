@@ -0,0 +1,154 @@
+'''
+Check the client's pathfinder against paths the mod found in recorded sessions.
+
+    python benchmarks/check_paths.py traffic.jsonl.gz [more.jsonl.gz ...] [--verbose]
+
+Record with the PathMode config option set to "check" and RecordTraffic on, so the recording has
+both the mod's paths and the passability grids they were found on. Each path_to_tile and
+PATH_TO_PLAYER response is compared with pathfinding.find_path on the latest grid for that location,
+skipping ones where the grid was already stale by a list changed event. A mod path has to be valid
+on the grid, and the local one exists exactly when the mod found one and is no longer.
+For path_to_tile the mod doesn't send the start, so the player's tile is followed from PLAYER_STATUS
+responses and stream frames.
+'''
+import argparse
+import collections
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'speech-client'))
+
+import pathfinding, traffic
+
+PATH_REQUESTS = ('path_to_tile', 'PATH_TO_PLAYER')
+
+
+class Checker:
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.counts = collections.Counter()
+        self.grids = {} # location -> Grid
+        self.stale = set() # locations whose grid changed after it was recorded
+        self.sent = {} # request id -> [(type, data)], several for a REQUEST_BATCH
+        self.player_streams = set()
+        self.player = None # location, tile
+
+    def feed(self, direction, msg):
+        if direction == traffic.OUTBOUND:
+            self.outbound(msg)
+        elif direction == traffic.INBOUND:
+            self.inbound(msg)
+
+    def outbound(self, msg):
+        msg_type, data = msg['type'], msg.get('data')
+        if msg_type == 'REQUEST_BATCH':
+            items = data['requests'] if isinstance(data, dict) else data
+            self.sent[msg['id']] = [(r['type'], r['data']) for r in items]
+        elif msg_type == 'NEW_STREAM':
+            stream_data = data.get('data') or {}
+            if data['name'] == 'UPDATE_TICKED' and stream_data.get('type') == 'PLAYER_STATUS':
+                self.player_streams.add(data['stream_id'])
+        else:
+            self.sent[msg['id']] = [(msg_type, data)]
+
+    def inbound(self, msg):
+        msg_type, data = msg['type'], msg['data']
+        if msg_type == 'RESPONSE':
+            sent = self.sent.pop(data['id'], None)
+            if sent is None or data['error']:
+                return
+            if len(sent) == 1 and sent[0][0] != 'REQUEST_BATCH':
+                values = [data['value']]
+            else:
+                values = [v['value'] if isinstance(v, dict) and 'error' in v else v for v in data['value']]
+            for (request_type, request_data), value in zip(sent, values):
+                self.response(request_type, request_data, value)
+        elif msg_type == 'STREAM_MESSAGE':
+            if data['stream_id'] in self.player_streams and not data.get('error'):
+                self.player_status(data['value'])
+            elif data['stream_id'].startswith('ON_OBJECT_LIST_CHANGED'):
+                self.stale.add(data['value']['location'])
+        elif msg_type == 'EVENT' and data['eventType'] == 'TERRAIN_FEATURE_LIST_CHANGED':
+            self.stale.add(data['data']['location'])
+
+    def player_status(self, value):
+        if value is None:
+            return
+        if 'seq' in value:
+            # delta stream frame
+            if value['full']:
+                value = value['value']
+            elif self.player is not None:
+                changed = value['changed']
+                location = changed.get('location', self.player[0])
+                x, y = changed.get('tileX', self.player[1][0]), changed.get('tileY', self.player[1][1])
+                self.player = location, (x, y)
+                return
+            else:
+                return
+        self.player = value['location'], (value['tileX'], value['tileY'])
+
+    def response(self, request_type, data, value):
+        if request_type == 'PLAYER_STATUS':
+            self.player_status(value)
+        elif request_type == 'GET_PASSABILITY_GRID' and value is not None:
+            self.grids[value['location']] = pathfinding.Grid.from_wire(value)
+            self.stale.discard(value['location'])
+        elif request_type in PATH_REQUESTS:
+            self.check(request_type, data, value)
+
+    def check(self, request_type, data, value):
+        if self.player is None:
+            self.counts['no player tile'] += 1
+            return
+        location, player_tile = self.player
+        if request_type == 'PATH_TO_PLAYER':
+            mod_path = value['tiles']
+            location = value['location']
+            start, goal = (data['x'], data['y']), player_tile
+        else:
+            mod_path = value
+            start, goal = player_tile, (data['x'], data['y'])
+        grid = self.grids.get(location)
+        if grid is None:
+            self.counts['no grid'] += 1
+            return
+        if location in self.stale:
+            self.counts['stale grid'] += 1
+            return
+        cutoff = data.get('cutoff', -1)
+        local = pathfinding.find_path(grid, start, goal, cutoff)
+        mod_tiles = None if mod_path is None else [(p['X'], p['Y']) for p in mod_path]
+        if mod_tiles is None:
+            ok = local is None or cutoff >= 0
+            result = 'both unreachable' if local is None else ('local only, cutoff' if ok else 'local only')
+        elif not pathfinding.is_valid_path(grid, mod_tiles, start, goal):
+            ok, result = False, 'mod path not valid on grid'
+        elif local is None:
+            ok, result = False, 'mod only'
+        elif len(local) > len(mod_tiles):
+            ok, result = False, 'local longer'
+        else:
+            ok, result = True, 'same length' if len(local) == len(mod_tiles) else 'local shorter'
+        self.counts[result] += 1
+        if not ok and self.verbose:
+            print(f'{result}: {request_type} in {location} v{grid.version} {start} -> {goal}\n  mod   {mod_tiles}\n  local {local}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare local paths with recorded mod paths')
+    parser.add_argument('recordings', nargs='+')
+    parser.add_argument('--verbose', action='store_true', help='Print every path that failed the check')
+    args = parser.parse_args()
+    checker = Checker(args.verbose)
+    for path in args.recordings:
+        for _, direction, msg in traffic.load(path):
+            checker.feed(direction, msg)
+    for result, count in checker.counts.most_common():
+        print(f'{result:<28}{count:>6}')
+    failed = sum(checker.counts[k] for k in ('local only', 'mod path not valid on grid', 'mod only', 'local longer'))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+'''
+Replay a recorded session (main.py --record_traffic) against the real client code without the game.
+
+    python benchmarks/replay.py traffic.jsonl.gz [--entry EXPR] [--out summary.json]
+
+The event loop runs on a fake clock that jumps straight to the next timer, so a long session replays
+in seconds. Each message the client sends is matched to the first unused recorded message with the
+same type and data, or failing that, except for NEW_STREAM, the same type. Its recorded response,
+or the frames of a matched stream, are then delivered after the same delay as in the recording.
+Events are delivered at their recorded time. EXPR is evaluated with the server, game and objective modules in scope and
+awaited. For example "objective.new_active_objective(objective.FunctionObjective(game.refill_watering_can))".
+The summary has the virtual and wall time and the messages sent by type, so two versions can be
+compared on the same recording.
+'''
+import argparse
+import asyncio
+import collections
+import json
+import os
+import selectors
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'speech-client'))
+
+import metrics, server, traffic
+
+
+class FakeClockSelector(selectors.DefaultSelector):
+    '''Never waits for timers, the clock is advanced by however long the loop would have slept.'''
+
+    def __init__(self):
+        super().__init__()
+        self.now = 0
+
+    def select(self, timeout=None):
+        ready = super().select(0)
+        if ready:
+            return ready
+        if timeout is None:
+            raise RuntimeError('Replay stalled, the client is waiting on something that was never recorded')
+        self.now += timeout
+        return []
+
+
+class FakeClockLoop(asyncio.SelectorEventLoop):
+
+    def __init__(self):
+        self.fake_selector = FakeClockSelector()
+        super().__init__(self.fake_selector)
+
+    def time(self):
+        return self.fake_selector.now
+
+
+class Replayer:
+    '''Stands in for the mod. Installed as server.recorder so it sees every message the client sends.'''
+
+    def __init__(self, records):
+        self.recorded_outbound = collections.defaultdict(list) # type -> [(time, msg)] not matched yet
+        self.responses = {} # recorded request id -> (time, msg)
+        self.frames = collections.defaultdict(list) # recorded stream id -> [(time, msg)]
+        self.events = [] # (time, msg)
+        for t, direction, msg in records:
+            if direction == traffic.OUTBOUND:
+                self.recorded_outbound[msg['type']].append((t, msg))
+            elif direction == traffic.INBOUND:
+                if msg['type'] == 'RESPONSE':
+                    self.responses[msg['data']['id']] = t, msg
+                elif msg['type'] == 'STREAM_MESSAGE':
+                    self.frames[msg['data']['stream_id']].append((t, msg))
+                elif msg['type'] == 'EVENT':
+                    self.events.append((t, msg))
+        self.duration = records[-1][0] if records else 0
+        self.scheduled = {} # live request or stream id -> [TimerHandle]
+        self.matched = collections.Counter()
+        self.approximate = collections.Counter()
+        self.unmatched = collections.Counter()
+
+    def start(self):
+        for t, msg in self.events:
+            server.loop.call_at(t, self.deliver, msg)
+
+    def inbound(self, msg):
+        pass
+
+    def outbound(self, msg):
+        msg_type = msg['type']
+        if msg_type in ('STOP_STREAM', 'CANCEL_REQUEST'):
+            for handle in self.scheduled.pop(msg['data'], ()):
+                handle.cancel()
+            return
+        recorded = self.match(msg)
+        if recorded is None:
+            self.unmatched[msg_type] += 1
+            return
+        sent_at, recorded_msg = recorded
+        if msg_type == 'NEW_STREAM':
+            live_id = msg['data']['stream_id']
+            frames = self.frames.get(recorded_msg['data']['stream_id'], ())
+            self.schedule(live_id, sent_at, frames, 'stream_id', live_id)
+        elif recorded_msg['id'] in self.responses:
+            self.schedule(msg['id'], sent_at, [self.responses[recorded_msg['id']]], 'id', msg['id'])
+
+    def match(self, msg):
+        candidates = self.recorded_outbound.get(msg['type'])
+        if not candidates:
+            return None
+        data = match_data(msg)
+        for i, (t, recorded_msg) in enumerate(candidates):
+            if match_data(recorded_msg) == data:
+                self.matched[msg['type']] += 1
+                return candidates.pop(i)
+        if msg['type'] == 'NEW_STREAM':
+            # frames of a different stream would be nonsense to the client
+            return None
+        # positions, paths etc. drift between versions, fall back to the next one of the same type
+        self.approximate[msg['type']] += 1
+        return candidates.pop(0)
+
+    def schedule(self, live_id, sent_at, recorded, id_key, id_value):
+        now = server.loop.time()
+        handles = self.scheduled.setdefault(live_id, [])
+        for t, recorded_msg in recorded:
+            msg = {**recorded_msg, 'data': {**recorded_msg['data'], id_key: id_value}}
+            handles.append(server.loop.call_at(now + t - sent_at, self.deliver, msg))
+
+    def deliver(self, msg):
+        server.handle_messages([msg], [len(json.dumps(msg))])
+
+    def summary(self):
+        return {
+            'matched': dict(self.matched),
+            'approximate': dict(self.approximate),
+            'unmatched': dict(self.unmatched),
+        }
+
+def match_data(msg):
+    # stream ids are generated on the client
+    if msg['type'] == 'NEW_STREAM':
+        return msg['data']['name'], msg['data']['data']
+    return msg['data']
+
+
+async def replay(replayer, entry):
+    replayer.start()
+    server.loop.create_task(server.menu_changed())
+    if entry is None:
+        await asyncio.sleep(replayer.duration)
+        return
+    import game, objective
+    await eval(entry, {'server': server, 'game': game, 'objective': objective})
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded mod session')
+    parser.add_argument('recording')
+    parser.add_argument('--entry', default=None, help='Expression for the awaitable to run, defaults to just replaying events')
+    parser.add_argument('--out', default=None, help='Write the summary as JSON to this path')
+    args = parser.parse_args()
+    records = traffic.load(args.recording)
+    replayer = Replayer(records)
+    server.loop = FakeClockLoop()
+    server.writer = None
+    server.output = open(os.devnull, 'wb')
+    server.recorder = replayer
+    start = time.perf_counter()
+    try:
+        server.loop.run_until_complete(replay(replayer, args.entry))
+    finally:
+        wall_time = time.perf_counter() - start
+        summary = {
+            'records': len(records),
+            'virtual_seconds': round(server.loop.time(), 3),
+            'wall_seconds': round(wall_time, 3),
+            'sent': {k: v.sent for k, v in sorted(metrics.requests.items())},
+            'replay': replayer.summary(),
+            'metrics': metrics.snapshot(),
+        }
+        print(json.dumps({k: summary[k] for k in ('records', 'virtual_seconds', 'wall_seconds', 'sent', 'replay')}, indent=2))
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
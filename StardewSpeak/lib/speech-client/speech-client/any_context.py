@@ -46,6 +46,7 @@ non_repeat_mapping = {
     "mouse <mouse_directions> [<positive_num>]": df_utils.async_action(move_mouse_by_tile, 'mouse_directions', 'positive_num'),
     "small mouse <mouse_directions> [<positive_num>]": df_utils.async_action(game.move_mouse_in_direction, 'mouse_directions', 'positive_num'),
     "write game state": df_utils.async_action(game.write_game_state),
+    "write stats": df_utils.async_action(game.write_stats),
     "(action | check)": df_utils.async_action(game.press_key, constants.ACTION_BUTTON),
     "(escape | [open | close] menu)": df_utils.async_action(game.press_key, constants.MENU_BUTTON),
 }
\ No newline at end of file
@@ -21,7 +21,17 @@ async def on_speech_mimicked(data):
         server.log(str(e), level=2)
 
 async def on_save_loaded(data):
-    pass
+    import routes
+    routes.reload()
+
+def on_location_connections_changed(data):
+    import routes
+    # a building went up or was moved, the route table asks for just what changed again
+    routes.reload()
+
+def on_terrain_feature_list_changed(data):
+    import game
+    game.location_cache.invalidate('terrain_features_changed', data['location'], game.TERRAIN_FEATURE_QUERIES)
 
 async def on_game_event(data):
     import game
@@ -36,7 +46,8 @@ event_registry = {
     "SPEECH_MIMICKED": on_speech_mimicked,
     "SAVE_LOADED": on_save_loaded,
     "GAME_EVENT": on_game_event,
-    "TERRAIN_FEATURE_LIST_CHANGED": lambda x: None
+    "TERRAIN_FEATURE_LIST_CHANGED": on_terrain_feature_list_changed,
+    "LOCATION_CONNECTIONS_CHANGED": on_location_connections_changed,
 }
 event_futures = collections.defaultdict(lambda: server.loop.create_future())
 
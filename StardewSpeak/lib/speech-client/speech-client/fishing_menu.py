@@ -1,4 +1,4 @@
-import game, server, menu_utils, constants, df_utils
+import game, server, menu_utils, constants, df_utils, predicates
 import dragonfly as df
 
 FISHING_MENU = 'fishingMenu'
@@ -15,13 +15,13 @@ async def start_fishing():
 
 async def cast_fishing_rod(tss):
     async with game.press_and_release(constants.USE_TOOL_BUTTON):
-        await tss.wait(lambda t: t['isTimingCast'] and t['castingPower'] > 0.95, timeout=10)
+        await tss.wait(predicates.field('isTimingCast') & (predicates.field('castingPower') > 0.95), timeout=10)
 
 async def wait_for_nibble(tss):
-    tool_status = await tss.wait(lambda t: t['isNibbling'] or not t['inUse'])
+    tool_status = await tss.wait(predicates.field('isNibbling') | ~predicates.field('inUse'))
     if tool_status['inUse']:
         await game.press_key(constants.USE_TOOL_BUTTON)
-        await tss.wait(lambda t: t['isReeling'])
+        await tss.wait(predicates.field('isReeling'))
 
 mapping = {
     "catch fish": df_utils.async_action(catch_fish)
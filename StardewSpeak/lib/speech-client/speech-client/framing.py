@@ -0,0 +1,120 @@
+'''
+Wire formats for the stdin/stdout connection to the mod. Everything starts out as newline
+delimited JSON. If the mod was launched with the msgpack_framing capability and the msgpack
+package is installed, the client asks to switch to length prefixed MessagePack frames with
+a SET_FRAMING line and the mod acknowledges with a FRAMING_CHANGED line before switching.
+'''
+import json
+import struct
+
+import records
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+LINES = 'lines'
+MSGPACK = 'msgpack'
+
+MSGPACK_FRAMING_CAPABILITY = 'msgpack_framing'
+SET_FRAMING = 'SET_FRAMING'
+FRAMING_CHANGED = 'FRAMING_CHANGED'
+
+# little endian unsigned 32 bit payload length
+HEADER = struct.Struct('<I')
+
+
+class DecodeError(Exception):
+
+    def __init__(self, raw):
+        super().__init__(f'Unable to decode message {raw!r}')
+        self.raw = raw
+
+
+def negotiate(mod_capabilities):
+    if MSGPACK_FRAMING_CAPABILITY in mod_capabilities and msgpack is not None:
+        return MSGPACK
+    return LINES
+
+def encode_line(msg):
+    return (json.dumps(msg, default=records.to_plain) + '\n').encode('utf8')
+
+def decode_line(line):
+    try:
+        return json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise DecodeError(line)
+
+def encode_frame(msg):
+    payload = msgpack.packb(msg, use_bin_type=True, default=records.to_plain)
+    return HEADER.pack(len(payload)) + payload
+
+def decode_frame_payload(payload):
+    try:
+        return msgpack.unpackb(payload, raw=False)
+    except (ValueError, msgpack.UnpackException):
+        raise DecodeError(payload)
+
+
+class Encoder:
+
+    def __init__(self, framing=LINES):
+        self.framing = framing
+
+    def encode(self, msg):
+        if self.framing == MSGPACK:
+            return encode_frame(msg)
+        return encode_line(msg)
+
+
+class Decoder:
+
+    def __init__(self, framing=LINES, switch_on=FRAMING_CHANGED):
+        self.framing = framing
+        # the line that says everything after it uses the new framing, SET_FRAMING when decoding the client
+        self.switch_on = switch_on
+        self.buffer = bytearray()
+        # encoded size of each message returned by the last feed
+        self.sizes = []
+
+    def feed(self, data):
+        '''
+        Add bytes read from the pipe and return every message they complete. Payloads that fail
+        to decode are returned as DecodeError instances so one bad message doesn't drop the rest.
+        FRAMING_CHANGED acknowledgements (or switch_on) switch the decoder mid-buffer.
+        '''
+        buffer = self.buffer
+        buffer += data
+        messages = []
+        sizes = []
+        pos = 0
+        while True:
+            if self.framing == MSGPACK:
+                if len(buffer) - pos < HEADER.size:
+                    break
+                size, = HEADER.unpack_from(buffer, pos)
+                end = pos + HEADER.size + size
+                if len(buffer) < end:
+                    break
+                msg = decode_or_error(decode_frame_payload, bytes(buffer[pos + HEADER.size:end]))
+            else:
+                newline = buffer.find(b'\n', pos)
+                if newline == -1:
+                    break
+                end = newline + 1
+                msg = decode_or_error(decode_line, bytes(buffer[pos:end]))
+                if isinstance(msg, dict) and msg.get('type') == self.switch_on:
+                    self.framing = msg['data']
+            messages.append(msg)
+            sizes.append(end - pos)
+            pos = end
+        del buffer[:pos]
+        self.sizes = sizes
+        return messages
+
+def decode_or_error(decode, raw):
+    try:
+        return decode(raw)
+    except DecodeError as e:
+        return e
@@ -6,8 +6,9 @@ import os.path
 import json
 import collections
 import contextlib
+import itertools
 import asyncio
-import server, constants, async_timeout, events
+import server, constants, async_timeout, events, predicates, records, spatial, pathfinding, tour, routes
 
 last_faced_east_west = constants.WEST
 last_faced_north_south = constants.SOUTH
@@ -47,17 +48,379 @@ tool_for_object = {
 
 DEBRIS = (constants.WEEDS, constants.TWIG, constants.STONE)
 
+# seconds a location snapshot is served for when nothing said it changed, crops ripening and
+# machines finishing don't send any event
+LOCATION_CACHE_MAX_AGE = 5
+# isOnScreen changes as the player walks so the visible item getters want a fresher snapshot
+VISIBLE_ITEMS_MAX_AGE = 0.5
+GRID_QUERY = 'GET_PASSABILITY_GRID'
+GRID_VERSION_QUERY = 'GET_GRID_VERSION'
+TERRAIN_FEATURE_QUERIES = ('GET_TERRAIN_FEATURES', 'GET_HOE_DIRT', GRID_QUERY, GRID_VERSION_QUERY)
+OBJECT_QUERIES = (constants.GET_LOCATION_OBJECTS, GRID_QUERY, GRID_VERSION_QUERY)
+# what the player changes with a tool or the action button without any list changed event
+ACTION_QUERIES = ('GET_TERRAIN_FEATURES', 'GET_HOE_DIRT', constants.GET_LOCATION_OBJECTS)
+# the grid is kept by the location it is for, so a warp doesn't make it stale. The mod answers
+# GET_GRID_VERSION for wherever the player is, so that does
+LOCATION_QUERIES = ACTION_QUERIES + (GRID_VERSION_QUERY,)
+
+# where paths come from. LOCAL searches the cached passability grid and only asks the mod when
+# there is no grid, MOD always asks the mod, CHECK asks the mod and compares with the grid
+PATHS_LOCAL = 'local'
+PATHS_MOD = 'mod'
+PATHS_CHECK = 'check'
+path_mode = PATHS_LOCAL
+path_stats = collections.Counter()
+# navigate_tiles follows a planner's tour when it's given one, off to sort by sort_items as before
+tour_planning = True
+# find_path answers from PathCache when it can, off to search every time
+path_caching = True
+# Path.travel has the mod steer when it can, off to steer from here on every status frame
+mod_path_following = True
+# UPDATE_HELD_BUTTONS only goes out with what changes, off to send every update as asked, see HeldButtons
+held_button_diffing = True
+# WaterCropsObjective and HoePlotObjective charge an upgraded tool over tour.plan_swings areas, off to swing at each tile
+aoe_planning = True
+# seconds between checking HeldButtons against what the mod is holding
+HELD_BUTTONS_RECONCILE_INTERVAL = 2
+# steps from a new start or goal a cached path is joined by, see PathCache
+PATH_SPLICE_RADIUS = 3
+# paths kept for each location, the least recently used go first
+PATH_CACHE_SIZE = 64
+
 context_variables = {
     'ACTIVE_MENU': None,
     'GAME_EVENT': None,
 }
 
+class HeldButtons:
+    '''
+    The buttons the client thinks the mod is holding, so UPDATE_HELD_BUTTONS only goes out with the
+    ones that change. Path.move_update asks for the same direction on every status frame while
+    walking and stop_moving releases all four directions whether they're held or not.
+
+    The mod can change what's held without the client asking, like when it follows a path itself,
+    so buttons that could have changed are forgotten and sent with the next update whatever they
+    were. Every RECONCILE_INTERVAL while updates are going out what's held is checked against
+    GET_HELD_BUTTONS too, in case something else changed it.
+    '''
+
+    def __init__(self, reconcile_interval=HELD_BUTTONS_RECONCILE_INTERVAL):
+        self.reconcile_interval = reconcile_interval
+        # the mod drops held buttons when the client exits, so a new client starts with none
+        self.held = set()
+        self.unknown = set()
+        # bumped on every update sent so a GET_HELD_BUTTONS answer from before one isn't used
+        self.version = 0
+        self.reconciled_at = None
+        self.reconciling = False
+        self.sent = 0
+        self.suppressed = 0
+        self.reconciled = 0
+        self.corrected = 0
+
+    def update(self, to_hold=(), to_release=()):
+        '''
+        UPDATE_HELD_BUTTONS data for the buttons that change, or None when nothing does.
+        '''
+        if held_button_diffing:
+            self.reconcile_soon()
+            to_hold = [b for b in to_hold if b not in self.held or b in self.unknown]
+            to_release = [b for b in to_release if b in self.held or b in self.unknown]
+        else:
+            to_hold, to_release = list(to_hold), list(to_release)
+        if not to_hold and not to_release:
+            self.suppressed += 1
+            return None
+        # the mod releases before it holds, so a button in both ends up held
+        self.held.difference_update(to_release)
+        self.held.update(to_hold)
+        self.unknown.difference_update(to_release)
+        self.unknown.difference_update(to_hold)
+        self.version += 1
+        self.sent += 1
+        return {'toHold': to_hold, 'toRelease': to_release}
+
+    def release_all(self):
+        # RELEASE_ALL_KEYS
+        self.held.clear()
+        self.unknown.clear()
+        self.version += 1
+
+    def forget(self, buttons):
+        self.unknown.update(buttons)
+
+    def reconcile_soon(self):
+        if self.reconciling or server.HELD_BUTTONS_CAPABILITY not in server.mod_capabilities:
+            return
+        now = server.loop.time()
+        if self.reconciled_at is None:
+            self.reconciled_at = now
+        elif now - self.reconciled_at >= self.reconcile_interval:
+            self.reconciling = True
+            server.loop.create_task(self.reconcile())
+
+    async def reconcile(self):
+        version = self.version
+        try:
+            held = await server.request('GET_HELD_BUTTONS')
+        except Exception as e:
+            server.log(f'Unable to check held buttons: {e}', level=2)
+            return
+        finally:
+            self.reconciling = False
+            self.reconciled_at = server.loop.time()
+        if version != self.version:
+            # an update went out after the request, the answer could be from before it
+            return
+        self.reconciled += 1
+        held = set(held)
+        if held != self.held:
+            self.corrected += 1
+        self.held = held
+        self.unknown.clear()
+
+    def stats(self):
+        updates = self.sent + self.suppressed
+        return {
+            'sent': self.sent,
+            'suppressed': self.suppressed,
+            'suppressed_rate': round(self.suppressed / updates, 3) if updates else None,
+            'reconciled': self.reconciled,
+            'corrected': self.corrected,
+            'held': sorted(self.held),
+        }
+
+held_buttons = HeldButtons()
+
 async def update_held_buttons(to_hold=(), to_release=()):
-    await server.request('UPDATE_HELD_BUTTONS', {'toHold': to_hold, 'toRelease': to_release})
+    data = held_buttons.update(to_hold, to_release)
+    if data is not None:
+        await server.request('UPDATE_HELD_BUTTONS', data)
     await events.wait_for_update_ticked()
 
 def update_held_buttons_nowait(to_hold=(), to_release=()):
-    server.send_message('UPDATE_HELD_BUTTONS', {'toHold': to_hold, 'toRelease': to_release})
+    data = held_buttons.update(to_hold, to_release)
+    if data is not None:
+        server.send_message('UPDATE_HELD_BUTTONS', data)
+
+class LocationCache:
+    '''
+    Snapshots of the location wide queries so getters called over and over, like the ones
+    navigate_tiles and clear_object poll, don't have the mod serialize the whole location each time.
+    A snapshot is dropped on a warp, when the mod says the location's terrain features or objects
+    changed, after the player uses a tool or the action button, or once it is max_age old.
+    '''
+
+    def __init__(self, max_age=LOCATION_CACHE_MAX_AGE):
+        self.max_age = max_age
+        self.snapshots = {}
+        # bumped on every invalidation so a response to a request sent before it isn't stored
+        self.generation = 0
+        self.watching = False
+        self.hits = collections.Counter()
+        self.misses = collections.Counter()
+        self.invalidated = collections.Counter()
+
+    async def get(self, request_type, location, max_age=None, refresh=False):
+        self.watch()
+        key = request_type, location
+        max_age = self.max_age if max_age is None else max_age
+        snapshot = self.snapshots.get(key)
+        if not refresh and snapshot is not None and server.loop.time() - snapshot[1] <= max_age:
+            self.hits[request_type] += 1
+            return snapshot[0]
+        self.misses[request_type] += 1
+        generation = self.generation
+        value = await server.request(request_type, {"location": location})
+        if generation == self.generation:
+            self.snapshots[key] = value, server.loop.time()
+        return value
+
+    async def get_grid(self, location):
+        '''
+        Passability grid of location, or None if the player isn't there anymore. Past max_age the
+        grid's version is checked with the mod rather than fetching the whole grid again.
+        '''
+        self.watch()
+        key = GRID_QUERY, location
+        snapshot = self.snapshots.get(key)
+        generation = self.generation
+        if snapshot is not None:
+            grid, checked_at = snapshot
+            if server.loop.time() - checked_at <= self.max_age:
+                self.hits[GRID_QUERY] += 1
+                return grid
+            version = await server.request('GET_GRID_VERSION')
+            if version == {'location': location, 'version': grid.version} and generation == self.generation:
+                self.hits[GRID_QUERY] += 1
+                self.snapshots[key] = grid, server.loop.time()
+                return grid
+        self.misses[GRID_QUERY] += 1
+        grid = pathfinding.Grid.from_wire(await server.request(GRID_QUERY))
+        if generation == self.generation:
+            self.snapshots[GRID_QUERY, grid.location] = grid, server.loop.time()
+        return grid if grid.location == location else None
+
+    async def grid_version(self, location):
+        '''
+        Version of location's passability grid without fetching the grid, or None if the player
+        isn't there or the mod has no grid.
+        '''
+        snapshot = self.snapshots.get((GRID_QUERY, location))
+        if snapshot is not None and server.loop.time() - snapshot[1] <= self.max_age:
+            return snapshot[0].version
+        if server.PASSABILITY_GRID_CAPABILITY not in server.mod_capabilities:
+            return None
+        value = await self.get(GRID_VERSION_QUERY, location)
+        return value['version'] if value['location'] == location else None
+
+    def invalidate(self, reason, location=None, request_types=None):
+        # the mod answers these for the current location whatever is asked for, so '' goes stale too
+        for key in list(self.snapshots):
+            request_type, snapshot_location = key
+            if location is not None and snapshot_location not in (location, ''):
+                continue
+            if request_types is not None and request_type not in request_types:
+                continue
+            del self.snapshots[key]
+        self.generation += 1
+        self.invalidated[reason] += 1
+
+    def watch(self):
+        if self.watching:
+            return
+        self.watching = True
+        # opened here rather than in the tasks so the streams exist before the first snapshot is requested
+        warps = server.on_warped_stream()
+        object_changes = server.on_object_list_changed_stream()
+        server.loop.create_task(self.invalidate_on(warps, 'warped', LOCATION_QUERIES, any_location=True))
+        server.loop.create_task(self.invalidate_on(object_changes, 'objects_changed', OBJECT_QUERIES))
+
+    async def invalidate_on(self, stream, reason, request_types, any_location=False):
+        with stream:
+            async for event in stream:
+                self.invalidate(reason, None if any_location else event['location'], request_types)
+
+    def stats(self):
+        return {
+            'hits': dict(self.hits),
+            'misses': dict(self.misses),
+            'invalidated': dict(self.invalidated),
+            'snapshots': len(self.snapshots),
+        }
+
+location_cache = LocationCache()
+
+class PathCache:
+    '''
+    Paths found before, so the same trips asked for over and over, like going to the shipping bin
+    or out of the front door, don't cost a search or a mod round trip each time. Paths are kept by
+    location, start, goal and cutoff at the location's grid version, which the mod bumps whenever
+    terrain features, objects or buildings change, so a change there makes them stale.
+
+    A trip that wasn't asked for before can still come from the cached ones: the part of a path
+    between start and goal when both are on it, or a short search from start onto a path to the same
+    goal, joined where the two together are shortest. The same goes the other way round for a goal
+    near a path from the same start, like the player's tile is for PATH_TO_PLAYER. A spliced path
+    can be a tile or two longer than a search would find. Only a search without a cutoff is
+    answered either way since a cutoff could have stopped it.
+    '''
+
+    def __init__(self, size=PATH_CACHE_SIZE, splice_radius=PATH_SPLICE_RADIUS):
+        self.size = size
+        self.splice_radius = splice_radius
+        # location -> (grid version, {(start, goal, cutoff): tiles or None}) in least recently used order
+        self.locations = {}
+        self.hits = collections.Counter()
+        self.misses = collections.Counter()
+        # what searches took by where they came from, a hit is counted as saving the average
+        self.search_seconds = collections.Counter()
+        self.saved_seconds = 0
+
+    def get(self, location, version, start, goal, cutoff, grid=None):
+        '''
+        (True, tiles or None) when the path is known from the cached ones, else (False, None).
+        '''
+        started = time.perf_counter()
+        kind, tiles = self.lookup(location, version, start, goal, cutoff, grid)
+        source = 'local' if grid is not None else 'mod'
+        if kind is None:
+            self.misses[source] += 1
+            return False, None
+        self.hits[kind] += 1
+        searches = self.misses[source]
+        if searches:
+            self.saved_seconds += max(0, self.search_seconds[source] / searches - (time.perf_counter() - started))
+        return True, tiles
+
+    def lookup(self, location, version, start, goal, cutoff, grid):
+        cached = self.locations.get(location)
+        if cached is None or cached[0] != version:
+            return None, None
+        paths = cached[1]
+        key = start, goal, cutoff
+        if key in paths:
+            paths.move_to_end(key)
+            return 'exact', paths[key]
+        if cutoff >= 0:
+            return None, None
+        to_goal = []
+        from_start = []
+        for tiles in paths.values():
+            if tiles is None:
+                continue
+            # any part of a shortest path is the shortest path between its ends
+            indices = {tile: i for i, tile in enumerate(tiles)}
+            i, j = indices.get(start), indices.get(goal)
+            if i is not None and j is not None and i <= j:
+                return 'part', tiles[i:j + 1]
+            if tiles[-1] == goal:
+                to_goal.append(tiles)
+            elif tiles[0] == start:
+                from_start.append(tiles[::-1])
+        tiles = None
+        if to_goal:
+            tiles = pathfinding.join_path(grid, start, to_goal, self.splice_radius)
+        # walking is the same both ways except that the goal has to be passable, unless it's off the map
+        if tiles is None and from_start and (grid is None or not grid.in_bounds(*goal) or grid.is_passable(*goal)):
+            tiles = pathfinding.join_path(grid, goal, from_start, self.splice_radius)
+            tiles = None if tiles is None else tiles[::-1]
+        if tiles is None:
+            return None, None
+        self.put(location, version, start, goal, cutoff, tiles)
+        return 'spliced', tiles
+
+    def put(self, location, version, start, goal, cutoff, tiles, source=None, seconds=0):
+        if source is not None:
+            self.search_seconds[source] += seconds
+        if tiles is not None:
+            tiles = tuple(tiles)
+            # the mod paths from wherever the player is when the request gets there
+            if tiles[0] != start or tiles[-1] != goal:
+                return
+        cached = self.locations.get(location)
+        if cached is None or cached[0] != version:
+            cached = self.locations[location] = version, collections.OrderedDict()
+        paths = cached[1]
+        paths[start, goal, cutoff] = tiles
+        paths.move_to_end((start, goal, cutoff))
+        while len(paths) > self.size:
+            paths.popitem(last=False)
+
+    def stats(self):
+        hits = sum(self.hits.values())
+        lookups = hits + sum(self.misses.values())
+        return {
+            'hits': dict(self.hits),
+            'misses': dict(self.misses),
+            'hit_rate': round(hits / lookups, 3) if lookups else None,
+            'saved_seconds': round(self.saved_seconds, 3),
+            'paths': sum(len(paths) for _, paths in self.locations.values()),
+        }
+
+path_cache = PathCache()
+# ids that keep FOLLOW_PATH streams from being shared, see Path.follow
+follow_ids = itertools.count()
 
 class Path:
 
@@ -75,6 +438,12 @@ class Path:
         self.stop_moving_when_done = stop_moving_when_done
         self.turn_threshold = turn_threshold
         self.last_tile_done_threshold = last_tile_done_threshold
+        # FOLLOW_PATH stream while the mod is steering, see follow
+        self.following = None
+        # UPDATE_PATH versions sent and the latest the mod has taken, frames from older ones are skipped
+        self.sent_version = 0
+        self.version = 0
+        self.tile_index = None
 
     @property
     def tiles(self):
@@ -85,17 +454,34 @@ class Path:
         assert new_tiles
         self._tiles = new_tiles
 
-    def retarget(self, p):
+    async def retarget(self, p):
         self.tiles = p.tiles
         self.tile_indices = p.tile_indices
         self.location = p.location
+        if self.following is not None:
+            # the mod goes on along the new tiles from wherever the player is. This isn't input, it has
+            # to stay behind the stream's NEW_STREAM, and frames from before it still count until the
+            # mod says it has the new tiles
+            self.sent_version += 1
+            version = self.sent_version
+            data = {'stream_id': self.following.id, 'version': version, 'tiles': pathfinding.to_points(self.tiles), 'location': self.location}
+            if await server.request('UPDATE_PATH', data, dedupe=False):
+                self.version = max(self.version, version)
+
+    def can_follow_in_mod(self):
+        # a stop_check that isn't a predicate can only be checked here
+        stop_check_ok = self.stop_check is None or isinstance(self.stop_check, predicates.Predicate)
+        return mod_path_following and stop_check_ok and server.FOLLOW_PATH_CAPABILITY in server.mod_capabilities
 
     async def travel(self, status_stream: server.Stream, next_location=None):
+        if self.can_follow_in_mod():
+            await self.follow(next_location)
+            return
         is_done = False
         try:
             while not is_done:
                 player_status = await status_stream.next()
-                current_location = player_status["location"]
+                current_location = player_status.location
                 if current_location != self.location:
                     if next_location == current_location:
                         break
@@ -107,31 +493,87 @@ class Path:
                 except KeyError as e:
                     target_x, target_y = self.tiles[-1] # target can change so check whenever we need a new path
                     current_tiles = self.tiles
-                    new_path = await path_to_tile(target_x, target_y, self.location)
+                    start = player_status.tileX, player_status.tileY
+                    new_path = await path_to_tile(target_x, target_y, self.location, start=start)
                     if current_tiles == self.tiles:
-                        self.retarget(new_path)
+                        await self.retarget(new_path)
         finally:
             if self.stop_moving_when_done:
                 await ensure_not_moving()
 
+    async def follow(self, next_location=None):
+        '''
+        travel with the mod steering, it turns on the tick the player gets to a tile instead of after a
+        status frame went out and the buttons came back. Frames come when the player gets to the next
+        tile on the path, steps off it, or is done.
+        '''
+        data = {
+            'id': next(follow_ids), # a stream of its own even when another path has the same tiles
+            'tiles': pathfinding.to_points(self.tiles),
+            'location': self.location,
+            'nextLocation': next_location,
+            'turnThreshold': self.turn_threshold,
+            'lastTileDoneThreshold': self.last_tile_done_threshold,
+            'stopMovingWhenDone': self.stop_moving_when_done,
+            'stopWhen': None if self.stop_check is None else self.stop_check.wire,
+        }
+        self.sent_version = self.version = 0
+        finished = False
+        self.following = server.Stream('FOLLOW_PATH', data=data, policy=server.BUFFER)
+        try:
+            async for frame in self.following:
+                if frame['version'] < self.version:
+                    # about a path from before the last retarget
+                    continue
+                # a newer one can come before the response to its UPDATE_PATH
+                self.version = frame['version']
+                status = frame['status']
+                if status == 'progress':
+                    self.tile_index = frame['index']
+                elif status == 'off_path':
+                    await self.return_to_path((frame['tileX'], frame['tileY']))
+                elif status == 'failed':
+                    finished = True
+                    raise NavigationFailed(frame['error'])
+                else:
+                    # done or arrived at next_location
+                    finished = True
+                    return
+            raise NavigationFailed(f'Stopped following path at {self.location}')
+        finally:
+            stream, self.following = self.following, None
+            stream.close()
+            # whatever the mod held or released while steering isn't in held_buttons
+            held_buttons.forget(cardinal_buttons)
+            # the mod stops the player itself when it finishes, closing the stream early stops it too
+            # but that can wait behind queries
+            if not finished and self.stop_moving_when_done:
+                stop_moving()
+
+    async def return_to_path(self, start):
+        target_x, target_y = self.tiles[-1]
+        current_tiles = self.tiles
+        new_path = await path_to_tile(target_x, target_y, self.location, start=start)
+        if current_tiles == self.tiles:
+            await self.retarget(new_path)
 
     def move_update(self, player_status):
         """Return False to continue, True when done"""
         if self.stop_check is not None and self.stop_check(player_status):
             return True
-        current_tile = player_status["tileX"], player_status["tileY"]
+        current_tile = player_status.tileX, player_status.tileY
         current_tile_index = self.tile_indices[current_tile]
         try:
             target_tile = self.tiles[current_tile_index + 1]
         except IndexError:
             # Last tile, all done!
-            if player_status["isMoving"] and self.facing_tile_center(player_status, self.last_tile_done_threshold):
+            if player_status.isMoving and self.facing_tile_center(player_status, self.last_tile_done_threshold):
                 return False
             return True
         direction_to_move = direction_from_tiles(current_tile, target_tile)
         # Rule out not moving, moving in the same direction as next tile, and moving in the opposite direction
-        current_direction = player_status["facingDirection"]
-        turn_coming = player_status["isMoving"] and abs(current_direction - direction_to_move) % 2 == 1
+        current_direction = player_status.facingDirection
+        turn_coming = player_status.isMoving and abs(current_direction - direction_to_move) % 2 == 1
         if turn_coming and self.facing_tile_center(player_status, self.turn_threshold):
             return False
         start_moving([direction_to_move])
@@ -140,8 +582,8 @@ class Path:
     def facing_tile_center(self, player_status, offset_threshold):
         """Keep moving towards center of tile before a turn for smoother pathfinding"""
         tile_size = 64  # TODO: get this info from the mod
-        position = player_status["position"]
-        tile_x, tile_y = player_status["tileX"], player_status["tileY"]
+        position = player_status.position
+        tile_x, tile_y = player_status.tileX, player_status.tileY
         # x rounds to the nearest tile, y rounds down unless above (or at?) .75, e.g. (21.68, 17.68) becomes (22, 17) and (21.44, 17.77) becomes (21, 18).
         # Normalize so greater than 0 means right/below the center and less than 0 means left/above
         x, y, = (
@@ -150,7 +592,7 @@ class Path:
         )
         assert -0.5 <= x <= 0.5
         assert -0.5 <= y <= 0.5
-        current_direction = player_status["facingDirection"]
+        current_direction = player_status.facingDirection
         # start turning when at least 43% into the tile
         offset_threshold = offset_threshold
         if current_direction == constants.NORTH:
@@ -172,30 +614,33 @@ def distance_between_points_diagonal(p1, p2):
     y_score = abs(p1[1] - p2[1]) ** 2
     return math.sqrt(x_score + y_score) 
 
-def score_objects_by_distance(start_tile, current_tile, obj_tile, start_weight=0.25, current_weight=0.75):
+def score_objects_by_distance(start_tile, current_tile, obj_tile, start_weight=0.25, current_weight=0.75, distance=distance_between_points):
     assert start_weight + current_weight == 1
-    distance_from_start = distance_between_points(start_tile, obj_tile)
-    distance_from_current = distance_between_points(current_tile, obj_tile)
+    distance_from_start = distance(start_tile, obj_tile)
+    distance_from_current = distance(current_tile, obj_tile)
     return start_weight * distance_from_start  + current_weight * distance_from_current
 
+async def get_terrain_features(location: str, refresh=False):
+    return await location_cache.get('GET_TERRAIN_FEATURES', location, refresh=refresh)
+
 async def get_trees(location: str):
-    terrain_features = await server.request('GET_TERRAIN_FEATURES', {"location": location})
+    terrain_features = await get_terrain_features(location)
     return [tf for tf in terrain_features if tf['type'] == 'tree']
 
 async def get_grass(location: str):
-    terrain_features = await server.request('GET_TERRAIN_FEATURES', {"location": location})
+    terrain_features = await get_terrain_features(location)
     return [tf for tf in terrain_features if tf['type'] == 'grass']
 
 async def get_fully_grown_trees_and_stumps(location: str):
     trees = await get_trees(location)
     return [t for t in trees if t['stump'] or (t['growthStage'] >= 5 and not t['tapped'])] 
 
-async def get_hoe_dirt(location: str):
-    hoe_dirt = await server.request('GET_HOE_DIRT', {"location": location})
+async def get_hoe_dirt(location: str, refresh=False):
+    hoe_dirt = await location_cache.get('GET_HOE_DIRT', location, refresh=refresh)
     return hoe_dirt or []
 
-async def get_location_objects(location: str):
-    objects = await server.request(constants.GET_LOCATION_OBJECTS, {"location": location})
+async def get_location_objects(location: str, max_age=None, refresh=False):
+    objects = await location_cache.get(constants.GET_LOCATION_OBJECTS, location, max_age=max_age, refresh=refresh)
     return objects or []
 
 async def get_resource_clumps(location: str):
@@ -281,9 +726,18 @@ def sort_test_tiles(tiles, start_tile, current_tile, items_to_gather):
 async def pathfind_to_resource(tiles, location, stream, cutoff=-1):
     path = None
     invalid = []
+    player_status = await stream.current()
+    start = player_status['tileX'], player_status['tileY']
+    # one search drops the tiles there's no path to, the rest are still tried in the order given
+    distances = await tile_distances(tiles, location, start)
+    if distances is not None:
+        invalid = [t for t, d in zip(tiles, distances) if d is None]
+        tiles = [t for t, d in zip(tiles, distances) if d is not None]
     for tile in tiles:
         try:
-            path_to_take = await path_to_tile(tile[0], tile[1], location, cutoff=cutoff)
+            player_status = await stream.current()
+            start = player_status['tileX'], player_status['tileY']
+            path_to_take = await path_to_tile(tile[0], tile[1], location, cutoff=cutoff, start=start)
             await path_to_take.travel(stream)
         except NavigationFailed as e:
             invalid.append(tile)
@@ -294,11 +748,18 @@ async def pathfind_to_resource(tiles, location, stream, cutoff=-1):
 
 async def move_to_location(location: str, stream: server.Stream):
     await ensure_not_moving()
-    route = await request_route(location)
+    table = await routes.get_table()
+    route = None
+    if table is not None:
+        player_status = await stream.current()
+        route = table.route(player_status['location'], location)
+    if route is None:
+        route = await request_route(location)
     for i, location in enumerate(route[:-1]):
         next_location = route[i + 1]
         server.log(f"Getting path to next location {next_location}")
-        await pathfind_to_next_location(next_location, stream)
+        came_from = route[i - 1] if i > 0 else None
+        await pathfind_to_next_location(next_location, stream, table=table, came_from=came_from)
 
 async def request_route(location: str):
     route = await server.request("ROUTE", {"toLocation": location})
@@ -307,21 +768,34 @@ async def request_route(location: str):
     return route
 
 
-async def path_to_next_location(next_location: str, status_stream):
+async def path_to_next_location(next_location: str, status_stream, table=None, came_from=None):
     player_status = await status_stream.next()
     location = player_status['location']
-    connections = await get_location_connections()
-    connection_to_next_loc = [c for c in connections if c['TargetName'] == next_location]
+    if table is not None and location in table.connections:
+        # already nearest first from where the player came in when came_from is known
+        connection_to_next_loc = table.leg(location, next_location, came_from)
+        ordered = came_from is not None
+    else:
+        connections = await get_location_connections()
+        connection_to_next_loc = [c for c in connections if c['TargetName'] == next_location]
+        ordered = False
     current_tile = await get_current_tile(status_stream)
-    connection_to_next_loc.sort(key=lambda cn: distance_between_points(current_tile, (cn['X'], cn['Y'])))
+    if len(connection_to_next_loc) > 1 and not ordered:
+        # adjacent is right for doors and never drops a warp tile path_to_tile could reach
+        distances = await tile_distances([(cn['X'], cn['Y']) for cn in connection_to_next_loc], location, current_tile, adjacent=True)
+        if distances is None:
+            connection_to_next_loc.sort(key=lambda cn: distance_between_points(current_tile, (cn['X'], cn['Y'])))
+        else:
+            by_distance = sorted((d, i) for i, d in enumerate(distances) if d is not None)
+            connection_to_next_loc = [connection_to_next_loc[i] for _, i in by_distance]
     for lc in connection_to_next_loc:
         x, y, is_door = lc['X'], lc['Y'], lc['IsDoor']
         try:
             if is_door:
-                path = await path_to_adjacent(x, y)
+                path = await path_to_adjacent(x, y, player_status=player_status)
                 door_direction = direction_from_tiles(path.tiles[-1], (x, y))
             else:
-                path = await path_to_tile(x, y, location)
+                path = await path_to_tile(x, y, location, start=current_tile)
                 door_direction = None
         except NavigationFailed:
             continue
@@ -329,8 +803,87 @@ async def path_to_next_location(next_location: str, status_stream):
     raise NavigationFailed(f"Cannot pathfind from {location} to {next_location}")
 
 
-async def path_to_tile(x, y, location, cutoff=-1):
-    path = await server.request("path_to_tile", {"x": x, "y": y, "location": location, "cutoff": cutoff})
+def can_path_locally():
+    return path_mode != PATHS_MOD and server.PASSABILITY_GRID_CAPABILITY in server.mod_capabilities
+
+async def find_path(location, start, goal, cutoff, request_mod_path):
+    '''
+    Tiles from start to goal like the mod sends them, [{"X": x, "Y": y}, ...], or None when there's
+    no path. request_mod_path is awaited for the mod's path when there's no grid to use.
+    '''
+    grid = None
+    if start is not None and can_path_locally():
+        grid = await location_cache.get_grid(location)
+    version = None
+    if path_caching and start is not None and path_mode != PATHS_CHECK:
+        # without a grid the mod is asked for the version, that's still less than asking for a path
+        version = grid.version if grid is not None else await location_cache.grid_version(location)
+    if version is not None:
+        found, tiles = path_cache.get(location, version, start, goal, cutoff, grid)
+        if found:
+            return pathfinding.to_points(tiles)
+    started = time.perf_counter()
+    if grid is None or path_mode == PATHS_CHECK:
+        path_stats['mod'] += 1
+        mod_path = await request_mod_path()
+        if grid is not None:
+            check_path(grid, start, goal, cutoff, mod_path)
+        tiles = None if mod_path is None else [(p['X'], p['Y']) for p in mod_path]
+    else:
+        path_stats['local'] += 1
+        tiles = pathfinding.find_path(grid, start, goal, cutoff)
+        if tiles is None:
+            path_stats['local_unreachable'] += 1
+    if version is not None:
+        path_cache.put(location, version, start, goal, cutoff, tiles, 'mod' if grid is None else 'local', time.perf_counter() - started)
+    return pathfinding.to_points(tiles)
+
+def check_path(grid, start, goal, cutoff, mod_path):
+    local_tiles = pathfinding.find_path(grid, start, goal, cutoff)
+    mod_tiles = None if mod_path is None else [(p['X'], p['Y']) for p in mod_path]
+    if mod_tiles is None:
+        # the cutoffs count searched tiles a little differently so only a full search is compared
+        ok = local_tiles is None or cutoff >= 0
+    else:
+        ok = local_tiles is not None and len(local_tiles) <= len(mod_tiles) and pathfinding.is_valid_path(grid, mod_tiles, start, goal)
+    path_stats['check_ok' if ok else 'check_mismatch'] += 1
+    if not ok:
+        server.log(f"Path mismatch in {grid.location} v{grid.version} from {start} to {goal}: mod {mod_tiles}, local {local_tiles}", level=2)
+
+async def tile_distances(tiles, location, start, adjacent=False, nearest_only=False, cutoff=-1):
+    '''
+    Walking distance from start, the player's tile, to each of tiles from one search, None where
+    there is no path. The whole result is None when there's neither a grid nor PATHS_TO_TILES to ask.
+    With adjacent a tile counts as reached from the tiles next to it, as pathfind_to_adjacent goes.
+    '''
+    tiles = [tuple(t) for t in tiles]
+    grid = None
+    if can_path_locally():
+        grid = await location_cache.get_grid(location)
+    if grid is not None and path_mode != PATHS_CHECK:
+        path_stats['local_distances'] += 1
+        return pathfinding.distances_to_tiles(grid, start, tiles, adjacent, nearest_only, cutoff)
+    if server.PATHS_TO_TILES_CAPABILITY not in server.mod_capabilities:
+        return None
+    path_stats['mod_distances'] += 1
+    data = {'tiles': [{'tileX': x, 'tileY': y} for x, y in tiles], 'adjacent': adjacent, 'nearestOnly': nearest_only, 'cutoff': cutoff}
+    resp = await server.request('PATHS_TO_TILES', data)
+    if resp['location'] != location:
+        return None
+    if grid is not None and cutoff < 0:
+        local = pathfinding.distances_to_tiles(grid, start, tiles, adjacent, nearest_only)
+        path_stats['check_ok' if local == resp['distances'] else 'check_mismatch'] += 1
+        if local != resp['distances']:
+            server.log(f"Distance mismatch in {grid.location} v{grid.version} from {start}: mod {resp['distances']}, local {local}", level=2)
+    return resp['distances']
+
+async def path_to_tile(x, y, location, cutoff=-1, start=None):
+    if start is None and can_path_locally():
+        status = await get_player_status()
+        if status['location'] == location:
+            start = status['tileX'], status['tileY']
+    request_mod_path = lambda: server.request("path_to_tile", {"x": x, "y": y, "location": location, "cutoff": cutoff})
+    path = await find_path(location, start, (x, y), cutoff, request_mod_path)
     if path is None:
         raise NavigationFailed(f"Cannot pathfind to {x}, {y} at location {location}")
     return Path(path, location)
@@ -345,8 +898,10 @@ async def path_to_player(x, y, location, cutoff=-1):
 async def pathfind_to_next_location(
     next_location: str,
     status_stream: server.Stream,
+    table=None,
+    came_from=None,
 ):
-    path, door_direction = await path_to_next_location(next_location, status_stream)
+    path, door_direction = await path_to_next_location(next_location, status_stream, table, came_from)
     await path.travel(status_stream, next_location)
     if door_direction is not None:
         await face_direction(door_direction, status_stream, move_cursor=True)
@@ -356,9 +911,17 @@ def get_adjacent_tiles(tile):
     x, y = tile
     return [(x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)]
 
-async def path_to_adjacent(x, y, tiles_from_target=1, cutoff=-1):
-    resp = await server.request("PATH_TO_PLAYER", {"x": x, "y": y, "cutoff": cutoff})
-    tiles, location = resp['tiles'], resp['location']
+async def path_to_adjacent(x, y, tiles_from_target=1, cutoff=-1, player_status=None):
+    if player_status is None:
+        resp = await server.request("PATH_TO_PLAYER", {"x": x, "y": y, "cutoff": cutoff})
+        tiles, location = resp['tiles'], resp['location']
+    else:
+        location = player_status['location']
+        player_tile = player_status['tileX'], player_status['tileY']
+        async def request_mod_path():
+            resp = await server.request("PATH_TO_PLAYER", {"x": x, "y": y, "cutoff": cutoff})
+            return resp['tiles']
+        tiles = await find_path(location, (x, y), player_tile, cutoff, request_mod_path)
     if tiles is None:
         raise NavigationFailed(f"Cannot pathfind to player from {x}, {y} at location {location}")
     return tiles_to_adjacent_path(tiles, location, tiles_from_target=tiles_from_target)
@@ -371,7 +934,8 @@ def tiles_to_adjacent_path(tiles, location, tiles_from_target=1):
     return Path(adj_tiles, location)
 
 async def pathfind_to_adjacent(x, y, status_stream: server.Stream, tiles_from_target=1, cutoff=-1):
-    path = await path_to_adjacent(x, y, tiles_from_target=tiles_from_target, cutoff=cutoff)
+    player_status = await status_stream.current()
+    path = await path_to_adjacent(x, y, tiles_from_target=tiles_from_target, cutoff=cutoff, player_status=player_status)
     await path.travel(status_stream)
     if path.tiles[-1] != (x, y):
         direction_to_face = direction_from_tiles(path.tiles[-1], (x, y))
@@ -419,6 +983,7 @@ async def press_and_release(keys):
         await update_held_buttons(to_release=keys)
 
 async def release_all_keys():
+    held_buttons.release_all()
     return await server.request('RELEASE_ALL_KEYS')
 
 def start_moving(directions):
@@ -456,10 +1021,10 @@ async def face_direction(direction: int, stream: server.Stream, move_cursor=Fals
         btn = directions_to_buttons[direction]
         await press_key(btn)
         try:
-            await stream.wait(lambda s: s["facingDirection"] == direction, timeout=0.1)
+            await stream.wait(predicates.field("facingDirection") == direction, timeout=0.1)
         except asyncio.TimeoutError:
             async with press_and_release(btn):
-                await stream.wait(lambda s: s["facingDirection"] == direction, timeout=5)
+                await stream.wait(predicates.field("facingDirection") == direction, timeout=5)
     if move_cursor:
         player_status = await stream.next()
         current_tile = player_status['tileX'], player_status['tileY']
@@ -470,7 +1035,7 @@ async def face_direction(direction: int, stream: server.Stream, move_cursor=Fals
 async def equip_item(predicate):
     matched_index = None
     row_size = 12
-    with server.player_items_stream() as stream, server.async_timeout.timeout(5):
+    with server.player_items_stream(delta=True) as stream, server.async_timeout.timeout(5):
         while True:
             items_info = await stream.next()
             items = items_info['items']
@@ -521,7 +1086,8 @@ def generic_next_item_key(start_tile, current_tile, item, player_status):
     score = score_objects_by_distance(start_tile, current_tile, target_tile)
     return score
 
-def next_crop_key(start_tile, current_tile, target_tile, player_status):
+def next_crop_key(start_tile, current_tile, crop, player_status):
+    target_tile = crop['tileX'], crop['tileY']
     score = score_objects_by_distance(start_tile, current_tile, target_tile)
     if direction_from_tiles(current_tile, target_tile) == player_status['facingDirection']:
         score -= 0.1
@@ -537,6 +1103,35 @@ def next_hoe_key(start_tile, current_tile, target_tile, player_status):
     score = score_objects_by_distance(start_tile, current_tile, target_tile)
     return score
 
+def closest_item_bound(start_tile, current_tile, rect, player_status):
+    return spatial.distance_to_rect(current_tile, rect)
+
+def score_objects_by_distance_bound(start_tile, current_tile, rect, player_status):
+    return score_objects_by_distance(start_tile, current_tile, rect, distance=spatial.distance_to_rect)
+
+def next_crop_bound(start_tile, current_tile, rect, player_status):
+    return score_objects_by_distance_bound(start_tile, current_tile, rect, player_status) - 0.1
+
+# sort key -> lowest score it can give any item in a tile rectangle, keys in here are
+# ordered with a spatial.TileIndex instead of sorting every item
+sort_key_bounds = {
+    closest_item_key: closest_item_bound,
+    generic_next_item_key: score_objects_by_distance_bound,
+    next_debris_key: score_objects_by_distance_bound,
+    next_crop_key: next_crop_bound,
+}
+
+def items_best_first(items, sort_items, start_tile, current_tile, player_status, distances=None):
+    score = lambda t: sort_items(start_tile, current_tile, t, player_status)
+    if distances is not None and sort_items is closest_item_key:
+        # walking distance, closest_item_bound is still a bound since no path is shorter than manhattan distance
+        score = lambda t: distances[t['tileX'], t['tileY']]
+    bound = sort_key_bounds.get(sort_items)
+    if bound is None:
+        return iter(sorted(items, key=score))
+    index = spatial.TileIndex(items)
+    return index.best_first(score, lambda rect: bound(start_tile, current_tile, rect, player_status))
+
 async def get_tools():
     tools = {}
     async with server.player_items_stream(ticks=10) as stream:
@@ -547,14 +1142,60 @@ async def get_tools():
                 tools[item['netName']] = item
     return tools
 
-async def swing_tool():
+async def tool_upgrade_level(base_name):
+    for tool in (await get_tools()).values():
+        if tool['baseName'] == base_name:
+            return tool['upgradeLevel']
+    return 0
+
+async def swing_tool(power=0):
+    '''
+    Swing the current tool, holding the button until it's charged to power first. Only an upgraded
+    hoe or watering can charges, the swing starts when the button is released.
+    '''
     with server.tool_status_stream(ticks=1) as tss:
         async with press_and_release(constants.USE_TOOL_BUTTON):
-            await tss.wait(lambda t: t['inUse'], timeout=10)
-        await tss.wait(lambda t: not t['inUse'], timeout=10)
+            await tss.wait(predicates.field('inUse'), timeout=10)
+            if power:
+                await tss.wait(predicates.field('power') >= power, timeout=10)
+        await tss.wait(~predicates.field('inUse'), timeout=10)
+    # watering or tilling changes hoe dirt without the terrain feature list changing
+    location_cache.invalidate('tool_used', request_types=ACTION_QUERIES)
+
+async def swing_tool_over_tiles(get_items, tool_name, max_power, allowed=None):
+    '''
+    Work on the tiles get_items returns with tool_name charged up to max_power, walking to where
+    tour.plan_swings says to stand for each swing. Planned again until nothing is left or a round
+    of swings doesn't get any further.
+    '''
+    async with server.player_status_stream() as stream:
+        previous_targets = None
+        while True:
+            player_status = await stream.next()
+            location = player_status['location']
+            current_tile = player_status['tileX'], player_status['tileY']
+            targets = {(i['tileX'], i['tileY']) for i in await get_items(location)}
+            if not targets or targets == previous_targets:
+                return
+            previous_targets = targets
+            grid = await location_cache.get_grid(location) if can_path_locally() else None
+            swings = await server.loop.run_in_executor(None, tour.plan_swings, targets, current_tile, max_power, grid, allowed)
+            for swing in swings:
+                try:
+                    await pathfind_to_tile(swing.stand[0], swing.stand[1], stream)
+                except NavigationFailed:
+                    continue
+                await equip_item_by_name(tool_name)
+                if swing.facing is None:
+                    await set_mouse_position_on_tile(swing.tiles[0])
+                else:
+                    await face_direction(swing.facing, stream, move_cursor=True)
+                await swing_tool(swing.power)
 
 async def do_action():
     await press_key(constants.ACTION_BUTTON)
+    # harvesting a crop or grabbing from a machine doesn't send a list changed event either
+    location_cache.invalidate('action', request_types=ACTION_QUERIES)
 
 async def pathfind_to_adjacent_tile_from_current(stream):
     player_status = await stream.next()
@@ -568,7 +1209,7 @@ async def pathfind_to_adjacent_tile_from_current(stream):
 
 async def navigate_tiles(get_items, sort_items=generic_next_item_key, pathfind_fn=pathfind_to_adjacent,
     items_ok=lambda prev, curr: True,
-    allow_action_on_same_tile=True, index=None):
+    allow_action_on_same_tile=True, index=None, planner=None):
     import events
     async with server.player_status_stream() as stream:
         player_status = await stream.next()
@@ -583,26 +1224,80 @@ async def navigate_tiles(get_items, sort_items=generic_next_item_key, pathfind_f
                 raise RuntimeError('Unable to modify current tile')
             previous_items = items
             item_path = None
-            sorted_items = sorted(items, key=lambda t: sort_items(start_tile, current_tile, t, player_status))
-            if index is not None:
-                sorted_items = [sorted_items[index]]
-            for item in sorted_items:
-                item_tile = (item['tileX'], item['tileY'])
-                if current_tile == item_tile and not allow_action_on_same_tile:
-                    await pathfind_to_adjacent_tile_from_current(stream)
-                    await face_tile(stream, item_tile)
-                try:
-                    item_path = await pathfind_fn(item['tileX'], item['tileY'], stream)
-                except NavigationFailed:
-                    pass
+            # only the nearest items are wanted for closest_item_key, so the first search can stop at
+            # them. When none of those can be got to the rest are searched for and tried after all
+            nearest_only = sort_items is closest_item_key and index is None
+            tried = set()
+            while True:
+                distances = await reachable_items(items, pathfind_fn, player_status['location'], current_tile, nearest_only)
+                candidates = items
+                if distances is not None:
+                    candidates = [i for i in items if (i['tileX'], i['tileY']) in distances]
+                if planner is not None and tour_planning:
+                    sorted_items = await planned_order(planner, candidates, player_status['location'], current_tile)
                 else:
-                    await set_mouse_position_on_tile(item_tile)
-                    yield item
+                    sorted_items = items_best_first(candidates, sort_items, start_tile, current_tile, player_status, distances)
+                if index is not None:
+                    sorted_items = list(itertools.islice(sorted_items, index + 1))[index:]
+                # a planner works on items from a tile within reach of them, which the player's own tile isn't
+                same_tile_ok = allow_action_on_same_tile and (planner is None or not tour_planning)
+                for item in sorted_items:
+                    item_tile = (item['tileX'], item['tileY'])
+                    if item_tile in tried:
+                        continue
+                    tried.add(item_tile)
+                    stand = planned_stand(planner, item_tile, current_tile)
+                    if stand is None and current_tile == item_tile and not same_tile_ok:
+                        await pathfind_to_adjacent_tile_from_current(stream)
+                        await face_tile(stream, item_tile)
+                    try:
+                        if stand is None:
+                            item_path = await pathfind_fn(item['tileX'], item['tileY'], stream)
+                        else:
+                            item_path = await pathfind_to_tile(stand[0], stand[1], stream)
+                    except NavigationFailed:
+                        pass
+                    else:
+                        await set_mouse_position_on_tile(item_tile)
+                        yield item
+                        break
+                if item_path or not nearest_only:
                     break
+                nearest_only = False
             if not item_path:
                 return
             player_status = await stream.next()
 
+async def reachable_items(items, pathfind_fn, location, current_tile, nearest_only=False):
+    '''
+    {tile: walking distance} of the items pathfind_fn can get to, or None if that isn't known, so
+    navigate_tiles doesn't try to pathfind to each item it can't reach.
+    '''
+    adjacent = reach_modes.get(pathfind_fn)
+    if adjacent is None:
+        return None
+    tiles = [(i['tileX'], i['tileY']) for i in items]
+    distances = await tile_distances(tiles, location, current_tile, adjacent=adjacent, nearest_only=nearest_only)
+    if distances is None:
+        return None
+    return {t: d for t, d in zip(tiles, distances) if d is not None}
+
+async def planned_order(planner, items, location, current_tile):
+    grid = await location_cache.get_grid(location) if can_path_locally() else None
+    # planning a whole field takes most of a second, the loop keeps handling streams meanwhile
+    return await server.loop.run_in_executor(None, planner.order_items, items, current_tile, grid)
+
+def planned_stand(planner, tile, current_tile):
+    '''
+    Where the planner means to work on tile from, the current tile when it's already within reach.
+    The mouse is put on the item before it's yielded, so the player doesn't have to face it.
+    '''
+    if planner is None or not tour_planning:
+        return None
+    if tour.within_reach(current_tile, tile):
+        return current_tile
+    return planner.standing_tile(tile)
+
 async def navigate_nearest_tile(get_items, pathfind_fn=pathfind_to_adjacent, index=None):
     async for item in navigate_tiles(get_items, sort_items=closest_item_key, pathfind_fn=pathfind_fn, index=index):
         return item
@@ -679,6 +1374,10 @@ async def write_game_state():
     menu = await menu_utils.get_active_menu()
     log(menu, "menu.json")
 
+async def write_stats():
+    stats = {"location_cache": location_cache.stats(), "paths": dict(path_stats), "path_cache": path_cache.stats(), "held_buttons": held_buttons.stats()}
+    log({**server.stats(), **stats}, "stats.json")
+
 async def get_ready_crafted(loc):
     objs = await get_location_objects(loc)
     ready_crafted = [x for x in objs if x['readyForHarvest'] and x['type'] == "Crafting"]
@@ -698,15 +1397,15 @@ def visible_wrapper(fn):
     return get_visible
 
 async def get_forage_visible_items(loc):
-    items = await get_location_objects(loc)
+    items = await get_location_objects(loc, max_age=VISIBLE_ITEMS_MAX_AGE)
     return [x for x in items if x['canBeGrabbed'] and x['type'] == "Basic" and x['isForage']]
 
 async def get_visible_artifact_spots(loc):
-    objs = await get_location_objects(loc)
+    objs = await get_location_objects(loc, max_age=VISIBLE_ITEMS_MAX_AGE)
     return [x for x in objs if x['name'] == "Artifact Spot"]
 
 async def get_grabble_visible_objects(loc):
-    objs = await get_location_objects(loc)
+    objs = await get_location_objects(loc, max_age=VISIBLE_ITEMS_MAX_AGE)
     filtered_objs = []
     for o in objs:
         if o['canBeGrabbed'] and o['type'] == "Basic" and o['category'] != 0:
@@ -796,7 +1495,7 @@ async def get_animals(animals_stream, player_stream):
 async def use_tool_on_animal_by_name(name: str):
     did_use = await server.request('USE_TOOL_ON_ANIMAL_BY_NAME', {'name': name})
     async with server.tool_status_stream() as tss:
-        await tss.wait(lambda t: not t['inUse'])
+        await tss.wait(~predicates.field('inUse'))
     return did_use
 
 def log(obj, name):
@@ -806,7 +1505,7 @@ def log(obj, name):
         if isinstance(obj, str):
             f.write(obj)
         else:
-            json.dump(obj, f, indent=4)
+            json.dump(obj, f, indent=4, default=records.to_plain)
 
 async def pet_animal_by_name(name: str):
     resp = await server.request("PET_ANIMAL_BY_NAME", {"name": name})
@@ -829,14 +1528,15 @@ class MoveToCharacter:
             if 'pathTiles' in npc:
                 async with server.player_status_stream() as travel_path_stream:
                     path = tiles_to_adjacent_path(npc['pathTiles'], npc['location'], tiles_from_target=tiles_from_target)
-                    # don't share streams between tasks, otherwise they steal .next() from each other and cause resource starvation issues
+                    # separate cursor for the travel task, cursors sharing one .next() would steal values from each other.
+                    # Cursors on the same stream share one subscription on the mod side so this is cheap
                     pathfind_coro = path.travel(travel_path_stream) 
                     pathfind_task_wrapper = objective.active_objective.add_task(pathfind_coro)
                     while not pathfind_task_wrapper.done:
                         npc = await self.get_character(npc)
                         if 'pathTiles' in npc:
                             new_path = tiles_to_adjacent_path(npc['pathTiles'], npc['location'], tiles_from_target=tiles_from_target)
-                            path.retarget(new_path)
+                            await path.retarget(new_path)
                     if pathfind_task_wrapper.exception:
                         raise pathfind_task_wrapper.exception
             try:
@@ -903,10 +1603,16 @@ async def face_tile(stream, tile):
 async def pathfind_to_tile(x, y, stream, cutoff=-1):
     status = await stream.next()
     loc = status['location']
-    path = await path_to_tile(x, y, loc, cutoff=cutoff)
+    path = await path_to_tile(x, y, loc, cutoff=cutoff, start=(status['tileX'], status['tileY']))
     await path.travel(stream)
     return path
 
+# whether each pathfind_fn stops next to the tile rather than on it, for tile_distances
+reach_modes = {
+    pathfind_to_adjacent: True,
+    pathfind_to_tile: False,
+}
+
 async def move_n_tiles(direction: int, n: int, stream):
     status = await get_player_status()
     await ensure_not_moving()
@@ -922,7 +1628,7 @@ async def move_n_tiles(direction: int, n: int, stream):
         to_x -= n
     else:
         raise ValueError(f"Unexpected direction {direction}")
-    path = await path_to_tile(to_x, to_y, status['location'])
+    path = await path_to_tile(to_x, to_y, status['location'], start=(from_x, from_y))
     await path.travel(stream)
 
 async def get_player_status():
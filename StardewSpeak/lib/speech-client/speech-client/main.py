@@ -31,11 +31,19 @@ IS_FROZEN = getattr(sys, 'frozen', False)
 
 parser = argparse.ArgumentParser(description='Process some integers.')
 parser.add_argument('--python_root', default=None, help='Root python directory')
+parser.add_argument('--mod_capabilities', default='', help='Comma separated list of protocol features the mod supports')
+parser.add_argument('--record_traffic', action='store_true', help='Record all mod traffic to the debug directory for benchmarks/replay.py')
+parser.add_argument('--auto_batch', action='store_true', help='Send read-only requests made together as a single REQUEST_BATCH')
+parser.add_argument('--path_mode', choices=('local', 'mod', 'check'), default='local', help='Where paths come from, see game.path_mode')
 args = parser.parse_args()
 if args.python_root is None:
     args.python_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
 MODELS_DIR = os.path.abspath(os.path.join(args.python_root, 'models'))
+MOD_CAPABILITIES = [x for x in args.mod_capabilities.split(',') if x]
+RECORD_TRAFFIC = args.record_traffic
+AUTO_BATCH = args.auto_batch
+PATH_MODE = args.path_mode
 
 user_lexicon = (
     ('joja', "dZ 'o U dZ 'V"),
@@ -49,6 +57,8 @@ class Observer(RecognitionObserver):
     def on_recognition(self, words):
         import server
         server.log("Recognized:", " ".join(words), level=1)
+        if server.recorder is not None:
+            server.recorder.note({"recognized": " ".join(words)})
 
     def on_failure(self):
         pass
@@ -129,7 +139,13 @@ def main(args):
 
     sleep.load_sleep_wake_grammar(True)
     stardew_context = AppContext(title="stardew")
-    server.setup_async_loop()
+    record_path = None
+    if RECORD_TRAFFIC:
+        import traffic
+        record_path = traffic.default_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'debug'))
+    server.setup_async_loop(capabilities=MOD_CAPABILITIES, record_path=record_path, batch_requests=AUTO_BATCH)
+    import game
+    game.path_mode = PATH_MODE
     map_contexts_to_builder = {
         (stardew_context,): any_context.rule_builder(),
     }
@@ -0,0 +1,142 @@
+'''
+Counters for traffic between the client and the mod: per request type round trip latency and
+bytes on the wire, and per stream frame rates. Responses and stream frames are recorded on the
+event loop thread, but messages can be sent from others, like log messages from the recognition
+observer on the engine thread, so every update and read holds lock.
+'''
+import collections
+import math
+import threading
+
+# log-linear buckets, 16 per power of two, so any percentile is within ~3% of the real value
+SUB_BUCKETS = 16
+
+
+class Histogram:
+
+    def __init__(self):
+        self.buckets = collections.Counter()
+        self.count = 0
+        self.total = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.buckets[bucket_for(value)] += 1
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                return min(max(bucket_midpoint(key), self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+def bucket_for(value):
+    if value <= 0:
+        return -math.inf
+    mantissa, exponent = math.frexp(value)
+    return exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+
+def bucket_midpoint(key):
+    if key == -math.inf:
+        return 0
+    exponent, sub = divmod(key, SUB_BUCKETS)
+    width = 2.0 ** exponent / (2 * SUB_BUCKETS)
+    return 2.0 ** exponent / 2 + width * (sub + 0.5)
+
+
+class RequestStats:
+
+    def __init__(self):
+        self.sent = 0
+        self.responses = 0
+        self.errors = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.latency = Histogram()
+
+    def summary(self):
+        ms = lambda x: None if x is None else round(x * 1000, 3)
+        return {
+            'sent': self.sent,
+            'responses': self.responses,
+            'errors': self.errors,
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'mean_ms': ms(self.latency.mean()),
+            'p50_ms': ms(self.latency.percentile(0.5)),
+            'p95_ms': ms(self.latency.percentile(0.95)),
+            'p99_ms': ms(self.latency.percentile(0.99)),
+            'max_ms': ms(self.latency.max if self.latency.count else None),
+        }
+
+
+class StreamRate:
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes_in = 0
+        self.first_at = None
+        self.last_at = None
+
+    def summary(self):
+        elapsed = self.last_at - self.first_at if self.frames > 1 else 0
+        return {
+            'frames': self.frames,
+            'bytes_in': self.bytes_in,
+            'fps': round((self.frames - 1) / elapsed, 2) if elapsed > 0 else None,
+        }
+
+
+requests = collections.defaultdict(RequestStats) # message type -> RequestStats
+streams = collections.defaultdict(StreamRate) # stream label -> StreamRate
+lock = threading.Lock()
+
+def message_sent(msg_type, size):
+    with lock:
+        stats = requests[msg_type]
+        stats.sent += 1
+        stats.bytes_out += size
+
+def response_received(msg_type, size, latency, error=None):
+    with lock:
+        stats = requests[msg_type]
+        stats.responses += 1
+        stats.bytes_in += size
+        stats.latency.record(latency)
+        if error is not None:
+            stats.errors += 1
+
+def stream_frame(label, size, now):
+    with lock:
+        rate = streams[label]
+        rate.frames += 1
+        rate.bytes_in += size
+        if rate.first_at is None:
+            rate.first_at = now
+        rate.last_at = now
+
+def snapshot():
+    with lock:
+        return {
+            'requests': {k: v.summary() for k, v in sorted(requests.items())},
+            'streams': {k: v.summary() for k, v in sorted(streams.items())},
+        }
+
+def reset():
+    with lock:
+        requests.clear()
+        streams.clear()
@@ -16,7 +16,7 @@ import server
 from dragonfly import *
 from srabuilder import rules
 
-import constants, server, game, df_utils
+import constants, server, game, df_utils, tour
 
 active_objective = None
 pending_objective = None
@@ -152,7 +152,12 @@ class WaterCropsObjective(Objective):
 
     async def run(self):
         await game.equip_item_by_name(constants.WATERING_CAN)
-        async for crop in game.navigate_tiles(self.get_unwatered_crops, game.generic_next_item_key, allow_action_on_same_tile=False):
+        max_power = await game.tool_upgrade_level(constants.WATERING_CAN)
+        if max_power and game.aoe_planning:
+            await game.swing_tool_over_tiles(self.get_unwatered_crops, constants.WATERING_CAN, max_power)
+            return
+        planner = tour.TourPlanner()
+        async for crop in game.navigate_tiles(self.get_unwatered_crops, game.generic_next_item_key, allow_action_on_same_tile=False, planner=planner):
             await game.equip_item_by_name(constants.WATERING_CAN)
             await game.swing_tool()
 
@@ -164,7 +169,8 @@ class HarvestCropsObjective(Objective):
         return harvestable_crop_tiles
 
     async def run(self):
-        async for crop in game.navigate_tiles(self.get_harvestable_crops, game.generic_next_item_key):
+        planner = tour.TourPlanner()
+        async for crop in game.navigate_tiles(self.get_harvestable_crops, game.generic_next_item_key, planner=planner):
             await game.do_action()
 
 
@@ -249,7 +255,7 @@ class PlantSeedsOrFertilizerObjective(Objective):
 class HoePlotObjective(Objective):
 
     def __init__(self, n1, n2):
-        self.n1 = n1f
+        self.n1 = n1
         self.n2 = n2
 
     async def run(self):
@@ -268,6 +274,10 @@ class HoePlotObjective(Objective):
                 y = start_tile[1] + j * y_increment
                 plot_tiles.add((x, y))
         get_next_diggable = functools.partial(game.get_diggable_tiles, plot_tiles)
+        max_power = await game.tool_upgrade_level(constants.HOE)
+        if max_power and game.aoe_planning:
+            await game.swing_tool_over_tiles(get_next_diggable, constants.HOE, max_power, allowed=plot_tiles)
+            return
         async for hdt in game.navigate_tiles(get_next_diggable, game.generic_next_item_key, allow_action_on_same_tile=False):
             await game.equip_item_by_name(constants.HOE)
             await game.swing_tool()
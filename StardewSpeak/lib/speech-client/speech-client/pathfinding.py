@@ -0,0 +1,220 @@
+'''
+Tile pathfinding in the client over a location's passability grid from GET_PASSABILITY_GRID, so
+trying a few candidate targets doesn't cost a mod round trip each. Same rules as Pathfinder.findPath
+in the mod: four directions, the start tile doesn't have to be passable, and the goal may be off the
+map, as warps at the edge are.
+'''
+import heapq
+import itertools
+
+PASSABLE = '.'
+DIRECTIONS = ((-1, 0), (1, 0), (0, 1), (0, -1))
+
+
+class Grid:
+
+    def __init__(self, location, version, width, height, rows):
+        self.location = location
+        self.version = version
+        self.width = width
+        self.height = height
+        # flat list of passable flags, y * width + x
+        self.passable = [c == PASSABLE for row in rows for c in row]
+
+    @classmethod
+    def from_wire(cls, value):
+        if value is None:
+            return None
+        return cls(value['location'], value['version'], value['width'], value['height'], value['rows'])
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_passable(self, x, y):
+        return self.in_bounds(x, y) and self.passable[y * self.width + x]
+
+def find_path(grid, start, goal, limit=-1):
+    '''
+    Shortest list of tiles from start to goal inclusive, or None. limit caps the number of tiles
+    expanded like the mod's cutoff.
+    '''
+    if start == goal:
+        return [start]
+    gx, gy = goal
+    width, height, passable = grid.width, grid.height, grid.passable
+    if grid.in_bounds(gx, gy) and not passable[gy * width + gx]:
+        return None
+    counter = itertools.count()
+    open_heap = [(abs(gx - start[0]) + abs(gy - start[1]), next(counter), 0, start)]
+    parents = {start: None}
+    costs = {start: 0}
+    iterations = 0
+    while open_heap:
+        _, _, cost, current = heapq.heappop(open_heap)
+        if current == goal:
+            return reconstruct(parents, current)
+        if cost > costs[current]:
+            continue
+        x, y = current
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height:
+                if not passable[ny * width + nx]:
+                    continue
+            elif (nx, ny) != goal:
+                continue
+            neighbor = nx, ny
+            new_cost = cost + 1
+            if new_cost >= costs.get(neighbor, new_cost + 1):
+                continue
+            costs[neighbor] = new_cost
+            parents[neighbor] = current
+            heapq.heappush(open_heap, (new_cost + abs(gx - nx) + abs(gy - ny), next(counter), new_cost, neighbor))
+        iterations += 1
+        if 0 <= limit <= iterations:
+            return None
+    return None
+
+def distances_to_tiles(grid, start, targets, adjacent=False, nearest_only=False, limit=-1):
+    '''
+    Walking distance from start to each of targets with one breadth first search, None for the ones
+    it didn't reach. Same as Pathfinder.DistancesToTiles in the mod: with adjacent a target is
+    reached from any passable tile next to it, and nearest_only stops after the first step that
+    reaches a target. limit caps the number of tiles expanded.
+    '''
+    distances = [None] * len(targets)
+    target_indexes = {}
+    for i, target in enumerate(targets):
+        target_indexes.setdefault(tuple(target), []).append(i)
+    target_tiles = len(target_indexes)
+    width, height, passable = grid.width, grid.height, grid.passable
+    for i in target_indexes.pop(start, ()):
+        distances[i] = 0
+    seen = {start}
+    frontier = [start]
+    distance = 0
+    iterations = 0
+    while frontier and target_indexes:
+        if nearest_only and len(target_indexes) < target_tiles:
+            break
+        distance += 1
+        next_frontier = []
+        for x, y in frontier:
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                neighbor = nx, ny
+                if neighbor in seen:
+                    continue
+                in_bounds = 0 <= nx < width and 0 <= ny < height
+                if in_bounds and passable[ny * width + nx]:
+                    seen.add(neighbor)
+                    next_frontier.append(neighbor)
+                elif in_bounds and not adjacent:
+                    continue
+                for i in target_indexes.pop(neighbor, ()):
+                    distances[i] = distance
+            iterations += 1
+            if 0 <= limit <= iterations:
+                return distances
+        frontier = next_frontier
+    return distances
+
+def nearest_tiles(grid, start, targets, count, adjacent=False):
+    '''
+    [(distance, tile)] of the count nearest tiles in the set targets, nearest first, searched the
+    same way as distances_to_tiles. Ties at the last distance are all included.
+    '''
+    found = [(0, start)] if start in targets else []
+    width, height, passable = grid.width, grid.height, grid.passable
+    seen = {start}
+    reached = set()
+    frontier = [start]
+    distance = 0
+    while frontier and len(found) < count:
+        distance += 1
+        next_frontier = []
+        for x, y in frontier:
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                neighbor = nx, ny
+                if neighbor in seen:
+                    continue
+                in_bounds = 0 <= nx < width and 0 <= ny < height
+                if in_bounds and passable[ny * width + nx]:
+                    seen.add(neighbor)
+                    next_frontier.append(neighbor)
+                elif in_bounds and not adjacent:
+                    continue
+                if neighbor in targets and neighbor not in reached:
+                    reached.add(neighbor)
+                    found.append((distance, neighbor))
+        frontier = next_frontier
+    return found
+
+def join_path(grid, start, paths, radius):
+    '''
+    Shortest way from start onto one of paths, all ending at the same tile, and along it to the end,
+    searching only tiles within radius steps of start. None if none of them come that close. Without
+    a grid only a path tile next to start is joined, those are passable since a path went over them.
+    '''
+    remaining = {}
+    for path in paths:
+        for i, tile in enumerate(path):
+            left = len(path) - 1 - i
+            if tile not in remaining or left < remaining[tile][0]:
+                remaining[tile] = left, path, i
+    best = None
+    if start in remaining:
+        best = remaining[start][0], start
+    parents = {start: None}
+    frontier = [start]
+    distance = 0
+    # tiles further out can't be joined for less than their distance
+    while frontier and distance < radius and (best is None or distance < best[0]):
+        distance += 1
+        next_frontier = []
+        for x, y in frontier:
+            for dx, dy in DIRECTIONS:
+                neighbor = x + dx, y + dy
+                if neighbor in parents:
+                    continue
+                if grid is None:
+                    if neighbor not in remaining:
+                        continue
+                elif not grid.is_passable(*neighbor):
+                    continue
+                parents[neighbor] = x, y
+                next_frontier.append(neighbor)
+                if neighbor in remaining and (best is None or distance + remaining[neighbor][0] < best[0]):
+                    best = distance + remaining[neighbor][0], neighbor
+        if grid is None:
+            break
+        frontier = next_frontier
+    if best is None:
+        return None
+    _, join = best
+    _, path, i = remaining[join]
+    return reconstruct(parents, join) + list(path[i + 1:])
+
+def reconstruct(parents, tile):
+    path = []
+    while tile is not None:
+        path.append(tile)
+        tile = parents[tile]
+    return path[::-1]
+
+def is_valid_path(grid, path, start, goal):
+    # what a path from anywhere has to satisfy, used to check paths from the mod against the grid
+    if not path or tuple(path[0]) != tuple(start) or tuple(path[-1]) != tuple(goal):
+        return False
+    for i, (x, y) in enumerate(path[1:], 1):
+        px, py = path[i - 1]
+        if abs(x - px) + abs(y - py) != 1:
+            return False
+        off_map_goal = (x, y) == tuple(goal) and not grid.in_bounds(x, y)
+        if not off_map_goal and not grid.is_passable(x, y):
+            return False
+    return True
+
+def to_points(path):
+    return None if path is None else [{'X': x, 'Y': y} for x, y in path]
@@ -0,0 +1,119 @@
+'''
+Conditions on stream values that the mod can check itself, so Stream.wait only gets sent the
+frames that match instead of one every tick. Built from fields of the value:
+
+    (predicates.field('isTimingCast') & (predicates.field('castingPower') > 0.95))
+    ~predicates.field('inUse')
+    predicates.field('facingDirection') == direction
+
+On the wire a condition is a nested list in prefix form, ["and", ["truthy", "isTimingCast"],
+[">", "castingPower", 0.95]], mirrored by Predicate.cs in the mod. Field paths can go into arrays
+and objects with dots, "position.0". A condition is also callable on a value so it works anywhere a
+lambda does, and a missing field is None rather than a KeyError.
+'''
+
+COMPARISONS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+class Predicate:
+
+    def __init__(self, wire):
+        self.wire = wire
+
+    def __and__(self, other):
+        return Predicate(['and', self.wire, other.wire])
+
+    def __or__(self, other):
+        return Predicate(['or', self.wire, other.wire])
+
+    def __invert__(self):
+        return Predicate(['not', self.wire])
+
+    def __bool__(self):
+        raise TypeError('Combine conditions with &, | and ~ rather than and, or and not')
+
+    def __call__(self, value):
+        return evaluate(self.wire, value)
+
+    def __repr__(self):
+        return f'Predicate({self.wire!r})'
+
+
+class Field(Predicate):
+
+    def __init__(self, path):
+        super().__init__(['truthy', path])
+        self.path = path
+
+    def compare(self, op, other):
+        return Predicate([op, self.path, other])
+
+    def __eq__(self, other):
+        return self.compare('==', other)
+
+    def __ne__(self, other):
+        return self.compare('!=', other)
+
+    def __lt__(self, other):
+        return self.compare('<', other)
+
+    def __le__(self, other):
+        return self.compare('<=', other)
+
+    def __gt__(self, other):
+        return self.compare('>', other)
+
+    def __ge__(self, other):
+        return self.compare('>=', other)
+
+    __hash__ = None
+
+def field(path):
+    return Field(path)
+
+def evaluate(wire, value):
+    op = wire[0]
+    if op == 'and':
+        return all(evaluate(p, value) for p in wire[1:])
+    if op == 'or':
+        return any(evaluate(p, value) for p in wire[1:])
+    if op == 'not':
+        return not evaluate(wire[1], value)
+    field_value = resolve(value, wire[1])
+    if op == 'truthy':
+        return bool(field_value)
+    return compare(op, field_value, wire[2])
+
+def resolve(value, path):
+    for segment in path.split('.'):
+        if isinstance(value, list):
+            try:
+                value = value[int(segment)]
+            except (ValueError, IndexError):
+                return None
+        elif value is None:
+            return None
+        else:
+            try:
+                value = value[segment]
+            except (KeyError, TypeError):
+                return None
+    return value
+
+def compare(op, a, b):
+    if op in ('==', '!='):
+        return COMPARISONS[op](a, b)
+    # ordering only means something between two numbers or two strings, same as the mod
+    numbers = is_number(a) and is_number(b)
+    strings = isinstance(a, str) and isinstance(b, str)
+    return (numbers or strings) and COMPARISONS[op](a, b)
+
+def is_number(x):
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
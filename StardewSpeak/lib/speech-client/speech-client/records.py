@@ -0,0 +1,148 @@
+'''
+Slotted records for the state the mod sends every tick, built from the decoded message when a
+cursor first reads the frame, so the many 1-tick frames that are overwritten unread cost nothing
+extra. Fields are attributes named as on the wire, status.tileX, which skips the dict lookup and
+keeps each value small. Dict style access, status["tileX"], still works the same including
+KeyError for fields the mod left out, so callers can move over one at a time.
+
+Only the player status is read field by field often enough to make up for building a record,
+tool status, items and the location's objects stay plain dicts.
+'''
+
+
+class Record:
+    __slots__ = ('_extra',)
+    field_names = ()
+    fields = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.field_names = cls.field_names + tuple(cls.__dict__.get('__slots__', ()))
+        cls.fields = frozenset(cls.field_names)
+        cls.from_wire = fast_from_wire(cls)
+
+    @classmethod
+    def from_wire(cls, value):
+        # any value, including ones with fields missing or fields newer mod versions send
+        if value is None:
+            return None
+        record = cls.__new__(cls)
+        record._extra = None
+        for key, field_value in value.items():
+            if key in cls.fields:
+                setattr(record, key, field_value)
+            else:
+                # something newer mod versions send that isn't a field here yet
+                if record._extra is None:
+                    record._extra = {}
+                record._extra[key] = field_value
+        return record
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.fields:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        if key in self.fields:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def keys(self):
+        keys = [k for k in self.field_names if hasattr(self, k)]
+        if self._extra is not None:
+            keys.extend(self._extra)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.to_dict()!r})'
+
+
+def fast_from_wire(cls):
+    '''
+    from_wire for cls with a line assigning each field, like namedtuple builds its methods. A loop
+    over the fields takes twice as long, and values with exactly the fields, which is nearly all
+    of them, don't need one. Anything else goes to Record.from_wire.
+    '''
+    slow = Record.from_wire.__func__
+    lines = [
+        'def from_wire(value):',
+        '    if value is None:',
+        '        return None',
+        f'    if len(value) != {len(cls.field_names)}:',
+        '        return slow(cls, value)',
+        '    record = new(cls)',
+        '    record._extra = None',
+        '    try:',
+    ]
+    lines.extend(f'        record.{name} = value[{name!r}]' for name in cls.field_names)
+    lines.extend([
+        '    except KeyError:',
+        '        return slow(cls, value)',
+        '    return record',
+    ])
+    namespace = {'cls': cls, 'slow': slow, 'new': object.__new__}
+    exec('\n'.join(lines), namespace)
+    return namespace['from_wire']
+
+
+class PlayerStatus(Record):
+    __slots__ = ('location', 'position', 'center', 'tileX', 'tileY', 'canMove', 'facingDirection', 'isMoving',
+        'lastWarp', 'currentEvent')
+
+
+# request type -> function building records from its decoded response or stream value
+DECODERS = {
+    'PLAYER_STATUS': PlayerStatus.from_wire,
+}
+
+def decode(request_type, value):
+    decoder = DECODERS.get(request_type)
+    return value if decoder is None else decoder(value)
+
+def to_plain(obj):
+    # default= hook for json.dumps and msgpack.packb when a record ends up in an outgoing message
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not serializable')
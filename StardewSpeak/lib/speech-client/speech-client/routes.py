@@ -0,0 +1,195 @@
+'''
+Routes between locations from a table of every location's connections and the walking distances
+between them, so move_to_location doesn't ask the mod for a ROUTE and then for each leg's
+connections. The table is built once per save and kept on disk by save and game version. After that
+only locations whose connections changed, like the farm after a building went up or was moved, have
+their distances asked for again.
+
+Routes go through the fewest locations like ROUTE does. Between routes through as many, the one
+with the least walking from the connection each location is entered by to the one it's left by wins.
+'''
+import asyncio
+import heapq
+import itertools
+import json
+import os
+
+import server
+
+table_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'route_tables')
+# walking counted for a connection there's no path to from where a location is entered, ROUTE doesn't
+# know about walking either so the route still goes that way when there's no other
+NO_PATH_DISTANCE = 10 ** 4
+
+# RouteTable for the save that's loaded, see get_table
+table = None
+loading = None
+
+
+class RouteTable:
+
+    def __init__(self, save_id, game_version, connections=None, distances=None):
+        self.save_id = save_id
+        self.game_version = game_version
+        # location -> [connection like GET_LOCATION_CONNECTIONS sends]
+        self.connections = connections or {}
+        # location -> [[walking distance from its connection i to j, or None]], missing until the mod sent it
+        self.distances = distances or {}
+        # start -> {(location, index of the connection it was entered by): ((locations, walking), previous)}
+        self.searches = {}
+
+    def update(self, connections):
+        '''
+        Take every location's connections, dropping the distances of the ones that changed. Returns
+        the locations there are no distances for, ones with a single connection don't need any.
+        '''
+        for location in list(self.distances):
+            if connections.get(location) != self.connections.get(location):
+                del self.distances[location]
+        self.connections = connections
+        self.searches.clear()
+        return [loc for loc, cns in connections.items() if len(cns) > 1 and loc not in self.distances]
+
+    def set_distances(self, location, distances):
+        self.distances[location] = distances
+        self.searches.clear()
+
+    def route(self, start, destination):
+        '''
+        [start, ..., destination] like ROUTE sends, or None when destination can't be reached.
+        '''
+        if start not in self.connections:
+            return None
+        search = self.searches.get(start)
+        if search is None:
+            search = self.searches[start] = self.search(start)
+        ends = [(cost, state) for state, (cost, _) in search.items() if state[0] == destination]
+        if not ends:
+            return None
+        state = min(ends, key=lambda end: end[0])[1]
+        route = []
+        while state is not None:
+            route.append(state[0])
+            state = search[state][1]
+        return route[::-1]
+
+    def search(self, start):
+        # Dijkstra over (location, connection it was entered by) on (locations, walking), the walking
+        # in a location depends on where it was entered
+        counter = itertools.count()
+        first = start, None
+        found = {first: ((0, 0), None)}
+        heap = [((0, 0), next(counter), first)]
+        while heap:
+            cost, _, state = heapq.heappop(heap)
+            if found[state][0] < cost:
+                continue
+            location, entry = state
+            hops, walking = cost
+            for i, cn in enumerate(self.connections[location]):
+                target = cn['TargetName']
+                if target not in self.connections:
+                    continue
+                next_state = target, self.entry(target, location)
+                next_cost = hops + 1, walking + self.walk(location, entry, i)
+                if next_state in found and found[next_state][0] <= next_cost:
+                    continue
+                found[next_state] = next_cost, state
+                heapq.heappush(heap, (next_cost, next(counter), next_state))
+        return found
+
+    def entry(self, location, came_from):
+        # the connection back is the nearest there is to where the player comes in
+        for i, cn in enumerate(self.connections.get(location, ())):
+            if cn['TargetName'] == came_from:
+                return i
+        return None
+
+    def walk(self, location, entry, exit):
+        distances = self.distances.get(location)
+        if entry is None or distances is None:
+            return 0
+        distance = distances[entry][exit]
+        return NO_PATH_DISTANCE if distance is None else distance
+
+    def leg(self, location, next_location, came_from=None):
+        '''
+        Connections from location to next_location, nearest first to where the player came in from
+        came_from. Without came_from they're in the order the mod has them.
+        '''
+        entry = self.entry(location, came_from)
+        leg = [(i, cn) for i, cn in enumerate(self.connections.get(location, ())) if cn['TargetName'] == next_location]
+        leg.sort(key=lambda x: self.walk(location, entry, x[0]))
+        return [cn for _, cn in leg]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        value = {'saveId': self.save_id, 'gameVersion': self.game_version, 'connections': self.connections, 'distances': self.distances}
+        # written aside first so a client closed halfway doesn't leave half a table
+        with open(path + '.tmp', 'w') as f:
+            json.dump(value, f)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(value['saveId'], value['gameVersion'], value['connections'], value['distances'])
+
+def table_path(save_id, game_version):
+    return os.path.join(table_dir, f'{save_id}-{game_version}.json')
+
+async def get_table():
+    '''
+    The route table for the loaded save, loading it the first time. None if the mod can't send one.
+    '''
+    global loading
+    if server.ROUTE_TABLE_CAPABILITY not in server.mod_capabilities:
+        return None
+    if loading is None:
+        reload()
+    try:
+        return await asyncio.shield(loading)
+    except Exception as e:
+        # ROUTE still works, the next move tries again
+        server.log(f'Unable to load route table: {e}', level=2)
+        loading = None
+        return None
+
+def reload():
+    # on a save loading and whenever the mod says connections changed
+    global loading
+    if server.ROUTE_TABLE_CAPABILITY in server.mod_capabilities:
+        loading = server.loop.create_task(load())
+
+async def load():
+    global table
+    key, connections = await asyncio.gather(server.request('GET_SAVE_KEY'), server.request('GET_ALL_LOCATION_CONNECTIONS'))
+    path = table_path(key['saveId'], key['gameVersion'])
+    current = table
+    if current is None or (current.save_id, current.game_version) != (key['saveId'], key['gameVersion']):
+        current = RouteTable.load(path) or RouteTable(key['saveId'], key['gameVersion'])
+    missing = current.update(connections)
+    table = current
+    if missing:
+        # routes go by the fewest locations until the distances are in
+        server.loop.create_task(fetch_distances(current, missing, path))
+    return current
+
+async def fetch_distances(route_table, locations, path):
+    asked = {loc: route_table.connections[loc] for loc in locations}
+    requests = [server.request('GET_CONNECTION_DISTANCES', {'location': loc}) for loc in locations]
+    results = await asyncio.gather(*requests, return_exceptions=True)
+    for location, distances in zip(locations, results):
+        if isinstance(distances, Exception):
+            server.log(f'No connection distances for {location}: {distances}', level=2)
+        # the connections could have changed again while these were on their way
+        elif distances is not None and route_table.connections.get(location) == asked[location]:
+            route_table.set_distances(location, distances)
+    try:
+        route_table.save(path)
+    except OSError as e:
+        server.log(f'Unable to save route table to {path}: {e}', level=2)
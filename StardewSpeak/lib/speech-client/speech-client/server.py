@@ -9,14 +9,67 @@ import asyncio
 import threading
 import uuid
 import json
+import os
+import collections
+import contextlib
 from dragonfly import *
 from srabuilder import rules
 
-import constants
+import constants, framing, metrics, predicates, records, traffic
 
 loop = None
-streams = {}
-mod_requests = {}
+streams = {} # mod stream id -> ModStream
+shared_streams = {} # (name, data) -> ModStream
+mod_requests = {} # request id -> PendingRequest
+mod_capabilities = frozenset()
+encoder = framing.Encoder()
+output = sys.stdout.buffer
+writer = None
+pipe_reader = None # the StreamReader over stdin, see read_messages_from_pipe
+recorder = None # traffic.Recorder while a session is being recorded
+# identical read-only requests share a single round trip while one is outstanding, until a mutating
+# message is sent. A read made after that has to see what it changed, see send_message
+inflight_requests = {}
+deduplicated_requests = collections.Counter()
+# requests that stopped waiting for the mod, by request type
+cancelled_requests = collections.Counter()
+timed_out_requests = collections.Counter()
+swept_requests = collections.Counter()
+# opt-in, read-only requests made together go to the mod as a single REQUEST_BATCH
+BATCH_ITEM_RESULTS_CAPABILITY = "batch_item_results"
+auto_batch = False
+# how long to keep collecting after the first queued request, 0 sends at the end of the loop iteration
+AUTO_BATCH_WINDOW = 0
+batch_queue = {} # PendingRequest -> data, waiting for the next flush_batch
+batch_flush_handle = None
+batched_requests = collections.Counter()
+# the mod can hold back UPDATE_TICKED frames that don't match a predicates.Predicate
+STREAM_FILTER_CAPABILITY = "stream_filters"
+PASSABILITY_GRID_CAPABILITY = "passability_grid"
+PATHS_TO_TILES_CAPABILITY = "paths_to_tiles"
+ROUTE_TABLE_CAPABILITY = "route_table"
+# GET_HELD_BUTTONS, see game.HeldButtons
+HELD_BUTTONS_CAPABILITY = "held_buttons"
+# the mod steers the player along a path itself and streams progress back, see game.Path.follow
+FOLLOW_PATH_CAPABILITY = "follow_path"
+# pending requests older than this are assumed lost and failed by the sweeper
+MAX_REQUEST_AGE = 600
+SWEEP_INTERVAL = 30
+# requests with side effects in the game are never deduplicated
+MUTATING_REQUESTS = frozenset((
+    "HEARTBEAT", "NEW_STREAM", "STOP_STREAM", "SET_MOUSE_POSITION", "SET_MOUSE_POSITION_ON_TILE",
+    "SET_MOUSE_POSITION_RELATIVE", "MOUSE_CLICK", "UPDATE_HELD_BUTTONS", "RELEASE_ALL_KEYS", "PRESS_KEY",
+    "SHOW_HUD_MESSAGE", "PET_ANIMAL_BY_NAME", "USE_TOOL_ON_ANIMAL_BY_NAME", "CATCH_FISH", "UPDATE_PATH",
+))
+
+# Input is written ahead of queries waiting in the same flush and marked with this lane so the mod
+# handles it before queued queries too. A slow query can otherwise hold up a turn and the player overshoots.
+INPUT_LANE = "input"
+INPUT_MESSAGES = frozenset((
+    "UPDATE_HELD_BUTTONS", "SET_MOUSE_POSITION", "SET_MOUSE_POSITION_ON_TILE", "SET_MOUSE_POSITION_RELATIVE",
+    "MOUSE_CLICK", "PRESS_KEY", "RELEASE_ALL_KEYS",
+))
+priority_lanes = True
 
 ongoing_tasks = {} # not connected to an objective, slide mouse, swing sword etc
 
@@ -50,45 +103,214 @@ async def stop_everything():
     await asyncio.gather(stop_all_ongoing_tasks(), objective.cancel_active_objective())
     await game.release_all_keys()
 
+class ModStream:
+    '''
+    A single stream on the mod side, shared by every local Stream opened with the same name and
+    data. Each frame is fanned out to all of them and the mod stream is stopped once the last one closes.
+    '''
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+        self.key = stream_key(name, data)
+        self.label = stream_label(name, data)
+        self.id = f"{name}_{str(uuid.uuid4())}"
+        self.cursors = []
+        self.delta = isinstance(data, dict) and data.get("delta", False)
+        # UPDATE_TICKED values become records when a cursor reads them, see decode
+        self.decode_type = data.get("type") if name == "UPDATE_TICKED" else None
+        self.last_value = None
+        self.last_decoded = None
+        self.delta_seq = None
+        self.delta_value = None
+        self.resync_requested = False
+        self.where = None # predicate wire form while the mod is filtering frames
+        streams[self.id] = self
+        shared_streams[self.key] = self
+        send_message(
+            "NEW_STREAM",
+            {
+                "name": self.name,
+                "stream_id": self.id,
+                "data": data,
+            },
+        )
+
+    def add_cursor(self, cursor):
+        self.cursors.append(cursor)
+
+    def remove_cursor(self, cursor):
+        self.cursors.remove(cursor)
+        if not self.cursors:
+            self.stop()
+
+    def stop(self):
+        if streams.pop(self.id, None) is not None:
+            if shared_streams.get(self.key) is self:
+                del shared_streams[self.key]
+            send_message("STOP_STREAM", self.id)
+
+    def can_filter(self):
+        return (STREAM_FILTER_CAPABILITY in mod_capabilities and self.name == "UPDATE_TICKED"
+            and len(self.cursors) == 1 and self.where is None)
+
+    def set_filter(self, where):
+        self.where = where
+        if where is not None and shared_streams.get(self.key) is self:
+            # cursors opened from now on shouldn't miss the frames that don't match
+            del shared_streams[self.key]
+        elif where is None and self.id in streams:
+            shared_streams.setdefault(self.key, self)
+        if self.id in streams:
+            send_message("SET_STREAM_FILTER", {"stream_id": self.id, "where": where})
+
+    def receive(self, value):
+        if self.delta:
+            value = self.apply_delta(value)
+            if value is DELTA_GAP:
+                return
+        self.publish(value)
+
+    def decode(self, value):
+        # most 1-tick frames are overwritten before anything reads them, so they're only decoded
+        # here, once for however many cursors read the same one
+        if self.decode_type is None or value is None:
+            return value
+        if value is not self.last_value:
+            self.last_value = value
+            self.last_decoded = records.decode(self.decode_type, value)
+        return self.last_decoded
+
+    def apply_delta(self, frame):
+        seq = frame["seq"]
+        if frame["full"]:
+            value = frame["value"]
+            self.resync_requested = False
+        elif self.delta_seq is None or seq != self.delta_seq + 1:
+            # nothing to apply this to until the mod sends a full snapshot again
+            self.delta_seq = None
+            if not self.resync_requested:
+                self.resync_requested = True
+                send_message("STREAM_RESYNC", self.id)
+            return DELTA_GAP
+        else:
+            # copy rather than update in place, cursors may still hold the previous value
+            value = {**self.delta_value, **frame["changed"]}
+            for key, slots in frame["slots"].items():
+                items = list(value[key])
+                for i, item in slots.items():
+                    items[int(i)] = item
+                value[key] = items
+            for key in frame["removed"]:
+                value.pop(key, None)
+        self.delta_seq = seq
+        self.delta_value = value
+        return value
+
+    def publish(self, value):
+        for cursor in self.cursors:
+            cursor.set_value(value)
+
+    def close_cursors(self):
+        for cursor in list(self.cursors):
+            cursor.close()
+
+DELTA_GAP = object()
+
+def stream_key(name, data):
+    return name, json.dumps(data, sort_keys=True, default=records.to_plain)
+
+def subscribe(name, data):
+    mod_stream = shared_streams.get(stream_key(name, data))
+    if mod_stream is None or mod_stream.where is not None:
+        mod_stream = ModStream(name, data)
+    return mod_stream
+
+# Stream buffering policies
+LATEST = 'latest' # keep only the newest frame, frames that arrive before the last one was read are coalesced
+BUFFER = 'buffer' # keep up to maxlen unread frames in order
+# what a full BUFFER stream does with a new frame
+DROP_OLDEST = 'drop_oldest'
+RAISE = 'raise'
+
+# frame counters of closed streams, keyed by (objective, stream)
+stream_stats = collections.defaultdict(collections.Counter)
+
 class Stream:
-    def __init__(self, name, data=None):
+    '''
+    Local cursor over a shared mod stream with its own next()/wait() position, so tasks can
+    each have one without stealing values from each other.
+    '''
+
+    def __init__(self, name, data=None, policy=LATEST, maxlen=60, overflow=DROP_OLDEST):
+        assert policy in (LATEST, BUFFER)
+        assert overflow in (DROP_OLDEST, RAISE)
         self.has_value = False
         self.latest_value = None
+        # latest_value hasn't been read with next() or current() yet and is still as the mod sent
+        # it, only for LATEST
+        self.unread = False
         self.future = loop.create_future()
         self.name = name
-        self.id = f"{name}_{str(uuid.uuid4())}"
         self.closed = False
+        self.policy = policy
+        self.overflow = overflow
+        self.buffer = collections.deque(maxlen=maxlen if overflow == DROP_OLDEST else None)
+        self.maxlen = maxlen
+        self.overflowed = False
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.owner = active_objective_name()
+        self.label = stream_label(name, data)
         self.open(data)
 
     def set_value(self, value):
+        if self.policy == BUFFER:
+            # latest_value is only updated once a buffered frame is read
+            if len(self.buffer) == self.maxlen:
+                self.dropped += 1
+                if self.overflow == RAISE:
+                    self.overflowed = True
+                    self._wake()
+                    return
+            self.buffer.append(value)
+            self._wake()
+            return
+        if self.unread and not self.closed:
+            # previous frame was never read
+            self.coalesced += 1
         self.latest_value = value
         self.has_value = True
+        self.unread = True
+        self._wake()
+
+    def _wake(self):
         try:
             self.future.set_result(None)
         except asyncio.InvalidStateError:
             pass
 
     def open(self, data):
-        streams[self.id] = self
-        send_message(
-            "NEW_STREAM",
-            {
-                "name": self.name,
-                "stream_id": self.id,
-                "data": data,
-            },
-        )
+        self.source = subscribe(self.name, data)
+        self.id = self.source.id
+        self.source.add_cursor(self)
 
     def close(self):
         if not self.closed:
             self.closed = True
-            send_message("STOP_STREAM", self.id)
-            del streams[self.id]
-            self.set_value(None)
+            self.source.remove_cursor(self)
+            self.latest_value = None
+            self.has_value = True
+            self._wake()
+            stream_stats[(self.owner, self.label)].update(self.stats())
+
+    def stats(self):
+        return {'delivered': self.delivered, 'dropped': self.dropped, 'coalesced': self.coalesced}
 
     async def current(self):
         if self.has_value:
-            return self.latest_value
+            return self.read_latest()
         return await self.next()
 
     async def __aenter__(self):
@@ -103,29 +325,93 @@ class Stream:
     def __exit__(self, exc_type, exc, tb):
         self.close()
 
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.next()
+        except StreamClosedError:
+            raise StopAsyncIteration
+
     async def next(self):
         if self.closed:
             raise StreamClosedError("Stream is already closed")
+        if self.policy == BUFFER:
+            return await self._next_buffered()
         if not self.future.done():
             await self.future
         if self.closed:
             raise StreamClosedError(f"Stream {self.name} closed while waiting for next value")
         self.future = loop.create_future()
+        self.delivered += 1
+        return self.read_latest()
+
+    def read_latest(self):
+        if self.unread:
+            self.unread = False
+            self.latest_value = self.source.decode(self.latest_value)
         return self.latest_value
 
+    async def _next_buffered(self):
+        while not self.buffer:
+            if self.overflowed:
+                break
+            await self.future
+            if self.closed:
+                raise StreamClosedError(f"Stream {self.name} closed while waiting for next value")
+            self.future = loop.create_future()
+        if self.overflowed:
+            self.overflowed = False
+            raise StreamOverflowError(f"Stream {self.label} buffered more than {self.maxlen} unread frames")
+        self.delivered += 1
+        value = self.source.decode(self.buffer.popleft())
+        self.latest_value = value
+        self.has_value = True
+        return value
 
     async def wait(self, condition, timeout=None):
         async with async_timeout.timeout(timeout):
             item = await self.current()
-            while not condition(item):
+            if condition(item):
+                return item
+            with self.filtered(condition):
+                # still checked here, frames sent before the mod got the filter aren't filtered
                 item = await self.next()
+                while not condition(item):
+                    item = await self.next()
             return item
 
+    @contextlib.contextmanager
+    def filtered(self, condition):
+        # only the mod side filters, and only when no other cursor needs the frames
+        push_down = isinstance(condition, predicates.Predicate) and self.source.can_filter()
+        if push_down:
+            self.source.set_filter(condition.wire)
+        try:
+            yield
+        finally:
+            if push_down:
+                self.source.set_filter(None)
+
 class StreamClosedError(Exception):
     pass
 
-def player_status_stream(ticks=1):
-    return Stream("UPDATE_TICKED", data={"type": "PLAYER_STATUS", "ticks": ticks})
+class StreamOverflowError(Exception):
+    pass
+
+def stream_label(name, data):
+    if isinstance(data, dict) and 'type' in data:
+        return f"{name}:{data['type']}/{data.get('ticks', 1)}"
+    return name
+
+def active_objective_name():
+    import objective
+    active = objective.get_active_objective()
+    return None if active is None else active.__class__.__name__
+
+def player_status_stream(ticks=1, delta=False):
+    return Stream("UPDATE_TICKED", data={"type": "PLAYER_STATUS", "ticks": ticks, "delta": delta})
 
 def tool_status_stream(ticks=1):
     return Stream("UPDATE_TICKED", data={"type": "TOOL_STATUS", "ticks": ticks})
@@ -136,8 +422,8 @@ def characters_at_location_stream(ticks=1):
 def animals_at_location_stream(ticks=1):
     return Stream("UPDATE_TICKED", data={"type": "ANIMALS_AT_LOCATION", "ticks": ticks})
 
-def player_items_stream(ticks=1):
-    return Stream("UPDATE_TICKED", data={"type": "PLAYER_ITEMS", "ticks": ticks})
+def player_items_stream(ticks=1, delta=False):
+    return Stream("UPDATE_TICKED", data={"type": "PLAYER_ITEMS", "ticks": ticks, "delta": delta})
 
 def on_warped_stream(ticks=1):
     return Stream("ON_WARPED", data={"type": "PLAYER_STATUS", "ticks": ticks})
@@ -145,6 +431,9 @@ def on_warped_stream(ticks=1):
 def on_terrain_feature_list_changed_stream():
     return Stream("ON_TERRAIN_FEATURE_LIST_CHANGED", data={})
 
+def on_object_list_changed_stream():
+    return Stream("ON_OBJECT_LIST_CHANGED", data={}, policy=BUFFER)
+
 def on_menu_changed_stream():
     return Stream("ON_MENU_CHANGED", data={})
 
@@ -201,14 +490,24 @@ def _do_create_task(awaitable, *args, **kw):
     loop.create_task(awaitable(*args, **kw))
 
 
-def setup_async_loop():
+def setup_async_loop(capabilities=(), record_path=None, batch_requests=False):
     global loop
+    global mod_capabilities
+    global writer
+    global auto_batch
     loop = asyncio.new_event_loop()
+    if record_path is not None:
+        start_recording(record_path)
+    mod_capabilities = frozenset(capabilities)
+    auto_batch = batch_requests and BATCH_ITEM_RESULTS_CAPABILITY in mod_capabilities
+    setup_framing(framing.negotiate(mod_capabilities))
+    writer = MessageWriter(output)
     def async_setup(l):
         l.set_exception_handler(exception_handler)
         l.create_task(menu_changed())
-        l.create_task(async_readline())
+        l.create_task(read_messages())
         l.create_task(heartbeat(300))
+        l.create_task(sweep_requests(SWEEP_INTERVAL))
         l.create_task(populate_initial_game_event())
         l.run_forever()
 
@@ -221,6 +520,23 @@ def setup_async_loop():
     async_thread = threading.Thread(target=async_setup, daemon=True, args=(loop,))
     async_thread.start()
 
+def start_recording(path):
+    global recorder
+    recorder = traffic.Recorder(path, clock=loop.time)
+    log(f"Recording mod traffic to {path}", level=1)
+
+def setup_framing(new_framing):
+    global output
+    if new_framing == framing.LINES:
+        return
+    # Anything else that writes to stdout would corrupt binary frames, so keep the real pipe to ourselves
+    # and point file descriptor 1 at stderr.
+    sys.stdout.flush()
+    output = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    send_message(framing.SET_FRAMING, new_framing)
+    encoder.framing = new_framing
+
 async def request_active_menu_with_delay():
     import menu_utils
     await asyncio.sleep(1)
@@ -266,30 +582,96 @@ async def populate_initial_game_event():
 
 async def heartbeat(timeout):
     while True:
-        fut = request("HEARTBEAT")
-        try:
-            resp = await asyncio.wait_for(fut, timeout=timeout)
-        except asyncio.TimeoutError as e:
-            raise e
+        await request("HEARTBEAT", timeout=timeout)
         await asyncio.sleep(timeout)
 
+async def sweep_requests(interval):
+    while True:
+        await asyncio.sleep(interval)
+        now = loop.time()
+        for pending in list(mod_requests.values()):
+            if pending.waiters == 0 or pending.future.done():
+                # nobody is left to read the response
+                swept_requests[pending.request_type] += 1
+                pending.cancel()
+            elif now - pending.sent_at > MAX_REQUEST_AGE:
+                swept_requests[pending.request_type] += 1
+                pending.fail(asyncio.TimeoutError(f"No response to {pending.request_type} after {MAX_REQUEST_AGE} seconds"))
+
+def stats():
+    return {
+        **metrics.snapshot(),
+        "outstanding_requests": outstanding_requests(),
+        "writer": writer.stats() if writer is not None else None,
+        "stream_cursors": {f"{owner}: {label}": dict(counts) for (owner, label), counts in stream_stats.items()},
+    }
+
+def outstanding_requests():
+    now = loop.time()
+    by_type = collections.Counter(p.request_type for p in mod_requests.values())
+    oldest = max((now - p.sent_at for p in mod_requests.values()), default=0)
+    return {
+        "outstanding": len(mod_requests),
+        "outstanding_by_type": dict(by_type),
+        "oldest_age": oldest,
+        "cancelled": dict(cancelled_requests),
+        "timed_out": dict(timed_out_requests),
+        "swept": dict(swept_requests),
+        "deduplicated": dict(deduplicated_requests),
+        "batched": dict(batched_requests),
+    }
+
+
+async def read_messages():
+    if sys.platform == 'win32':
+        await read_messages_threaded(sys.stdin.buffer, handle_messages)
+    else:
+        await read_messages_from_pipe(sys.stdin.buffer, handle_messages)
+
+async def read_messages_from_pipe(f, on_messages):
+    global pipe_reader
+    decoder = framing.Decoder()
+    reader = asyncio.StreamReader()
+    # the protocol only keeps a weak reference to the reader, so without this one the reader and this
+    # task waiting on it are garbage collected together and the pipe is closed in the middle of a session
+    pipe_reader = reader
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), f)
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            return
+        messages = decoder.feed(data)
+        on_messages(messages, decoder.sizes)
 
-async def async_readline():
-    # Is there a better way to read async stdin on Windows?
-    q = queue.Queue()
+async def read_messages_threaded(f, on_messages):
+    # The proactor loop can't do async reads on an inherited stdin pipe, so block in a thread instead
+    # and hand back everything a read completes in a single callback.
+    decoder = framing.Decoder()
+    closed = loop.create_future()
 
-    def _run(future_queue):
+    def _run():
         while True:
-            fut = future_queue.get()
-            line = sys.stdin.readline()
-            loop.call_soon_threadsafe(fut.set_result, line)
-
-    threading.Thread(target=_run, daemon=True, args=(q,)).start()
-    while True:
-        fut = loop.create_future()
-        q.put(fut)
-        line = await fut
-        on_message(line)
+            data = f.read1(65536)
+            if not data:
+                break
+            messages = decoder.feed(data)
+            loop.call_soon_threadsafe(on_messages, messages, decoder.sizes)
+        loop.call_soon_threadsafe(closed.set_result, None)
+
+    threading.Thread(target=_run, daemon=True).start()
+    await closed
+
+def handle_messages(messages, sizes=None):
+    for i, msg in enumerate(messages):
+        if isinstance(msg, framing.DecodeError):
+            log(f"Got invalid message from mod {msg.raw}", level=1)
+            continue
+        if recorder is not None:
+            recorder.inbound(msg)
+        try:
+            handle_message(msg, sizes[i] if sizes else 0)
+        except Exception:
+            log(traceback.format_exc(), level=1)
 
 class RequestBuilder:
 
@@ -297,11 +679,25 @@ class RequestBuilder:
         self.request_type = request_type
         self.data = {} if data is None else data
 
-    def request(self, data=None):
+    def request(self, data=None, dedupe=True, timeout=None, batch=None):
         data = self.data if data is None else data
-        self._fut = loop.create_future()
-        sent_msg = send_message(self.request_type, data)
-        mod_requests[sent_msg["id"]] = self._fut
+        key = None
+        read_only = is_read_only(self.request_type, data)
+        batch = auto_batch if batch is None else batch
+        if not read_only and batch_queue:
+            # anything queued was requested first, don't let this overtake it
+            flush_batch()
+        if dedupe and read_only:
+            key = self.request_type, json.dumps(data, sort_keys=True, default=records.to_plain)
+            pending = inflight_requests.get(key)
+            if pending is not None and not pending.future.done():
+                deduplicated_requests[self.request_type] += 1
+                self._fut = pending.follow(timeout)
+                return self._fut
+        batched = batch and read_only and self.request_type != "REQUEST_BATCH"
+        pending = PendingRequest(self.request_type, data, key, batched)
+        # every caller awaits its own future so cancelling one doesn't cancel the others
+        self._fut = pending.follow(timeout)
         return self._fut
 
     def stream(self, ticks=1):
@@ -323,59 +719,304 @@ def request_batch(messages):
     msg_type = 'REQUEST_BATCH'
     return request(msg_type, messages)
 
-def request(msg_type, msg=None):
-    return RequestBuilder(msg_type, msg).request()
+def request(msg_type, msg=None, dedupe=True, timeout=None, batch=None):
+    return RequestBuilder(msg_type, msg).request(dedupe=dedupe, timeout=timeout, batch=batch)
+
+class PendingRequest:
+    '''
+    A request the mod hasn't answered yet. Callers each get their own future from follow. Once
+    all of them are cancelled or time out the mod is sent CANCEL_REQUEST so it can skip the work.
+    '''
+
+    def __init__(self, request_type, data, key=None, batched=False):
+        self.request_type = request_type
+        self.key = key
+        self.future = loop.create_future()
+        self.waiters = 0
+        self.sent_at = loop.time()
+        self.outstanding = True
+        self.id = None
+        self.batch = None # the RequestBatch it went out in, if any
+        if key is not None:
+            inflight_requests[key] = self
+        if batched:
+            queue_batched(self, data)
+        else:
+            self.send(data)
+
+    def send(self, data):
+        self.id = send_message(self.request_type, data)["id"]
+        mod_requests[self.id] = self
+
+    def follow(self, timeout=None):
+        fut = follow_future(self.future)
+        self.waiters += 1
+        fut.add_done_callback(self._waiter_done)
+        if timeout is not None:
+            handle = loop.call_later(timeout, expire_future, fut, self.request_type, timeout)
+            fut.add_done_callback(lambda f: handle.cancel())
+        return fut
+
+    def _waiter_done(self, fut):
+        self.waiters -= 1
+        if self.waiters == 0 and not self.future.done():
+            self.cancel()
+
+    def forget(self):
+        if self.key is not None and inflight_requests.get(self.key) is self:
+            del inflight_requests[self.key]
+        if self.id is not None:
+            mod_requests.pop(self.id, None)
+        outstanding, self.outstanding = self.outstanding, False
+        return outstanding
+
+    def resolve(self, value, error=None, size=0):
+        if self.forget():
+            metrics.response_received(self.request_type, size, loop.time() - self.sent_at, error)
+        if self.future.done():
+            return
+        if error is None:
+            self.future.set_result(records.decode(self.request_type, value))
+        else:
+            self.future.set_exception(Exception(value))
+
+    def cancel(self):
+        if self.forget():
+            cancelled_requests[self.request_type] += 1
+            if self.id is not None:
+                send_message("CANCEL_REQUEST", self.id)
+            elif self.batch is not None:
+                self.batch.item_cancelled()
+            else:
+                batch_queue.pop(self, None)
+        self.future.cancel()
+
+    def fail(self, exception):
+        if self.forget() and self.id is not None:
+            send_message("CANCEL_REQUEST", self.id)
+        if not self.future.done():
+            self.future.set_exception(exception)
+
+class RequestBatch(PendingRequest):
+    '''
+    Requests queued by auto batching, sent as one REQUEST_BATCH. The mod answers each of them
+    separately and the results are split back to their own PendingRequest. The batch is only
+    cancelled once every request in it is.
+    '''
+
+    def __init__(self, items):
+        self.items = items
+        requests = [{"type": p.request_type, "data": data} for p, data in items.items()]
+        super().__init__("REQUEST_BATCH", {"requests": requests, "itemResults": True})
+        for p in items:
+            p.batch = self
+        self.waiters = len(items)
+        self.future.add_done_callback(self._split)
+
+    def item_cancelled(self):
+        self.waiters -= 1
+        if self.waiters == 0 and not self.future.done():
+            self.cancel()
+
+    def _split(self, fut):
+        if fut.cancelled():
+            for p in self.items:
+                p.cancel()
+        elif fut.exception() is not None:
+            for p in self.items:
+                p.fail(fut.exception())
+        else:
+            for p, result in zip(self.items, fut.result()):
+                p.resolve(result["value"], result["error"])
+
+def queue_batched(pending, data):
+    global batch_flush_handle
+    batch_queue[pending] = data
+    if batch_flush_handle is None:
+        if AUTO_BATCH_WINDOW:
+            batch_flush_handle = loop.call_later(AUTO_BATCH_WINDOW, flush_batch)
+        else:
+            # requests made by other tasks in this iteration, like those in a gather, run first
+            batch_flush_handle = loop.call_soon(flush_batch)
+
+def flush_batch():
+    global batch_queue
+    global batch_flush_handle
+    if batch_flush_handle is not None:
+        batch_flush_handle.cancel()
+        batch_flush_handle = None
+    items, batch_queue = batch_queue, {}
+    if len(items) == 1:
+        for pending, data in items.items():
+            pending.send(data)
+    elif items:
+        batched_requests.update(p.request_type for p in items)
+        RequestBatch(items)
+
+def expire_future(fut, request_type, timeout):
+    if not fut.done():
+        timed_out_requests[request_type] += 1
+        fut.set_exception(asyncio.TimeoutError(f"No response to {request_type} after {timeout} seconds"))
+
+def is_read_only(msg_type, data):
+    if msg_type == "REQUEST_BATCH":
+        requests = data["requests"] if isinstance(data, dict) else data
+        return all(is_read_only(r["type"], r["data"]) for r in requests)
+    return msg_type not in MUTATING_REQUESTS
+
+def follow_future(source):
+    # Responses are shared between deduplicated callers, so treat them as read-only
+    fut = loop.create_future()
+
+    def _copy_result(src):
+        if fut.done():
+            return
+        if src.cancelled():
+            fut.cancel()
+        elif src.exception() is not None:
+            fut.set_exception(src.exception())
+        else:
+            fut.set_result(src.result())
+
+    source.add_done_callback(_copy_result)
+    return fut
 
 def send_message(msg_type, msg=None):
     msg_id = str(uuid.uuid4())
     full_msg = {"type": msg_type, "id": msg_id, "data": msg}
-    print(json.dumps(full_msg), flush=True)
+    if msg_type in MUTATING_REQUESTS or (msg_type == "REQUEST_BATCH" and not is_read_only(msg_type, msg)):
+        inflight_requests.clear()
+    is_input = priority_lanes and msg_type in INPUT_MESSAGES
+    if is_input:
+        full_msg["lane"] = INPUT_LANE
+    data = encoder.encode(full_msg)
+    metrics.message_sent(msg_type, len(data))
+    if recorder is not None:
+        recorder.outbound(full_msg)
+    if writer is None:
+        output.write(data)
+        output.flush()
+    else:
+        writer.write(data, is_input)
     return full_msg
 
+class MessageWriter:
+    '''
+    Collects messages sent during one loop iteration and hands them to a background thread as a
+    single write, so bursts like start_moving or repeated clicks cost one syscall and a slow pipe
+    never blocks the loop. Input goes in its own write that jumps ahead of any queries still queued.
+    '''
+
+    def __init__(self, f):
+        self.f = f
+        self.pending = []
+        self.pending_input = []
+        self.flush_scheduled = False
+        self.lock = threading.Lock()
+        # (lane, flush number, data), input sorts first
+        self.write_queue = queue.PriorityQueue()
+        self.messages = 0
+        self.input_messages = 0
+        self.flushes = 0
+        self.bytes_written = 0
+        self.max_bytes_per_flush = 0
+        self.max_queue_depth = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def write(self, data, is_input=False):
+        with self.lock:
+            (self.pending_input if is_input else self.pending).append(data)
+            schedule_flush = not self.flush_scheduled
+            self.flush_scheduled = True
+        if schedule_flush:
+            try:
+                in_loop = asyncio.get_running_loop() is loop
+            except RuntimeError:
+                in_loop = False
+            # call_soon runs after everything already queued for this iteration
+            if in_loop:
+                loop.call_soon(self.flush)
+            else:
+                loop.call_soon_threadsafe(self.flush)
+
+    def flush(self):
+        with self.lock:
+            chunks, self.pending = self.pending, []
+            input_chunks, self.pending_input = self.pending_input, []
+            self.flush_scheduled = False
+        if not chunks and not input_chunks:
+            return
+        self.flushes += 1
+        self.messages += len(chunks) + len(input_chunks)
+        self.input_messages += len(input_chunks)
+        flushed_bytes = 0
+        for lane, lane_chunks in enumerate((input_chunks, chunks)):
+            if lane_chunks:
+                data = b''.join(lane_chunks)
+                flushed_bytes += len(data)
+                self.write_queue.put((lane, self.flushes, data))
+        self.bytes_written += flushed_bytes
+        self.max_bytes_per_flush = max(self.max_bytes_per_flush, flushed_bytes)
+        self.max_queue_depth = max(self.max_queue_depth, self.write_queue.qsize())
+
+    def _run(self):
+        while True:
+            _, _, data = self.write_queue.get()
+            try:
+                self.f.write(data)
+                self.f.flush()
+            except (BrokenPipeError, OSError, ValueError):
+                return
+
+    def stats(self):
+        return {
+            'messages': self.messages,
+            'input_messages': self.input_messages,
+            'flushes': self.flushes,
+            'bytes': self.bytes_written,
+            'messages_per_flush': self.messages / self.flushes if self.flushes else 0,
+            'bytes_per_flush': self.bytes_written / self.flushes if self.flushes else 0,
+            'max_bytes_per_flush': self.max_bytes_per_flush,
+            'queue_depth': self.write_queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+        }
+
 
 def on_message(msg_str):
-    import events
     try:
         msg = json.loads(msg_str)
     except json.JSONDecodeError:
         log(f"Got invalid message from mod {msg_str}", level=1)
         return
+    handle_message(msg)
+
+def handle_message(msg, size=0):
+    import events
     msg_type = msg["type"]
     msg_data = msg["data"]
     if msg_type == "RESPONSE":
-        fut = mod_requests.pop(msg_data["id"], None)
-        if fut:
-            resp_value = msg_data["value"]
-            resp_error = msg_data["error"]
-            try:
-                if resp_error is None:
-                    fut.set_result(resp_value)
-                else:
-                    exception = Exception(resp_value)
-                    fut.set_exception(exception)
-            except asyncio.InvalidStateError:
-                pass
+        pending = mod_requests.get(msg_data["id"])
+        if pending:
+            pending.resolve(msg_data["value"], msg_data["error"], size)
     elif msg_type == "STREAM_MESSAGE":
         stream_id = msg_data["stream_id"]
 
-        stream = streams.get(stream_id)
-        if stream is None:
+        mod_stream = streams.get(stream_id)
+        if mod_stream is None:
             send_message("STOP_STREAM", stream_id)
             return
+        metrics.stream_frame(mod_stream.label, size, loop.time())
         stream_value = msg_data["value"]
         stream_error = msg_data.get("error")
         if stream_error is not None:
             log(f"Stream {stream_id} error: {stream_value}")
-            stream.close()
+            mod_stream.close_cursors()
             return
-        stream.set_value(stream_value)
-        stream.latest_value = stream_value
-        try:
-            stream.future.set_result(None)
-        except asyncio.InvalidStateError:
-            pass
+        mod_stream.receive(stream_value)
     elif msg_type == "EVENT":
         events.handle_event(msg_data)
+    elif msg_type == framing.FRAMING_CHANGED:
+        log(f"Mod switched to {msg_data} framing", level=1)
     else:
         raise RuntimeError(f"Unhandled message type from mod: {msg_type}")
 
@@ -395,7 +1036,7 @@ async def mouse_click(btn='left', count=1):
             await asyncio.sleep(0.1)
 
 def log(*a, sep=' ', level=1):
-    to_send = [x if isinstance(x, str) else json.dumps(x) for x in a]
+    to_send = [x if isinstance(x, str) else json.dumps(x, default=records.to_plain) for x in a]
     return send_message("LOG", {'value': sep.join(to_send), 'level': level})
 
 async def sleep_forever():
@@ -0,0 +1,102 @@
+'''
+Grid of buckets over tile objects so navigate_tiles can take items best first without sorting the
+whole list. Buckets are ordered by a lower bound of the sort key over their rectangle and only
+opened when they could hold the next best item, so on a big farm most items are never scored.
+
+Ordering matches sorted() with the same key, including ties keeping the order items were added in.
+A key needs a bound that is never more than its score for any tile in a rectangle, see
+game.sort_key_bounds.
+'''
+import heapq
+import itertools
+
+BUCKET_SIZE = 8
+
+BUCKET = 0
+ITEM = 1
+
+
+class TileIndex:
+
+    def __init__(self, items=(), bucket_size=BUCKET_SIZE):
+        self.bucket_size = bucket_size
+        # every item ever added in order, None once removed, buckets hold positions in here
+        self.items = []
+        # (bucket x, bucket y) -> [position in self.items]
+        self.buckets = {}
+        self.count = 0
+        self.extend(items)
+
+    def __len__(self):
+        return self.count
+
+    def bucket_key(self, x, y):
+        return x // self.bucket_size, y // self.bucket_size
+
+    def bucket_rect(self, key):
+        # inclusive tile bounds, x0, y0, x1, y1
+        bx, by = key
+        size = self.bucket_size
+        return bx * size, by * size, bx * size + size - 1, by * size + size - 1
+
+    def insert(self, item):
+        self.extend((item,))
+
+    def extend(self, items):
+        # navigate_tiles builds an index from every item it fetches so this is kept tight
+        buckets, size, all_items = self.buckets, self.bucket_size, self.items
+        first = len(all_items)
+        all_items.extend(items)
+        for position in range(first, len(all_items)):
+            item = all_items[position]
+            key = item['tileX'] // size, item['tileY'] // size
+            try:
+                buckets[key].append(position)
+            except KeyError:
+                buckets[key] = [position]
+        self.count += len(all_items) - first
+
+    def remove(self, item):
+        key = self.bucket_key(item['tileX'], item['tileY'])
+        bucket = self.buckets.get(key, ())
+        for i, position in enumerate(bucket):
+            bucket_item = self.items[position]
+            if bucket_item is item or bucket_item == item:
+                del bucket[i]
+                if not bucket:
+                    del self.buckets[key]
+                self.items[position] = None
+                self.count -= 1
+                return True
+        return False
+
+    def at(self, x, y):
+        bucket = self.buckets.get(self.bucket_key(x, y), ())
+        return [self.items[p] for p in bucket if (self.items[p]['tileX'], self.items[p]['tileY']) == (x, y)]
+
+    def best_first(self, score, bound):
+        '''
+        Yield items lowest score(item) first. bound(rect) must be <= score(item) for every item
+        inside rect.
+        '''
+        heap = [(bound(self.bucket_rect(key)), BUCKET, key) for key in self.buckets]
+        heapq.heapify(heap)
+        items = self.items
+        while heap:
+            value, kind, entry = heapq.heappop(heap)
+            if kind == ITEM:
+                yield items[entry]
+                continue
+            # on a tie the bucket is opened first so its items are ordered against the rest
+            for position in self.buckets.get(entry, ()):
+                heapq.heappush(heap, (score(items[position]), ITEM, position))
+
+    def nearest(self, score, bound, k):
+        return list(itertools.islice(self.best_first(score, bound), k))
+
+def distance_to_rect(tile, rect):
+    x, y = tile
+    x0, y0, x1, y1 = rect
+    dx = x0 - x if x < x0 else (x - x1 if x > x1 else 0)
+    dy = y0 - y if y < y0 else (y - y1 if y > y1 else 0)
+    return dx + dy
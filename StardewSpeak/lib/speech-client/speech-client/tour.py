@@ -0,0 +1,419 @@
+'''
+Visit order for a field of target tiles, like the crops WaterCropsObjective waters. Sorting what is
+left by score_objects_by_distance after every crop walks back and forth across the field, a tour
+planned over all of them doesn't.
+
+Tools and the action button work on the tile under the mouse when it's within a tile of the player,
+diagonals too, so targets are covered by as few tiles to stand on as it takes, each one within reach
+of up to eight targets, and the tour goes through those. It starts nearest neighbour first and
+is improved with 2-opt and Or-opt moves between each tile and its nearest few, on walking distances
+from the passability grid when there is one.
+
+The order is kept while targets are only being removed from it, as they are when the player works
+through it, and new targets are covered and inserted where they cost least before improving it
+again. Targets within reach of the player's tile are taken first since they cost nothing to get to.
+
+An upgraded hoe or watering can charges to work on a line or a rectangle in front of the player.
+plan_swings covers the targets with those areas instead, choosing where to stand, which way to face
+and how far to charge, and tours the tiles to stand on the same way.
+'''
+import collections
+import heapq
+
+import constants
+import pathfinding
+
+# tiles each tile in the tour tries moves with, nearest first
+NEIGHBORS = 8
+# tiles the search for those goes on to, the moves mostly ask for distances between these
+KNOWN_NEIGHBORS = 32
+# lengths of the runs of tiles Or-opt moves elsewhere in the tour
+OR_OPT_SEGMENTS = (1, 2, 3)
+MAX_PASSES = 50
+# distance between tiles with no path between them, so they go to the end of the tour
+UNREACHABLE = 10 ** 6
+# (tiles forward, tiles to each side) a hoe or watering can charged to each power works on, starting
+# at the tile in front of the player like Tool.tilesAffected. The most a tool charges to is its upgradeLevel
+TOOL_AREAS = ((1, 0), (3, 0), (5, 0), (3, 1), (6, 1))
+# what a swing costs in tiles walked, and what each power charged on top of it costs. Charging a
+# level takes about as long as walking three tiles
+SWING_COST = 2
+CHARGE_COST = 3
+FACING_OFFSETS = {
+    constants.NORTH: (0, -1),
+    constants.EAST: (1, 0),
+    constants.SOUTH: (0, 1),
+    constants.WEST: (-1, 0),
+}
+
+Swing = collections.namedtuple('Swing', ('stand', 'facing', 'power', 'tiles'))
+
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+def within_reach(a, b):
+    # what the mouse can be on for a tool or the action button, the player's own tile isn't
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1
+
+def reach_tiles(tile):
+    x, y = tile
+    return [(x + dx, y + dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx or dy]
+
+def cover(grid, targets, stands=()):
+    '''
+    {target: tile to stand on within reach of it} for targets, a tile in stands where one is in reach
+    and otherwise the passable tile in reach of the most targets not covered yet, any tile without a
+    grid. Targets with nothing passable around them are left out.
+    '''
+    covered = {}
+    candidates = {}
+    for target in targets:
+        for tile in reach_tiles(target):
+            if tile in stands:
+                covered[target] = tile
+                break
+        else:
+            for tile in reach_tiles(target):
+                if grid is None or grid.is_passable(*tile):
+                    candidates.setdefault(tile, set()).add(target)
+    # counts only go down as targets are covered, so a popped count that is still right is the best
+    heap = [(-len(t), tile) for tile, t in candidates.items()]
+    heapq.heapify(heap)
+    while heap:
+        count, tile = heapq.heappop(heap)
+        left = candidates[tile] = {t for t in candidates[tile] if t not in covered}
+        if not left:
+            continue
+        if len(left) < -count:
+            heapq.heappush(heap, (-len(left), tile))
+            continue
+        for target in left:
+            covered[target] = tile
+    return covered
+
+def tool_area(stand, facing, power):
+    # tiles a swing from stand facing that way works on
+    length, side = TOOL_AREAS[power]
+    dx, dy = FACING_OFFSETS[facing]
+    x, y = stand
+    return [(x + dx * f - dy * s, y + dy * f + dx * s) for f in range(1, length + 1) for s in range(-side, side + 1)]
+
+def cover_swings(grid, targets, max_power, allowed=None):
+    '''
+    Swings charged up to max_power that between them work on every target, chosen greedily by the
+    targets a swing works on for what it costs. A charged swing is only made where it does more for
+    its cost than swinging at targets one at a time, those are aimed with the mouse like cover does
+    and have no facing. Swings are only from passable tiles when there is a grid, and charged ones
+    only work on tiles in allowed when that's given, so tilling a plot doesn't spill out of it.
+    Targets no swing can work on are left out.
+    '''
+    targets = set(targets)
+    max_power = min(max_power, len(TOOL_AREAS) - 1)
+    keys = set()
+    for tx, ty in targets:
+        for power in range(1, max_power + 1):
+            length, side = TOOL_AREAS[power]
+            for facing, (dx, dy) in FACING_OFFSETS.items():
+                for f in range(1, length + 1):
+                    for s in range(-side, side + 1):
+                        keys.add(((tx - dx * f + dy * s, ty - dy * f - dx * s), facing, power))
+    candidates = {}
+    for key in keys:
+        stand, facing, power = key
+        if grid is not None and not grid.is_passable(*stand):
+            continue
+        area = tool_area(stand, facing, power)
+        if allowed is not None and not allowed.issuperset(area):
+            continue
+        candidates[key] = {t for t in area if t in targets}
+    # like cover, the targets left for a swing only go down so a popped rate that is still right is the best
+    rate = lambda key, left: -len(left) / (SWING_COST + CHARGE_COST * key[2])
+    heap = [(rate(key, t), key) for key, t in candidates.items()]
+    heapq.heapify(heap)
+    covered = set()
+    swings = []
+    while heap:
+        popped, key = heapq.heappop(heap)
+        left = candidates[key] = candidates[key] - covered
+        if -rate(key, left) <= 1 / SWING_COST:
+            continue
+        if rate(key, left) > popped:
+            heapq.heappush(heap, (rate(key, left), key))
+            continue
+        covered |= left
+        swings.append(Swing(*key, sorted(left)))
+    stands = {s.stand for s in swings}
+    for target, stand in cover(grid, sorted(targets - covered), stands).items():
+        swings.append(Swing(stand, None, 0, [target]))
+    return swings
+
+def plan_swings(targets, current_tile, max_power, grid=None, allowed=None):
+    '''
+    Swings to work on targets with, in the order to make them from current_tile. Swings from one tile
+    are made one after the other.
+    '''
+    swings = cover_swings(grid, targets, max_power, allowed)
+    by_stand = {}
+    for swing in swings:
+        by_stand.setdefault(swing.stand, []).append(swing)
+    distances = Distances(grid)
+    stands = [t for t in by_stand if t != current_tile]
+    order = improve(current_tile, nearest_neighbor(current_tile, stands, distances), distances) if stands else []
+    if current_tile in by_stand:
+        order.insert(0, current_tile)
+    # the ones aimed with the mouse first, then charged ones round from north
+    return [swing for stand in order for swing in sorted(by_stand[stand], key=lambda s: (s.facing is not None, s.facing or 0))]
+
+class Distances:
+    '''
+    Walking distances between tiles on the grid, or manhattan distance without a grid. Searching
+    from every tile to every other one takes seconds on a big field, so pairs are searched for
+    when they are first asked for and each tile's nearest few come from one short search.
+    '''
+
+    def __init__(self, grid=None):
+        self.grid = grid
+        # (a, b) -> distance, kept symmetric with the shorter of the two directions
+        self.known = {}
+        # tile -> its nearest tiles when it was first asked for them
+        self.neighbors = {}
+        self.searches = 0
+
+    def __call__(self, a, b):
+        if self.grid is None:
+            return manhattan(a, b)
+        distance = self.known.get((a, b))
+        if distance is None:
+            distance = manhattan(a, b)
+            if distance <= 1:
+                self.known[a, b] = distance
+                return distance
+            self.search(a, [b])
+            distance = self.known[a, b]
+        return distance
+
+    def search(self, source, tiles):
+        # distances from source to each of tiles
+        self.searches += 1
+        if len(tiles) == 1:
+            # A* heads for the one tile instead of searching all around source
+            path = pathfinding.find_path(self.grid, source, tiles[0])
+            found = [None if path is None else len(path) - 1]
+        else:
+            found = pathfinding.distances_to_tiles(self.grid, source, tiles)
+        for tile, distance in zip(tiles, found):
+            self.remember(source, tile, UNREACHABLE if distance is None else distance)
+
+    def remember(self, a, b, distance):
+        distance = min(distance, self.known.get((b, a), distance))
+        self.known[a, b] = self.known[b, a] = distance
+
+    def nearest(self, source, tiles, k, search_count=None):
+        if self.grid is None:
+            return heapq.nsmallest(k, (t for t in tiles if t != source), key=lambda t: (manhattan(source, t), t))
+        if not isinstance(tiles, (set, frozenset)):
+            tiles = set(tiles)
+        self.searches += 1
+        found = pathfinding.nearest_tiles(self.grid, source, tiles, max(k, search_count or 0) + 1)
+        for distance, tile in found:
+            self.remember(source, tile, distance)
+        return [t for _, t in sorted(found) if t != source][:k]
+
+    def neighbor_lists(self, tiles, k):
+        # tiles that were added later aren't in the lists of the ones before them, the moves
+        # from the later ones' own lists cover those pairs
+        tile_set = set(tiles)
+        neighbors = {}
+        for tile in tiles:
+            cached = self.neighbors.get(tile)
+            if cached is None:
+                cached = self.neighbors[tile] = self.nearest(tile, tile_set, k, KNOWN_NEIGHBORS)
+            neighbors[tile] = [t for t in cached if t in tile_set]
+        return neighbors
+
+class TourPlanner:
+
+    def __init__(self, adjacent=True):
+        # whether targets are worked on from a tile within reach of them instead of from their own tile
+        self.adjacent = adjacent
+        # tiles to stand on in the order to visit them
+        self.order = []
+        # target -> tile to stand on for it, only with a grid to know what's passable
+        self.stands = {}
+        self.distances = Distances()
+        self.grid_key = None
+        self.plans = 0
+
+    def order_items(self, items, current_tile, grid=None):
+        '''
+        items in the order to visit them from current_tile. Several items on one tile stay together.
+        '''
+        by_tile = {}
+        for item in items:
+            by_tile.setdefault((item['tileX'], item['tileY']), []).append(item)
+        grid_key = None if grid is None else (grid.location, grid.version)
+        if grid_key != self.grid_key:
+            # passability changed, the distances and the tour planned on them are stale
+            self.grid_key = grid_key
+            self.distances = Distances(grid)
+            self.order = []
+            self.stands = {}
+        if self.adjacent and grid is not None:
+            uncovered = [t for t in by_tile if t not in self.stands]
+            if uncovered:
+                self.stands.update(cover(grid, uncovered, set(self.stands.values())))
+        targets_at = {}
+        for tile in by_tile:
+            targets_at.setdefault(self.standing_tile(tile) or tile, []).append(tile)
+        remaining = [t for t in self.order if t in targets_at]
+        planned = set(remaining)
+        new = [t for t in targets_at if t not in planned]
+        if new:
+            remaining = self.plan(current_tile, remaining, new)
+        self.order = remaining
+        targets = [target for tile in remaining for target in targets_at[tile]]
+        if self.adjacent:
+            # whatever can be reached from where the player is without a step goes first
+            targets.sort(key=lambda t: not within_reach(t, current_tile))
+        return [item for tile in targets for item in by_tile[tile]]
+
+    def standing_tile(self, tile):
+        '''
+        Tile within reach of target tile to stand on for it, or None when it isn't planned with a grid.
+        '''
+        return self.stands.get(tile)
+
+    def plan(self, start, order, new):
+        self.plans += 1
+        distances = self.distances
+        if order:
+            for tile in new:
+                distances.search(tile, [start] + order)
+                order = cheapest_insertion(start, order, tile, distances)
+        else:
+            order = nearest_neighbor(start, new, distances)
+        return improve(start, order, distances)
+
+def nearest_neighbor(start, tiles, distances):
+    neighbors = distances.neighbor_lists(tiles, NEIGHBORS)
+    unvisited = set(tiles)
+    order = []
+    current = start
+    while unvisited:
+        nxt = None
+        for tile in neighbors.get(current, ()):
+            if tile in unvisited:
+                nxt = tile
+                break
+        if nxt is None:
+            # all of its nearest are done, search on to the nearest one left
+            nxt = distances.nearest(current, unvisited, 1)
+            nxt = nxt[0] if nxt else min(unvisited)
+        unvisited.remove(nxt)
+        order.append(nxt)
+        current = nxt
+    return order
+
+def cheapest_insertion(start, order, tile, distance):
+    best_cost, best_index = distance(order[-1], tile), len(order)
+    prev = start
+    for i, nxt in enumerate(order):
+        cost = distance(prev, tile) + distance(tile, nxt) - distance(prev, nxt)
+        if cost < best_cost:
+            best_cost, best_index = cost, i
+        prev = nxt
+    return order[:best_index] + [tile] + order[best_index:]
+
+def tour_length(start, order, distance):
+    total = 0
+    prev = start
+    for tile in order:
+        total += distance(prev, tile)
+        prev = tile
+    return total
+
+def improve(start, order, distances):
+    '''
+    2-opt and Or-opt moves on the open tour start, *order until neither shortens it.
+    '''
+    tour = [start] + order
+    neighbors = distances.neighbor_lists(order, NEIGHBORS)
+    for _ in range(MAX_PASSES):
+        improved = two_opt(tour, neighbors, distances)
+        improved = or_opt(tour, neighbors, distances) or improved
+        if not improved:
+            break
+    return tour[1:]
+
+def two_opt(tour, neighbors, distance):
+    # reverse tour[i + 1:j + 1] when joining tour[i] to tour[j] is shorter
+    improved = False
+    last = len(tour) - 1
+    position = {tile: i for i, tile in enumerate(tour)}
+    for i in range(last):
+        a, b = tour[i], tour[i + 1]
+        ab = distance(a, b)
+        for c in neighbors.get(a, ()):
+            j = position[c]
+            if j <= i + 1:
+                continue
+            d = tour[j + 1] if j < last else None
+            gain = ab + (distance(c, d) if d is not None else 0) - distance(a, c) - (distance(b, d) if d is not None else 0)
+            if gain > 0:
+                tour[i + 1:j + 1] = tour[j:i:-1]
+                for k in range(i + 1, j + 1):
+                    position[tour[k]] = k
+                improved = True
+                b = tour[i + 1]
+                ab = distance(a, b)
+    return improved
+
+def or_opt(tour, neighbors, distance):
+    # move a run of tiles, either way round, to between a tile near one of its ends and the next
+    improved = False
+    position = {tile: i for i, tile in enumerate(tour)}
+    i = 1
+    while i < len(tour):
+        for length in OR_OPT_SEGMENTS:
+            if i + length > len(tour):
+                break
+            if move_segment(tour, position, i, length, neighbors, distance):
+                improved = True
+                position = {tile: i for i, tile in enumerate(tour)}
+                break
+        i += 1
+    return improved
+
+def move_segment(tour, position, i, length, neighbors, distance):
+    last = len(tour) - 1
+    first, end = tour[i], tour[i + length - 1]
+    prev = tour[i - 1]
+    nxt = tour[i + length] if i + length <= last else None
+    removed = distance(prev, first)
+    if nxt is not None:
+        removed += distance(end, nxt) - distance(prev, nxt)
+    segment = tour[i:i + length]
+    inside = set(segment)
+    best = None
+    for anchor in neighbors.get(first, []) + neighbors.get(end, []):
+        if anchor in inside or anchor == prev:
+            continue
+        j = position[anchor]
+        after = tour[j + 1] if j < last else None
+        for head, tail in ((first, end), (end, first)):
+            added = distance(anchor, head)
+            if after is not None:
+                added += distance(tail, after) - distance(anchor, after)
+            gain = removed - added
+            if gain > 0 and (best is None or gain > best[0]):
+                best = gain, anchor, head != first
+    if best is None:
+        return False
+    _, anchor, reverse = best
+    del tour[i:i + length]
+    if reverse:
+        segment.reverse()
+    j = tour.index(anchor)
+    tour[j + 1:j + 1] = segment
+    return True
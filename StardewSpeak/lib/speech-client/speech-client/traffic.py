@@ -0,0 +1,74 @@
+'''
+Records everything sent to and received from the mod so a session can be replayed later without
+the game, see benchmarks/replay.py. Recordings are gzipped JSON lines of [time, direction, message]
+with time in seconds since the recording started.
+'''
+import gzip
+import json
+import os
+import threading
+import time
+
+import records
+
+INBOUND = 'i'
+OUTBOUND = 'o'
+# free form markers like recognized commands, ignored by the replay
+NOTE = 'n'
+
+FLUSH_INTERVAL = 5
+
+
+class Recorder:
+
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.f = gzip.open(path, 'wt', encoding='utf8')
+        self.started_at = clock()
+        self.flushed_at = self.started_at
+        self.records = 0
+        # recognition notes and the log messages it sends come from the engine thread, everything
+        # else from the loop, one gzip stream can't take writes from both at once
+        self.lock = threading.Lock()
+
+    def inbound(self, msg):
+        self.write(INBOUND, msg)
+
+    def outbound(self, msg):
+        self.write(OUTBOUND, msg)
+
+    def note(self, value):
+        self.write(NOTE, value)
+
+    def write(self, direction, value):
+        with self.lock:
+            if self.f is None:
+                return
+            now = self.clock()
+            self.f.write(json.dumps([round(now - self.started_at, 4), direction, value], separators=(',', ':'), default=records.to_plain) + '\n')
+            self.records += 1
+            # the mod kills the client on exit, keep what's been recorded so far readable
+            if now - self.flushed_at > FLUSH_INTERVAL:
+                self.f.flush()
+                self.flushed_at = now
+
+    def close(self):
+        with self.lock:
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+def default_path(debug_dir):
+    return os.path.join(debug_dir, time.strftime('traffic-%Y%m%d-%H%M%S.jsonl.gz'))
+
+def load(path):
+    records = []
+    with gzip.open(path, 'rt', encoding='utf8') as f:
+        try:
+            for line in f:
+                records.append(json.loads(line))
+        except (EOFError, json.JSONDecodeError):
+            # recordings cut off mid write end with a partial line
+            pass
+    return records
@@ -0,0 +1,1047 @@
+'''
+Headless stand-in for the StardewSpeak mod. Launches the client the same way the mod does and
+speaks the same stdin/stdout protocol, answering requests from a small tick driven farm simulation
+loaded from a scenario file instead of the game.
+
+    python standin/mod_standin.py standin/scenarios/farm.json [--tps 600] -- python standin/run_client.py EXPR
+
+Requests are handled once per tick like the mod's UpdateTicked queue and UPDATE_TICKED streams are
+sent after them. Held movement buttons walk the player at roughly the farmer's speed, tools take
+a fixed number of ticks per swing and act on the cursor tile if it's next to the player, otherwise
+the tile in front. An upgraded hoe or watering can charges while the button is held and works on
+the area for its power in front of the player when it's released. Only what the objectives need is
+simulated. When the client exits a summary with the request counts and what is left to do on the
+farm is printed to stderr.
+'''
+import argparse
+import collections
+import heapq
+import itertools
+import json
+import os
+import queue
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'speech-client'))
+
+import constants, framing, predicates
+
+TILE_SIZE = 64
+# pixels per tick, close to the farmer's walking speed
+SPEED = 5
+TOOL_SWING_TICKS = 24
+# ticks an upgraded hoe or watering can takes to charge each power, about the game's 600ms
+TOOL_CHARGE_TICKS = 36
+# tools that charge, by type
+CHARGING_TOOLS = frozenset(('hoe', 'wateringCan'))
+# (tiles forward, tiles to each side) worked on at each power, like Tool.tilesAffected
+TOOL_AREAS = ((1, 0), (3, 0), (5, 0), (3, 1), (6, 1))
+TOOLBAR_SIZE = 12
+# same as server.BATCH_ITEM_RESULTS_CAPABILITY, the stand-in doesn't import the client
+BATCH_ITEM_RESULTS_CAPABILITY = 'batch_item_results'
+# same as server.STREAM_FILTER_CAPABILITY
+STREAM_FILTER_CAPABILITY = 'stream_filters'
+# same as server.PASSABILITY_GRID_CAPABILITY
+PASSABILITY_GRID_CAPABILITY = 'passability_grid'
+# same as server.PATHS_TO_TILES_CAPABILITY
+PATHS_TO_TILES_CAPABILITY = 'paths_to_tiles'
+# same as server.ROUTE_TABLE_CAPABILITY
+ROUTE_TABLE_CAPABILITY = 'route_table'
+# same as server.HELD_BUTTONS_CAPABILITY
+HELD_BUTTONS_CAPABILITY = 'held_buttons'
+# same as server.FOLLOW_PATH_CAPABILITY
+FOLLOW_PATH_CAPABILITY = 'follow_path'
+# what GET_SAVE_KEY says the game version is
+GAME_VERSION = '1.5.6'
+# same as server.INPUT_LANE
+INPUT_LANE = 'input'
+# queries that walk a whole location in the mod, --bulk_cost_ms makes each of them take that long
+BULK_QUERIES = frozenset(('GET_LOCATION_OBJECTS', 'GET_RESOURCE_CLUMPS', 'GET_WATER_TILES', 'GET_HOE_DIRT', 'GET_DIGGABLE_TILES'))
+
+MOVE_BUTTONS = {
+    constants.MOVE_UP_BUTTON: constants.NORTH,
+    constants.MOVE_RIGHT_BUTTON: constants.EAST,
+    constants.MOVE_DOWN_BUTTON: constants.SOUTH,
+    constants.MOVE_LEFT_BUTTON: constants.WEST,
+}
+DIRECTION_OFFSETS = {
+    constants.NORTH: (0, -1),
+    constants.EAST: (1, 0),
+    constants.SOUTH: (0, 1),
+    constants.WEST: (-1, 0),
+}
+# object a tool clears, by tool type
+TOOL_TARGETS = {
+    'pickaxe': (constants.STONE,),
+    'axe': (constants.TWIG,),
+    'scythe': (constants.WEEDS,),
+}
+
+
+class Location:
+
+    def __init__(self, name, spec):
+        self.name = name
+        rows = spec['map']
+        self.height = len(rows)
+        self.width = len(rows[0])
+        self.blocked = set()
+        self.water = set()
+        for y, row in enumerate(rows):
+            for x, c in enumerate(row):
+                if c == '#':
+                    self.blocked.add((x, y))
+                elif c == '~':
+                    self.water.add((x, y))
+        self.hoe_dirt = {}
+        for hd in spec.get('hoeDirt', []):
+            self.add_hoe_dirt(hd['tileX'], hd['tileY'], hd.get('crop'), hd.get('isWatered', False), hd.get('readyForHarvest', False))
+        self.objects = {(o['tileX'], o['tileY']): new_object(o) for o in spec.get('objects', [])}
+        self.characters = [new_character(c, name) for c in spec.get('characters', [])]
+        self.connections = spec.get('connections', [])
+        self.grid_version = 0
+        self.outdoors = spec.get('outdoors', True)
+
+    def add_hoe_dirt(self, x, y, crop=None, watered=False, ready=False):
+        self.hoe_dirt[(x, y)] = {
+            'type': 'hoeDirt',
+            'readyForHarvest': ready,
+            'fertilizer': 0,
+            'isWatered': watered,
+            'needsWatering': crop is not None and not ready and not watered,
+            'tileX': x,
+            'tileY': y,
+            'crop': crop,
+            'canPlantThisSeedHere': crop is None,
+        }
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_walkable(self, x, y):
+        tile = x, y
+        return self.in_bounds(x, y) and tile not in self.blocked and tile not in self.water and tile not in self.objects
+
+    def passability_grid(self):
+        rows = [''.join('.' if self.is_walkable(x, y) else '#' for x in range(self.width)) for y in range(self.height)]
+        return {'location': self.name, 'version': self.grid_version, 'width': self.width, 'height': self.height, 'rows': rows}
+
+    def find_path(self, start, end, limit=-1):
+        # same search as Pathfinder.findPath: the start tile itself doesn't have to be walkable
+        if start == end:
+            return [start]
+        counter = itertools.count()
+        open_heap = [(manhattan(start, end), next(counter), start)]
+        parents = {start: None}
+        costs = {start: 0}
+        iterations = 0
+        while open_heap:
+            _, _, current = heapq.heappop(open_heap)
+            if current == end:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = parents[current]
+                return path[::-1]
+            for dx, dy in DIRECTION_OFFSETS.values():
+                neighbor = current[0] + dx, current[1] + dy
+                if neighbor in parents or not self.is_walkable(*neighbor):
+                    continue
+                parents[neighbor] = current
+                costs[neighbor] = costs[current] + 1
+                heapq.heappush(open_heap, (costs[neighbor] + manhattan(neighbor, end), next(counter), neighbor))
+            iterations += 1
+            if 0 <= limit <= iterations:
+                return None
+        return None
+
+    def distances_to_tiles(self, start, targets, adjacent=False, nearest_only=False, limit=-1):
+        # same search as Pathfinder.DistancesToTiles, breadth first a step at a time
+        distances = [None] * len(targets)
+        target_indexes = collections.defaultdict(list)
+        for i, target in enumerate(targets):
+            target_indexes[target].append(i)
+        target_tiles = len(target_indexes)
+        for i in target_indexes.pop(start, ()):
+            distances[i] = 0
+        seen = {start}
+        frontier = [start]
+        iterations = 0
+        for distance in itertools.count(1):
+            if not frontier or not target_indexes or (nearest_only and len(target_indexes) < target_tiles):
+                break
+            next_frontier = []
+            for tile in frontier:
+                for dx, dy in DIRECTION_OFFSETS.values():
+                    neighbor = tile[0] + dx, tile[1] + dy
+                    if neighbor in seen:
+                        continue
+                    if self.is_walkable(*neighbor):
+                        seen.add(neighbor)
+                        next_frontier.append(neighbor)
+                    elif not adjacent:
+                        continue
+                    for i in target_indexes.pop(neighbor, ()):
+                        distances[i] = distance
+                iterations += 1
+                if 0 <= limit <= iterations:
+                    return distances
+            frontier = next_frontier
+        return distances
+
+    def connection_at(self, x, y):
+        for cn in self.connections:
+            if (cn['X'], cn['Y']) == (x, y):
+                return cn
+        return None
+
+def new_object(spec):
+    name = spec['name']
+    return {
+        'name': name,
+        'tileX': spec['tileX'],
+        'tileY': spec['tileY'],
+        'type': spec.get('type', 'Litter' if name in (constants.STONE, constants.TWIG, constants.WEEDS) else 'Basic'),
+        'isForage': spec.get('isForage', False),
+        'readyForHarvest': spec.get('readyForHarvest', False),
+        'canBeGrabbed': spec.get('canBeGrabbed', False),
+        'isOnScreen': True,
+        'parentSheetIndex': spec.get('parentSheetIndex', 0),
+        'category': spec.get('category', 0),
+    }
+
+def new_character(spec, location):
+    return {
+        'name': spec['name'],
+        'trackingId': spec.get('trackingId', spec['name']),
+        'location': location,
+        'tileX': spec['tileX'],
+        'tileY': spec['tileY'],
+        'isMonster': spec.get('isMonster', False),
+        'isInvisible': False,
+        'facingDirection': constants.SOUTH,
+        'position': [spec['tileX'] * TILE_SIZE, spec['tileY'] * TILE_SIZE],
+        'center': [spec['tileX'] * TILE_SIZE + TILE_SIZE // 2, spec['tileY'] * TILE_SIZE + TILE_SIZE // 2],
+    }
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+def tiles_to_points(tiles):
+    return None if tiles is None else [{'X': x, 'Y': y} for x, y in tiles]
+
+
+class Player:
+
+    def __init__(self, spec):
+        self.location = spec['location']
+        self.set_tile(spec['tileX'], spec['tileY'])
+        self.facing = spec.get('facingDirection', constants.SOUTH)
+        self.moving = False
+        self.items = list(spec.get('items', []))
+        self.current_tool_index = spec.get('currentToolIndex', 0)
+        self.held = [] # held buttons, most recently pressed last
+        self.mouse_tile = None
+        self.swing_ticks = 0
+        self.swing_target = None
+        self.charge_ticks = None # ticks the tool has been charging for, None when it isn't
+        self.tool_power = 0
+
+    def set_tile(self, x, y):
+        # Farmer.Position is the top left of a bounding box that sits on the lower part of the tile
+        self.x = x * TILE_SIZE
+        self.y = (y + 0.25) * TILE_SIZE
+
+    @property
+    def tile(self):
+        return tile_for_position(self.x, self.y)
+
+    @property
+    def current_item(self):
+        if 0 <= self.current_tool_index < len(self.items):
+            return self.items[self.current_tool_index]
+        return None
+
+def tile_for_position(x, y):
+    return round(x / TILE_SIZE), round(y / TILE_SIZE - 0.25)
+
+
+class StandinStream:
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data or {}
+        self.delta = isinstance(data, dict) and bool(data.get('delta'))
+        self.resync_requested = False
+        self.last_value = None
+        self.sequence = 0
+        self.where = None
+        self.follower = PathFollower(data) if name == 'FOLLOW_PATH' else None
+
+    def matches(self, value):
+        # mirrors Stream.Matches in the mod
+        return self.where is None or predicates.evaluate(self.where, value)
+
+    def next_value(self, value):
+        # mirrors Stream.NextValue in the mod
+        if not self.delta:
+            return value
+        current = json.loads(json.dumps(value))
+        last = self.last_value
+        self.last_value = current
+        self.sequence += 1
+        if self.resync_requested or not isinstance(last, dict) or not isinstance(current, dict):
+            self.resync_requested = False
+            return {'seq': self.sequence, 'full': True, 'value': current}
+        changed, slots = {}, {}
+        for key, value in current.items():
+            prev = last.get(key, Missing)
+            if prev == value:
+                continue
+            if isinstance(prev, list) and isinstance(value, list) and len(prev) == len(value):
+                slots[key] = {str(i): v for i, (p, v) in enumerate(zip(prev, value)) if p != v}
+            else:
+                changed[key] = value
+        removed = [key for key in last if key not in current]
+        return {'seq': self.sequence, 'full': False, 'changed': changed, 'slots': slots, 'removed': removed}
+
+Missing = object()
+
+
+class PathFollower:
+    '''
+    Steers the player along a FOLLOW_PATH stream's tiles every tick, mirrors PathFollower in the mod.
+    '''
+
+    def __init__(self, data):
+        self.next_location = data.get('nextLocation')
+        self.turn_threshold = data['turnThreshold']
+        self.last_tile_done_threshold = data['lastTileDoneThreshold']
+        self.stop_moving_when_done = data['stopMovingWhenDone']
+        self.stop_when = data.get('stopWhen')
+        self.retarget(data['tiles'], data['location'], 0)
+
+    def retarget(self, tiles, location, version):
+        if not tiles:
+            raise ValueError('Path has no tiles')
+        self.tiles = [(t['X'], t['Y']) for t in tiles]
+        self.tile_indices = {tile: i for i, tile in enumerate(self.tiles)}
+        self.location = location
+        self.version = version
+        self.last_index = -1
+        self.off_path_tile = None
+        self.finished = False
+
+    def update(self, sim):
+        if self.finished:
+            return None
+        player = sim.player
+        if player.location != self.location:
+            if player.location == self.next_location:
+                return self.finish(sim, 'arrived')
+            return self.finish(sim, 'failed', f'Unexpected location {player.location}, pathfinding for {self.location}')
+        if self.stop_when is not None and predicates.evaluate(self.stop_when, sim.player_status()):
+            return self.finish(sim, 'done')
+        tile = player.tile
+        index = self.tile_indices.get(tile)
+        if index is None:
+            if self.off_path_tile == tile:
+                return None
+            self.off_path_tile = tile
+            return {'status': 'off_path', 'version': self.version, 'tileX': tile[0], 'tileY': tile[1]}
+        self.off_path_tile = None
+        if index == len(self.tiles) - 1:
+            if player.moving and facing_tile_center(player, self.last_tile_done_threshold):
+                return self.progress(index, tile)
+            return self.finish(sim, 'done')
+        direction = direction_from_tiles(tile, self.tiles[index + 1])
+        if direction is None:
+            return self.finish(sim, 'failed', f'Tiles {tile} and {self.tiles[index + 1]} aren\'t next to each other')
+        turn_coming = player.moving and abs(player.facing - direction) % 2 == 1
+        if not turn_coming or not facing_tile_center(player, self.turn_threshold):
+            for button, button_direction in MOVE_BUTTONS.items():
+                if button_direction == direction:
+                    sim.hold(button)
+                else:
+                    sim.release(button)
+        return self.progress(index, tile)
+
+    def cancel(self, sim):
+        if not self.finished:
+            self.finished = True
+            if self.stop_moving_when_done:
+                stop_moving(sim)
+
+    def progress(self, index, tile):
+        if index == self.last_index:
+            return None
+        self.last_index = index
+        return {'status': 'progress', 'version': self.version, 'index': index, 'tileX': tile[0], 'tileY': tile[1]}
+
+    def finish(self, sim, status, error=None):
+        self.finished = True
+        if self.stop_moving_when_done:
+            stop_moving(sim)
+        return {'status': status, 'version': self.version, 'index': self.last_index, 'error': error}
+
+def stop_moving(sim):
+    for button in MOVE_BUTTONS:
+        sim.release(button)
+
+def direction_from_tiles(tile, target):
+    offset = target[0] - tile[0], target[1] - tile[1]
+    for direction, direction_offset in DIRECTION_OFFSETS.items():
+        if offset == direction_offset:
+            return direction
+    return None
+
+def facing_tile_center(player, offset_threshold):
+    # same as Path.facing_tile_center
+    tile_x, tile_y = player.tile
+    x = player.x / TILE_SIZE - tile_x
+    y = player.y / TILE_SIZE - tile_y - 0.25
+    if player.facing == constants.NORTH:
+        return y + offset_threshold <= 0
+    if player.facing == constants.EAST:
+        return x + offset_threshold <= 0
+    if player.facing == constants.SOUTH:
+        return y - offset_threshold >= 0
+    if player.facing == constants.WEST:
+        return x - offset_threshold >= 0
+    return False
+
+
+class Simulation:
+
+    def __init__(self, scenario):
+        self.locations = {name: Location(name, spec) for name, spec in scenario['locations'].items()}
+        self.save_id = scenario.get('saveId', 'standin')
+        self.player = Player(scenario['player'])
+        self.tick = 0
+        self.warps = [] # warp events since the last tick
+        self.list_changes = [] # (terrain_features or objects, location) since the last tick, like the mod's list changed events
+        self.grid_version = 0
+        self.overshoots = [] # pixels past the tile center when the player turned, negative if short of it
+        self.tiles_walked = 0
+        self.tool_swings = 0
+
+    @property
+    def location(self):
+        return self.locations[self.player.location]
+
+    def update(self):
+        self.tick += 1
+        self.move_player()
+        self.update_tool()
+
+    def move_player(self):
+        player = self.player
+        directions = [MOVE_BUTTONS[b] for b in player.held if b in MOVE_BUTTONS]
+        was_moving, player.moving = player.moving, False
+        if not directions or player.swing_ticks or player.charge_ticks is not None:
+            return
+        if was_moving and (directions[-1] - player.facing) % 2:
+            self.overshoots.append(self.distance_past_center(player.facing))
+        player.facing = directions[-1]
+        start_tile = player.tile
+        for direction in directions:
+            dx, dy = DIRECTION_OFFSETS[direction]
+            new_x, new_y = player.x + dx * SPEED, player.y + dy * SPEED
+            new_tile = tile_for_position(new_x, new_y)
+            if new_tile != player.tile and not self.location.is_walkable(*new_tile):
+                continue
+            player.x, player.y = new_x, new_y
+            player.moving = True
+        if player.tile != start_tile:
+            self.tiles_walked += 1
+        connection = self.location.connection_at(*player.tile)
+        if connection is not None and not connection['IsDoor']:
+            self.warp(connection)
+
+    def distance_past_center(self, direction):
+        player = self.player
+        tile_x, tile_y = player.tile
+        dx, dy = DIRECTION_OFFSETS[direction]
+        return (player.x - tile_x * TILE_SIZE) * dx + (player.y - (tile_y + 0.25) * TILE_SIZE) * dy
+
+    def warp(self, connection):
+        player = self.player
+        old_location = player.location
+        player.location = connection['TargetName']
+        player.set_tile(connection['TargetX'], connection['TargetY'])
+        player.held.clear()
+        self.warps.append({'timestamp': int(time.time() * 1000), 'oldLocation': old_location, 'newLocation': player.location})
+
+    def tool_tile(self):
+        player = self.player
+        px, py = player.tile
+        if player.mouse_tile is not None:
+            mx, my = player.mouse_tile
+            if max(abs(mx - px), abs(my - py)) == 1:
+                return player.mouse_tile
+        dx, dy = DIRECTION_OFFSETS[player.facing]
+        return px + dx, py + dy
+
+    def update_tool(self):
+        player = self.player
+        if player.swing_ticks:
+            player.swing_ticks -= 1
+            if not player.swing_ticks:
+                for tile in self.swing_area():
+                    self.apply_tool(player.current_item, tile)
+                player.tool_power = 0
+            return
+        item = player.current_item
+        held = constants.USE_TOOL_BUTTON in player.held
+        if player.charge_ticks is not None:
+            if held:
+                player.charge_ticks += 1
+                player.tool_power = min(player.charge_ticks // TOOL_CHARGE_TICKS, item.get('upgradeLevel', 0), len(TOOL_AREAS) - 1)
+            else:
+                player.charge_ticks = None
+                self.start_swing()
+        elif held and item is not None and item.get('isTool'):
+            if item.get('upgradeLevel', 0) and item.get('type') in CHARGING_TOOLS:
+                player.charge_ticks = 0
+            else:
+                self.start_swing()
+
+    def start_swing(self):
+        player = self.player
+        player.swing_ticks = TOOL_SWING_TICKS
+        player.swing_target = self.tool_tile()
+        self.tool_swings += 1
+
+    def swing_area(self):
+        # a charged swing starts at the tile in front of the player whatever the cursor is on
+        player = self.player
+        if not player.tool_power:
+            return [player.swing_target]
+        length, side = TOOL_AREAS[player.tool_power]
+        dx, dy = DIRECTION_OFFSETS[player.facing]
+        x, y = player.tile
+        return [(x + dx * f - dy * s, y + dy * f + dx * s) for f in range(1, length + 1) for s in range(-side, side + 1)]
+
+    def apply_tool(self, item, tile):
+        loc = self.location
+        tool_type = item.get('type')
+        hoe_dirt = loc.hoe_dirt.get(tile)
+        obj = loc.objects.get(tile)
+        if tool_type == 'wateringCan':
+            if hoe_dirt is not None:
+                hoe_dirt['isWatered'] = True
+                hoe_dirt['needsWatering'] = False
+        elif tool_type == 'hoe':
+            if hoe_dirt is None and obj is None and loc.is_walkable(*tile):
+                loc.add_hoe_dirt(*tile)
+                self.list_changed('terrain_features', loc)
+        elif obj is not None and obj['name'] in TOOL_TARGETS.get(tool_type, ()):
+            del loc.objects[tile]
+            self.list_changed('objects', loc)
+        elif tool_type == 'pickaxe' and hoe_dirt is not None and hoe_dirt['crop'] is None:
+            del loc.hoe_dirt[tile]
+            self.list_changed('terrain_features', loc)
+
+    def list_changed(self, kind, loc):
+        self.list_changes.append((kind, loc.name))
+        # like CollisionGrid.Bump
+        self.grid_version += 1
+        loc.grid_version = self.grid_version
+
+    def do_action(self):
+        loc = self.location
+        tile = self.tool_tile()
+        hoe_dirt = loc.hoe_dirt.get(tile)
+        obj = loc.objects.get(tile)
+        connection = loc.connection_at(*tile)
+        if hoe_dirt is not None and hoe_dirt['readyForHarvest']:
+            loc.add_hoe_dirt(*tile)
+        elif obj is not None and (obj['canBeGrabbed'] or obj['readyForHarvest']):
+            del loc.objects[tile]
+            self.list_changed('objects', loc)
+        elif connection is not None and connection['IsDoor']:
+            self.warp(connection)
+
+    def press_key(self, key):
+        player = self.player
+        if key in MOVE_BUTTONS:
+            player.facing = MOVE_BUTTONS[key]
+        elif key == constants.ACTION_BUTTON:
+            self.do_action()
+        elif key == constants.USE_TOOL_BUTTON:
+            if not player.swing_ticks and player.charge_ticks is None:
+                self.start_swing()
+        elif key.startswith('inventorySlot'):
+            player.current_tool_index = int(key[len('inventorySlot'):]) - 1
+        elif key == 'toolbarSwap':
+            player.items = player.items[TOOLBAR_SIZE:] + player.items[:TOOLBAR_SIZE]
+
+    def hold(self, key):
+        if key not in self.player.held:
+            self.player.held.append(key)
+
+    def release(self, key):
+        if key in self.player.held:
+            self.player.held.remove(key)
+
+    # serialization, same shapes as GameState and Utils.SerializeItem
+    def player_status(self):
+        player = self.player
+        return {
+            'location': player.location,
+            'position': [player.x, player.y],
+            'center': [int(player.x) + TILE_SIZE // 2, int(player.y) + TILE_SIZE // 2],
+            'tileX': player.tile[0],
+            'tileY': player.tile[1],
+            'canMove': not player.swing_ticks and player.charge_ticks is None,
+            'facingDirection': player.facing,
+            'isMoving': player.moving,
+            'lastWarp': None,
+            'currentEvent': None,
+        }
+
+    def serialize_item(self, item):
+        if item is None:
+            return None
+        obj = {
+            'netName': item['name'],
+            'stack': item.get('stack', 1),
+            'displayName': item['name'],
+            'name': item['name'],
+            'type': item.get('type', ''),
+            'isTool': item.get('isTool', False),
+        }
+        if obj['isTool']:
+            tile_x, tile_y = self.tool_tile()
+            obj.update({
+                'upgradeLevel': item.get('upgradeLevel', 0),
+                'power': self.player.tool_power,
+                'baseName': item.get('baseName', item['name']),
+                'inUse': self.player.swing_ticks > 0 or self.player.charge_ticks is not None,
+                'tileX': tile_x,
+                'tileY': tile_y,
+            })
+        return obj
+
+    def player_items(self):
+        return {
+            'currentToolIndex': self.player.current_tool_index,
+            'items': [self.serialize_item(i) for i in self.player.items],
+            'cursorSlotItem': None,
+            'equippedItems': {k: None for k in ('boots', 'hat', 'leftRing', 'pants', 'rightRing', 'shirt')},
+        }
+
+    def route(self, start, destination):
+        parents = {start: None}
+        frontier = collections.deque([start])
+        while frontier:
+            current = frontier.popleft()
+            if current == destination:
+                route = []
+                while current is not None:
+                    route.append(current)
+                    current = parents[current]
+                return route[::-1]
+            for cn in self.locations[current].connections:
+                if cn['TargetName'] not in parents and cn['TargetName'] in self.locations:
+                    parents[cn['TargetName']] = current
+                    frontier.append(cn['TargetName'])
+        return None
+
+    def connections(self, location):
+        return [{
+            'TargetName': cn['TargetName'],
+            'X': cn['X'],
+            'Y': cn['Y'],
+            'IsDoor': cn['IsDoor'],
+            'TargetIsOutdoors': self.locations[cn['TargetName']].outdoors,
+        } for cn in location.connections]
+
+    def connection_distances(self, name):
+        # like Routing.ConnectionDistances
+        location = self.locations.get(name)
+        if location is None:
+            return None
+        tiles = [(cn['X'], cn['Y']) for cn in location.connections]
+        return [location.distances_to_tiles(tile, tiles, adjacent=True) for tile in tiles]
+
+    def nearest_character(self, data):
+        loc = self.location
+        character_type = data['characterType']
+        required_name = data.get('requiredName')
+        if character_type not in ('npc', 'monster'):
+            return None
+        player_tile = self.player.tile
+        candidates = [c for c in loc.characters if c['isMonster'] == (character_type == 'monster')]
+        if required_name is not None:
+            candidates = [c for c in candidates if c['name'] == required_name]
+        candidates.sort(key=lambda c: manhattan(player_tile, (c['tileX'], c['tileY'])))
+        if not data.get('getPath'):
+            return candidates[0] if candidates else None
+        for candidate in candidates:
+            candidate_tile = candidate['tileX'], candidate['tileY']
+            if manhattan(candidate_tile, player_tile) < 2:
+                return candidate
+            path = loc.find_path(candidate_tile, player_tile)
+            if path is not None:
+                return {**candidate, 'pathTiles': tiles_to_points(path)}
+        return None
+
+    def remaining(self):
+        remaining = collections.Counter()
+        for loc in self.locations.values():
+            for hd in loc.hoe_dirt.values():
+                if hd['needsWatering']:
+                    remaining['unwatered'] += 1
+                if hd['readyForHarvest']:
+                    remaining['harvestable'] += 1
+            for obj in loc.objects.values():
+                remaining[obj['name']] += 1
+        return dict(remaining)
+
+
+class Standin:
+
+    def __init__(self, simulation, proc, tick_budget_ms=5, bulk_cost_ms=0):
+        self.sim = simulation
+        self.proc = proc
+        self.inbox = queue.Queue()
+        self.input_inbox = queue.Queue()
+        self.tick_budget = tick_budget_ms / 1000
+        self.bulk_cost = bulk_cost_ms / 1000
+        self.turn_latency = [] # ms from arriving to being handled, UPDATE_HELD_BUTTONS that change direction
+        self.streams = {}
+        self.encoder = framing.Encoder()
+        self.write_lock = threading.Lock()
+        self.cancelled = set()
+        self.handled = collections.Counter()
+        self.stream_frames = collections.Counter()
+        self.closed = False
+
+    def read(self):
+        decoder = framing.Decoder(switch_on=framing.SET_FRAMING)
+        while True:
+            data = self.proc.stdout.read1(65536)
+            if not data:
+                break
+            for msg in decoder.feed(data):
+                if isinstance(msg, framing.DecodeError):
+                    log(f'Invalid message from client {msg.raw!r}')
+                elif msg['type'] == framing.SET_FRAMING:
+                    with self.write_lock:
+                        self._write({'type': framing.FRAMING_CHANGED, 'data': msg['data']})
+                        self.encoder.framing = msg['data']
+                elif msg['type'] == 'CANCEL_REQUEST':
+                    self.cancelled.add(msg['data'])
+                elif msg.get('lane') == INPUT_LANE:
+                    self.input_inbox.put((time.perf_counter(), msg))
+                else:
+                    self.inbox.put((time.perf_counter(), msg))
+        self.closed = True
+
+    def send(self, msg_type, data):
+        with self.write_lock:
+            self._write({'type': msg_type, 'data': data})
+
+    def _write(self, msg):
+        try:
+            self.proc.stdin.write(self.encoder.encode(msg))
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self.closed = True
+
+    def run(self, tps):
+        threading.Thread(target=self.read, daemon=True).start()
+        interval = 1 / tps if tps else 0
+        next_tick = time.perf_counter()
+        while not self.closed:
+            self.respond_to_queued_requests()
+            self.sim.update()
+            self.send_stream_frames()
+            if interval:
+                next_tick += interval
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.perf_counter()
+
+    def respond_to_queued_requests(self):
+        # like ModEntry, input first and then queries until the tick's time budget runs out
+        self.respond_to_queue(self.input_inbox)
+        self.respond_to_queue(self.inbox)
+
+    def respond_to_queue(self, inbox):
+        start = time.perf_counter()
+        while time.perf_counter() - start < self.tick_budget:
+            try:
+                received_at, msg = inbox.get_nowait()
+            except queue.Empty:
+                return
+            msg_type = msg['type']
+            if msg_type == 'LOG':
+                log(f"Speech engine message: {msg['data']['value']}")
+                continue
+            if msg['id'] in self.cancelled:
+                self.cancelled.discard(msg['id'])
+                continue
+            self.handled[msg_type] += 1
+            if msg_type == 'UPDATE_HELD_BUTTONS' and any(b in MOVE_BUTTONS and b not in self.sim.player.held for b in msg['data']['toHold']):
+                self.turn_latency.append((time.perf_counter() - received_at) * 1000)
+            if msg_type in BULK_QUERIES and self.bulk_cost:
+                time.sleep(self.bulk_cost)
+            try:
+                value, error = self.handle_request(msg_type, msg['data']), None
+            except Exception:
+                value, error = traceback.format_exc(), 'STACK_TRACE'
+            self.send('RESPONSE', {'id': msg['id'], 'value': value, 'error': error})
+
+    def send_stream_frames(self):
+        warps, self.sim.warps = self.sim.warps, []
+        list_changes, self.sim.list_changes = self.sim.list_changes, []
+        for kind, location in list_changes:
+            if kind == 'terrain_features':
+                self.send('EVENT', {'eventType': 'TERRAIN_FEATURE_LIST_CHANGED', 'data': {'location': location, 'removed': []}})
+        for stream_id, stream in list(self.streams.items()):
+            if stream.follower is not None:
+                self.follow_path(stream_id, stream.follower)
+                continue
+            if stream.name == 'ON_WARPED':
+                for warp in warps:
+                    self.send('STREAM_MESSAGE', {'stream_id': stream_id, 'value': warp})
+            if stream.name == 'ON_OBJECT_LIST_CHANGED':
+                for kind, location in list_changes:
+                    if kind == 'objects':
+                        self.send('STREAM_MESSAGE', {'stream_id': stream_id, 'value': {'location': location}})
+            if stream.name != 'UPDATE_TICKED' or self.sim.tick % stream.data.get('ticks', 1):
+                continue
+            try:
+                current = self.handle_request(stream.data['type'])
+                if not stream.matches(current):
+                    continue
+                value, error = stream.next_value(current), None
+            except Exception:
+                value, error = traceback.format_exc(), 'STREAM_EXCEPTION'
+            self.stream_frames[stream.data['type']] += 1
+            self.send('STREAM_MESSAGE', {'stream_id': stream_id, 'value': value, 'error': error})
+
+    def follow_path(self, stream_id, follower):
+        try:
+            value, error = follower.update(self.sim), None
+            if value is None:
+                return
+        except Exception:
+            follower.cancel(self.sim)
+            value, error = traceback.format_exc(), 'STREAM_EXCEPTION'
+        self.stream_frames['FOLLOW_PATH'] += 1
+        self.send('STREAM_MESSAGE', {'stream_id': stream_id, 'value': value, 'error': error})
+
+    def handle_request(self, msg_type, data=None):
+        sim = self.sim
+        player = sim.player
+        loc = sim.location
+        if msg_type == 'HEARTBEAT':
+            return None
+        if msg_type == 'REQUEST_BATCH':
+            if isinstance(data, list):
+                return [self.handle_request(r['type'], r['data']) for r in data]
+            results = []
+            for r in data['requests']:
+                try:
+                    results.append({'value': self.handle_request(r['type'], r['data']), 'error': None})
+                except Exception:
+                    results.append({'value': traceback.format_exc(), 'error': 'STACK_TRACE'})
+            return results
+        if msg_type == 'PLAYER_STATUS':
+            return sim.player_status()
+        if msg_type == 'TOOL_STATUS':
+            return sim.serialize_item(player.current_item)
+        if msg_type == 'PLAYER_ITEMS':
+            return sim.player_items()
+        if msg_type == 'PLAYER_POSITION':
+            return list(player.tile)
+        if msg_type == 'CHARACTERS_AT_LOCATION':
+            return loc.characters
+        if msg_type == 'ANIMALS_AT_LOCATION':
+            return []
+        if msg_type == 'NEW_STREAM':
+            self.streams[data['stream_id']] = StandinStream(data['name'], data['data'])
+            return True
+        if msg_type == 'STOP_STREAM':
+            stream = self.streams.pop(data, None)
+            if stream is not None and stream.follower is not None:
+                stream.follower.cancel(sim)
+            return True
+        if msg_type == 'UPDATE_PATH':
+            stream = self.streams.get(data['stream_id'])
+            if stream is None or stream.follower is None:
+                return False
+            stream.follower.retarget(data['tiles'], data['location'], data['version'])
+            return True
+        if msg_type == 'SET_STREAM_FILTER':
+            if data['stream_id'] in self.streams:
+                self.streams[data['stream_id']].where = data['where']
+            return True
+        if msg_type == 'STREAM_RESYNC':
+            if data in self.streams:
+                self.streams[data].resync_requested = True
+            return True
+        if msg_type == 'ROUTE':
+            return sim.route(player.location, data['toLocation'])
+        if msg_type == 'GET_LOCATION_CONNECTIONS':
+            return sim.connections(loc)
+        if msg_type == 'LOCATION_CONNECTION':
+            for cn in sim.connections(loc):
+                if cn['TargetName'] == data['toLocation']:
+                    return cn
+            return None
+        if msg_type == 'GET_ALL_GAME_LOCATIONS':
+            return list(sim.locations)
+        if msg_type == 'GET_ALL_LOCATION_CONNECTIONS':
+            return {name: sim.connections(location) for name, location in sim.locations.items()}
+        if msg_type == 'GET_CONNECTION_DISTANCES':
+            return sim.connection_distances(data['location'])
+        if msg_type == 'GET_SAVE_KEY':
+            return {'saveId': sim.save_id, 'gameVersion': GAME_VERSION}
+        if msg_type == 'path_to_tile':
+            return tiles_to_points(loc.find_path(player.tile, (data['x'], data['y']), data.get('cutoff', -1)))
+        if msg_type == 'GET_PASSABILITY_GRID':
+            return loc.passability_grid()
+        if msg_type == 'GET_GRID_VERSION':
+            return {'location': loc.name, 'version': loc.grid_version}
+        if msg_type == 'PATHS_TO_TILES':
+            targets = [(t['tileX'], t['tileY']) for t in data['tiles']]
+            distances = loc.distances_to_tiles(player.tile, targets, data['adjacent'], data['nearestOnly'], data.get('cutoff', -1))
+            reached = [(d, i) for i, d in enumerate(distances) if d is not None]
+            return {'distances': distances, 'nearest': min(reached)[1] if reached else None, 'location': loc.name}
+        if msg_type == 'PATH_TO_PLAYER':
+            tiles = tiles_to_points(loc.find_path((data['x'], data['y']), player.tile, data.get('cutoff', -1)))
+            return {'tiles': tiles, 'location': loc.name}
+        if msg_type == 'GET_NEAREST_CHARACTER':
+            return sim.nearest_character(data)
+        if msg_type == 'GET_HOE_DIRT':
+            return list(loc.hoe_dirt.values())
+        if msg_type == 'GET_LOCATION_OBJECTS':
+            return list(loc.objects.values())
+        if msg_type == 'GET_RESOURCE_CLUMPS':
+            # no stumps or boulders in the scenarios yet
+            return []
+        if msg_type == 'GET_WATER_TILES':
+            return [list(t) for t in sorted(loc.water)]
+        if msg_type == 'GET_DIGGABLE_TILES':
+            return [t for t in data['tiles'] if loc.is_walkable(t['tileX'], t['tileY']) and (t['tileX'], t['tileY']) not in loc.hoe_dirt]
+        if msg_type in ('GET_TERRAIN_FEATURES', 'GET_DEBRIS', 'GET_RESOURCE_CLUMPS', 'GET_LOCATION_BUILDINGS', 'GET_LADDERS_DOWN'):
+            return []
+        if msg_type in ('GET_ACTIVE_MENU', 'GET_LATEST_GAME_EVENT', 'BED_TILE', 'SHIPPING_BIN_TILE'):
+            return None
+        if msg_type == 'UPDATE_HELD_BUTTONS':
+            for key in data['toRelease']:
+                sim.release(key)
+            for key in data['toHold']:
+                sim.hold(key)
+            return True
+        if msg_type == 'GET_HELD_BUTTONS':
+            return list(player.held)
+        if msg_type == 'RELEASE_ALL_KEYS':
+            player.held.clear()
+            return True
+        if msg_type == 'PRESS_KEY':
+            sim.press_key(data['key'])
+            return True
+        if msg_type == 'SET_MOUSE_POSITION_ON_TILE':
+            player.mouse_tile = data['x'], data['y']
+            return True
+        if msg_type == 'GET_MOUSE_POSITION':
+            x, y = player.mouse_tile or player.tile
+            return [x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE // 2]
+        if msg_type in ('SET_MOUSE_POSITION', 'SET_MOUSE_POSITION_RELATIVE', 'MOUSE_CLICK', 'SHOW_HUD_MESSAGE', 'CATCH_FISH'):
+            return True
+        raise ValueError(f'Unhandled request {msg_type}')
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the speech client against a simulated farm')
+    parser.add_argument('scenario', help='Scenario JSON file')
+    parser.add_argument('--tps', type=float, default=60, help='Ticks per second, 0 to run as fast as possible')
+    parser.add_argument('--lines', action='store_true', help="Don't offer msgpack framing to the client")
+    parser.add_argument('--tick_budget_ms', type=float, default=5, help='Time for handling requests each tick, as in the mod')
+    parser.add_argument('--bulk_cost_ms', type=float, default=0, help='Simulated time each location wide query takes')
+    parser.add_argument('--no_passability_grid', action='store_true', help="Don't offer passability grids to the client")
+    parser.add_argument('--no_paths_to_tiles', action='store_true', help="Don't offer PATHS_TO_TILES to the client")
+    parser.add_argument('--no_stream_filters', action='store_true', help="Don't offer stream filters to the client")
+    parser.add_argument('--no_route_table', action='store_true', help="Don't offer the route table requests to the client")
+    parser.add_argument('--no_held_buttons', action='store_true', help="Don't offer GET_HELD_BUTTONS to the client")
+    parser.add_argument('--no_follow_path', action='store_true', help="Don't offer FOLLOW_PATH streams to the client")
+    parser.add_argument('--out', default=None, help='Also write the summary as JSON to this path')
+    argv = sys.argv[1:]
+    if '--' not in argv:
+        parser.error('missing client command after --')
+    split = argv.index('--')
+    args = parser.parse_args(argv[:split])
+    client = argv[split + 1:]
+    with open(args.scenario) as f:
+        simulation = Simulation(json.load(f))
+    capabilities = [BATCH_ITEM_RESULTS_CAPABILITY]
+    if not args.no_stream_filters:
+        capabilities.append(STREAM_FILTER_CAPABILITY)
+    if not args.no_passability_grid:
+        capabilities.append(PASSABILITY_GRID_CAPABILITY)
+    if not args.no_paths_to_tiles:
+        capabilities.append(PATHS_TO_TILES_CAPABILITY)
+    if not args.no_route_table:
+        capabilities.append(ROUTE_TABLE_CAPABILITY)
+    if not args.no_held_buttons:
+        capabilities.append(HELD_BUTTONS_CAPABILITY)
+    if not args.no_follow_path:
+        capabilities.append(FOLLOW_PATH_CAPABILITY)
+    if not args.lines:
+        capabilities.append(framing.MSGPACK_FRAMING_CAPABILITY)
+    proc = subprocess.Popen(client + ['--mod_capabilities', ','.join(capabilities)], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    standin = Standin(simulation, proc, args.tick_budget_ms, args.bulk_cost_ms)
+    start = time.perf_counter()
+    try:
+        standin.run(args.tps)
+    except KeyboardInterrupt:
+        proc.kill()
+    elapsed = time.perf_counter() - start
+    returncode = proc.wait()
+    summary = {
+        'ticks': simulation.tick,
+        'seconds': round(elapsed, 3),
+        'ticks_per_second': round(simulation.tick / elapsed, 1) if elapsed else None,
+        'handled': dict(standin.handled),
+        'stream_frames': dict(standin.stream_frames),
+        'remaining': simulation.remaining(),
+        'tiles_walked': simulation.tiles_walked,
+        'tool_swings': simulation.tool_swings,
+        'hoe_dirt': sum(len(loc.hoe_dirt) for loc in simulation.locations.values()),
+        'turns': len(simulation.overshoots),
+        'overshoot_px': describe(simulation.overshoots),
+        'turn_latency_ms': describe(standin.turn_latency),
+    }
+    log(json.dumps(summary, indent=2))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(summary, f, indent=2)
+    sys.exit(returncode)
+
+def describe(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        'mean': round(statistics.mean(values), 2),
+        'p95': round(values[int(0.95 * (len(values) - 1))], 2),
+        'max': round(values[-1], 2),
+    }
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+'''
+Client entry point without speech recognition: connects to the mod (or mod_standin.py) over
+stdin/stdout, awaits each EXPR in turn and exits. EXPR is evaluated with the server, game and
+objective modules in scope, for example
+
+    python standin/mod_standin.py standin/scenarios/farm.json --tps 300 -- python standin/run_client.py "objective.WaterCropsObjective().wrap_run()"
+
+Timing and the client side request stats are written to stderr since stdout is the mod pipe.
+'''
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'speech-client'))
+
+import server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run one awaitable against the mod')
+    parser.add_argument('entry', nargs='+')
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--mod_capabilities', default='')
+    parser.add_argument('--auto_batch', action='store_true')
+    parser.add_argument('--no_priority_lanes', action='store_true', help='Send input in order with everything else')
+    parser.add_argument('--load', default=None, help='Expression awaited over and over in the background while EXPR runs')
+    parser.add_argument('--load_interval', type=float, default=0.05)
+    parser.add_argument('--load_tasks', type=int, default=1, help='How many copies of --load run at once')
+    parser.add_argument('--path_mode', choices=('local', 'mod', 'check'), default='local', help='Where paths come from, see game.path_mode')
+    parser.add_argument('--no_tour_planning', action='store_true', help='Sort crops after each one instead of planning a tour, see game.tour_planning')
+    parser.add_argument('--no_aoe_planning', action='store_true', help='Swing at each tile even with an upgraded tool, see game.aoe_planning')
+    parser.add_argument('--route_table_dir', default=None, help='Where route tables are kept between runs, see routes.table_dir')
+    parser.add_argument('--no_held_button_diffing', action='store_true', help='Send every held button update as asked, see game.held_button_diffing')
+    parser.add_argument('--no_path_cache', action='store_true', help='Search for every path instead of reusing cached ones, see game.path_caching')
+    parser.add_argument('--record_traffic', default=None, metavar='PATH', help='Record mod traffic to PATH like main.py --record_traffic')
+    parser.add_argument('--out', default=None, help='Also write the summary as JSON to this path')
+    args = parser.parse_args()
+    server.setup_async_loop(capabilities=[x for x in args.mod_capabilities.split(',') if x], record_path=args.record_traffic, batch_requests=args.auto_batch)
+    server.priority_lanes = not args.no_priority_lanes
+    import game, objective, routes
+    game.path_mode = args.path_mode
+    game.tour_planning = not args.no_tour_planning
+    game.path_caching = not args.no_path_cache
+    game.held_button_diffing = not args.no_held_button_diffing
+    game.aoe_planning = not args.no_aoe_planning
+    if args.route_table_dir is not None:
+        routes.table_dir = args.route_table_dir
+    scope = {'server': server, 'game': game, 'objective': objective}
+
+    async def run():
+        if args.load is not None:
+            for _ in range(args.load_tasks):
+                server.loop.create_task(load(args.load, scope, args.load_interval))
+        for entry in args.entry:
+            result = await eval(entry, scope)
+        return result
+
+    start = time.perf_counter()
+    result = asyncio.run_coroutine_threadsafe(run(), server.loop).result(args.timeout)
+    elapsed = time.perf_counter() - start
+    summary = asyncio.run_coroutine_threadsafe(collect_stats(), server.loop).result(args.timeout)
+    summary = {'seconds': round(elapsed, 3), 'result': repr(result), **summary}
+    print(json.dumps(summary, indent=2), file=sys.stderr, flush=True)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if server.recorder is not None:
+        asyncio.run_coroutine_threadsafe(close_recorder(), server.loop).result(args.timeout)
+    # the loop's background tasks never finish on their own
+    os._exit(0)
+
+async def load(expr, scope, interval):
+    while True:
+        await eval(expr, scope)
+        await asyncio.sleep(interval)
+
+async def collect_stats():
+    # let the writer thread pick up anything still pending before reading its counters
+    await asyncio.sleep(0.1)
+    import game
+    return {
+        **server.stats(),
+        'location_cache': game.location_cache.stats(),
+        'paths': dict(game.path_stats),
+        'path_cache': game.path_cache.stats(),
+        'held_buttons': game.held_buttons.stats(),
+    }
+
+async def close_recorder():
+    # gzip only writes its trailer on close and os._exit skips that
+    server.recorder.close()
+
+
+if __name__ == '__main__':
+    main()